@@ -0,0 +1,53 @@
+"""
+Micro-benchmark: compiled field extractors vs. the generic `trim_event_dynamic`.
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_extractors.py --events 50000
+"""
+import os
+import time
+import random
+import argparse
+import pandas as pd
+from utils.file_ops import load_yaml_file
+from utils.defaults import BASE_PATH, CONFIG_FOLDER
+from utils.event_utils import trim_event_dynamic, compile_event_trimmer, compile_row_extractor
+from event_generator import synthetic_event, TYPES
+
+
+def timed(label, fn, repeat):
+    best = min(_run(fn) for _ in range(repeat))
+    print(f"{label:<38} {best * 1000:9.1f} ms")
+    return best
+
+
+def _run(fn):
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=50_000, help="Events per event type")
+    parser.add_argument("--repeat", type=int, default=5, help="Repetitions; the best time is reported")
+    args = parser.parse_args()
+
+    config = load_yaml_file(os.path.join(BASE_PATH, CONFIG_FOLDER, "filtered_events.yaml"))
+    rng = random.Random(42)
+
+    for event_type in TYPES:
+        fields = config[event_type]["fields"]
+        events = [synthetic_event(i, event_type, rng) for i in range(args.events)]
+        trimmer = compile_event_trimmer(fields)
+        extractor = compile_row_extractor(fields)
+
+        print(f"\n{event_type} ({args.events} events, {len(fields)} fields)")
+        baseline = timed("trim_event_dynamic + DataFrame", lambda: pd.DataFrame(
+            [trim_event_dynamic(e, fields) for e in events]), args.repeat)
+        timed("compiled trimmer + DataFrame", lambda: pd.DataFrame(
+            [trimmer(e) for e in events]), args.repeat)
+        compiled = timed("compiled rows + from_records", lambda: pd.DataFrame.from_records(
+            [extractor(e) for e in events], columns=fields), args.repeat)
+        print(f"{'speedup':<38} {baseline / compiled:9.2f}x")
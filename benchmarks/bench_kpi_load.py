@@ -0,0 +1,105 @@
+"""
+Load test: concurrent `/kpi` requests against the API, pooled snapshot reads vs. a connection per request.
+
+Builds a synthetic database, serves `api.main:app` with uvicorn on a local
+port and fires requests from a thread pool. Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_kpi_load.py --events 100000 --requests 2000 --concurrency 32
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import duckdb
+import requests
+import uvicorn
+from event_generator import synthetic_event, TYPES
+
+
+def build_database(workdir, events):
+    # Imported here so DUCKDB_PATH can be pointed at the temporary database first
+    from transform import transform_events, event_schemas
+    from utils.file_ops import ensure_directory_exists
+    from utils.silver_schema import frame_to_table, write_silver_table
+    from materialize_duckdb import create_duckdb_database
+
+    rng = random.Random(42)
+    silver_dir = os.path.join(workdir, "silver")
+    for event_type in TYPES:
+        ensure_directory_exists(os.path.join(silver_dir, event_type))
+        batch = [synthetic_event(i, event_type, rng) for i in range(events // len(TYPES))]
+        write_silver_table(frame_to_table(transform_events(batch), event_schemas[event_type]),
+                           os.path.join(silver_dir, event_type, f"{event_type}_bench.parquet"))
+
+    db_path = os.path.join(workdir, "db", "github_events.duckdb")
+    ensure_directory_exists(os.path.dirname(db_path))
+    create_duckdb_database(full_refresh=True, db_path=db_path, silver_dir_path=silver_dir)
+    return db_path
+
+
+def per_request_query(db_path):
+    """
+    The previous behaviour: open and close a connection for every request.
+    """
+    from utils.db_utils import current_snapshot
+
+    def run_query(sql, params=None, guard=None, snapshot=None):
+        with duckdb.connect(current_snapshot(db_path), read_only=True) as con:
+            return con.execute(sql, params).to_arrow_table()
+    return run_query
+
+
+def load(url, total, concurrency):
+    session_local = threading.local()
+
+    def call(_):
+        session = getattr(session_local, "session", None) or requests.Session()
+        session_local.session = session
+        started = time.perf_counter()
+        response = session.get(url)
+        response.raise_for_status()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = sorted(executor.map(call, range(total)))
+    elapsed = time.perf_counter() - started
+    pick = lambda q: latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000
+    return pick(0.50), pick(0.99), total / elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100_000, help="Synthetic events across the three tables")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per mode")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="gh-events-bench-")
+    db_path = build_database(workdir, args.events)
+
+    import utils.db_utils as db_utils
+    import utils.metrics as metrics
+    from utils.kpi_cache import KpiCache
+    from api.main import app
+    db_utils.DUCKDB_PATH = db_path
+    metrics.kpi_cache = KpiCache(max_bytes=0)  # Measure queries, not cache hits
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=args.port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    url = f"http://127.0.0.1:{args.port}/kpi/event_count_offset?offset=10080"
+    pooled = metrics.run_query_arrow
+    for mode, run_query in (("per-request", per_request_query(db_path)), ("pooled", pooled)):
+        metrics.run_query_arrow = run_query
+        load(url, min(100, args.requests), args.concurrency)  # Warm-up
+        p50, p99, rps = load(url, args.requests, args.concurrency)
+        print(f"{mode:<12} p50 {p50:7.1f} ms   p99 {p99:7.1f} ms   {rps:7.0f} req/s")
+
+    server.should_exit = True
@@ -0,0 +1,112 @@
+"""
+Benchmark: KPI latency, build time and storage of table vs. external materialization.
+
+Synthetic events spread over `--hours` are written to silver and compacted
+into date/hour partitions, then served three ways:
+  - table:           DuckDB tables with rollups, as `materialize_duckdb.py` builds them
+  - table (raw sql): the same tables, always running the KPI's plain `sql`
+  - external:        views over the silver files (`materialize_duckdb.py --mode external`)
+
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_query_modes.py --events 300000 --hours 48
+"""
+import os
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime, timedelta, timezone
+from event_generator import EventGenerator, TYPES
+
+# Constants
+KPI_CASES = [
+    ("event_count_offset", {"offset": 60}),
+    ("event_count_offset", {"offset": 1440}),
+    ("avg_pr_time", {}),
+]
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def build_silver(silver_dir, args):
+    from transform import transform_events, event_schemas
+    from utils.silver_schema import frame_to_table, write_silver_table
+    from compact_silver import compact_silver
+
+    # Arrival times span --hours and end now, so the time-window KPIs have data
+    start = datetime.now(timezone.utc) - timedelta(hours=args.hours)
+    generator = EventGenerator(seed=args.seed, events_per_second=args.events / (args.hours * 3600), start=start)
+    segment = 0
+    for offset in range(0, args.events, args.file_events):
+        events = generator.events(min(args.file_events, args.events - offset))
+        segment += 1
+        for event_type in TYPES:
+            batch = [e for e in events if e["type"] == event_type]
+            os.makedirs(os.path.join(silver_dir, event_type), exist_ok=True)
+            write_silver_table(frame_to_table(transform_events(batch), event_schemas[event_type]),
+                               os.path.join(silver_dir, event_type, f"{event_type}_seg_{segment:010d}.parquet"))
+    compact_silver(silver_dir)
+
+
+def latency(pool, entry, params, repeat, raw):
+    from utils.metrics import run_kpi
+
+    bound = entry.params_model(**params).model_dump()
+    timings = []
+    with pool.cursor() as cur:
+        run = lambda statement: cur.execute(statement, bound).fetchall()
+        for i in range(repeat + 3):
+            started = time.perf_counter()
+            run(entry.statement) if raw else run_kpi(entry, run)
+            if i >= 3:  # The first runs warm the OS and Parquet metadata caches
+                timings.append(time.perf_counter() - started)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000, timings[min(len(timings) - 1, int(0.99 * len(timings)))] * 1000
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=300_000, help="Synthetic events across the three types")
+    parser.add_argument("--hours", type=float, default=48, help="Time span of the events, ending now")
+    parser.add_argument("--file-events", type=int, default=5_000, help="Events per transform output file")
+    parser.add_argument("--repeat", type=int, default=30, help="Timed runs per KPI")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    from materialize_duckdb import create_duckdb_database, create_external_database
+    from utils.db_utils import ConnectionPool
+    from utils.metrics import kpi_registry
+
+    workdir = tempfile.mkdtemp(prefix="gh-events-bench-")
+    try:
+        silver_dir = os.path.join(workdir, "silver")
+        build_silver(silver_dir, args)
+        print(f"Silver: {directory_bytes(silver_dir) / 2**20:.1f} MiB, {args.events} events over {args.hours:g} h")
+
+        modes = {}
+        for mode, build in (("table", create_duckdb_database), ("external", create_external_database)):
+            db_path = os.path.join(workdir, mode, "github_events.duckdb")
+            os.makedirs(os.path.dirname(db_path))
+            started = time.perf_counter()
+            build(db_path=db_path, silver_dir_path=silver_dir)
+            elapsed = time.perf_counter() - started
+            modes[mode] = db_path
+            # Database file (table mode only) plus the snapshot readers open
+            extra = directory_bytes(os.path.dirname(db_path))
+            print(f"{mode:<10} build {elapsed:7.2f} s   storage beyond silver {extra / 2**20:8.1f} MiB")
+
+        print(f"\n{'kpi':<32} {'mode':<16} {'p50 ms':>9} {'p99 ms':>9}")
+        for kpi_id, params in KPI_CASES:
+            entry = kpi_registry.get(kpi_id)
+            label = kpi_id + "".join(f" {key}={value}" for key, value in params.items())
+            for mode, db_path, raw in (("table", modes["table"], False), ("table (raw sql)", modes["table"], True),
+                                       ("external", modes["external"], True)):
+                pool = ConnectionPool(db_path, size=1)
+                p50, p99 = latency(pool, entry, params, args.repeat, raw)
+                pool.close()
+                print(f"{label:<32} {mode:<16} {p50:9.2f} {p99:9.2f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
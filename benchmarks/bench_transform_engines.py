@@ -0,0 +1,61 @@
+"""
+Benchmark: pandas vs. Arrow transform engines on one large bronze segment.
+
+Each engine runs in a fresh process so peak RSS is measured in isolation.
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/bench_transform_engines.py --events 200000
+"""
+import os
+import json
+import time
+import random
+import argparse
+import resource
+import tempfile
+import multiprocessing
+from event_generator import synthetic_event
+
+
+def run_engine(engine, bronze_path, parquet_path, results):
+    # Imported here so each child starts from the same baseline
+    from transform import transform_events, event_schemas
+    from utils.bronze_writer import read_bronze_file
+    from utils.silver_schema import frame_to_table, write_silver_table
+    from utils.arrow_utils import convert_file_arrow
+
+    started = time.perf_counter()
+    if engine == "arrow":
+        convert_file_arrow(bronze_path, parquet_path, "PullRequestEvent", event_schemas["PullRequestEvent"])
+    else:
+        write_silver_table(frame_to_table(transform_events(read_bronze_file(bronze_path)),
+                                          event_schemas["PullRequestEvent"]), parquet_path)
+    elapsed = time.perf_counter() - started
+
+    # ru_maxrss is KiB on Linux
+    results[engine] = (elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=200_000, help="PullRequestEvents in the bronze segment")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="gh-events-bench-")
+    bronze_path = os.path.join(workdir, "PullRequestEvent_seg_0000000001.ndjson")
+    rng = random.Random(42)
+    with open(bronze_path, "w") as f:
+        for i in range(args.events):
+            f.write(json.dumps(synthetic_event(i, "PullRequestEvent", rng)) + "\n")
+    print(f"Bronze segment: {os.path.getsize(bronze_path) / 2**20:.1f} MiB, {args.events} events")
+
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Manager().dict()
+    for engine in ("pandas", "arrow"):
+        proc = ctx.Process(target=run_engine, args=(engine, bronze_path,
+                                                     os.path.join(workdir, f"{engine}.parquet"), results))
+        proc.start()
+        proc.join()
+
+    for engine, (elapsed, peak_mib) in results.items():
+        print(f"{engine:<8} wall {elapsed:7.2f} s   peak RSS {peak_mib:8.1f} MiB")
@@ -0,0 +1,72 @@
+"""
+Compares two `run_benchmarks.py` result files and flags regressions.
+
+Metrics ending in `_per_sec` are better when higher; times (`seconds`,
+`*_ms`) are better when lower; other values (sizes, counts) are shown but
+never fail the comparison. Exits with status 1 if any timing or throughput
+metric got worse by more than `--threshold` percent, so it can gate CI.
+
+    PYTHONPATH=src python benchmarks/compare.py benchmarks/results/abc1234.json benchmarks/results/def5678.json
+"""
+import sys
+import json
+import argparse
+
+
+def direction(metric):
+    """
+    Returns +1 if higher is better, -1 if lower is better, 0 if the metric is informational.
+    """
+    if metric.endswith("_per_sec"):
+        return 1
+    if metric == "seconds" or metric.endswith("_ms"):
+        return -1
+    return 0
+
+
+def compare(baseline, candidate, threshold):
+    """
+    Builds comparison rows for every metric present in both runs.
+
+    Returns:
+        Tuple[List[tuple], int]: `(stage, metric, old, new, change %, verdict)` rows and the regression count.
+    """
+    rows, regressions = [], 0
+    for stage, metrics in candidate["stages"].items():
+        for metric, new in metrics.items():
+            old = baseline["stages"].get(stage, {}).get(metric)
+            if old is None or not isinstance(new, (int, float)):
+                continue
+            change = (new - old) / old * 100 if old else 0.0
+            better = direction(metric)
+            verdict = ""
+            if better and change * better < -threshold:
+                verdict = "REGRESSION"
+                regressions += 1
+            elif better and change * better > threshold:
+                verdict = "improved"
+            rows.append((stage, metric, old, new, change, verdict))
+    return rows, regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("baseline", help="Results of the reference commit")
+    parser.add_argument("candidate", help="Results of the commit under test")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed change in percent")
+    args = parser.parse_args()
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.candidate) as f:
+        candidate = json.load(f)
+
+    print(f"baseline {baseline['meta']['commit']}  vs  candidate {candidate['meta']['commit']}")
+    rows, regressions = compare(baseline, candidate, args.threshold)
+    for stage, metric, old, new, change, verdict in rows:
+        print(f"{stage:<24} {metric:<20} {old:>12,.2f} {new:>12,.2f} {change:>+8.1f}%  {verdict}")
+
+    if regressions:
+        print(f"[ERROR] {regressions} metric(s) regressed by more than {args.threshold:g}%")
+        sys.exit(1)
+    print("[SUCCESS] No regressions")
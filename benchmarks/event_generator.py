@@ -0,0 +1,202 @@
+"""
+Synthetic GitHub events shaped like the Events API / GH Archive output.
+
+`EventGenerator` produces a stream with increasing ids and timestamps, a
+skewed repo and actor popularity (a few repos get most of the activity) and a
+realistic mix of event types, optionally including types the pipeline drops.
+`synthetic_event` builds a single event of a given type, for micro-benchmarks.
+
+    PYTHONPATH=src python benchmarks/event_generator.py --events 1000 > events.ndjson
+"""
+import sys
+import json
+import random
+import argparse
+from datetime import datetime, timedelta, timezone
+from utils.defaults import INTERESTED_TYPES
+
+TYPES = list(INTERESTED_TYPES)
+
+# Share of each type in the public timeline, roughly as observed on GH Archive
+TYPE_WEIGHTS = {
+    "PushEvent": 0.50,
+    "CreateEvent": 0.10,
+    "PullRequestEvent": 0.09,
+    "IssueCommentEvent": 0.07,
+    "WatchEvent": 0.07,
+    "DeleteEvent": 0.04,
+    "PullRequestReviewEvent": 0.04,
+    "IssuesEvent": 0.03,
+    "ForkEvent": 0.02,
+    "ReleaseEvent": 0.01,
+    "PublicEvent": 0.03,
+}
+FIRST_EVENT_ID = 40_000_000_000
+
+
+def _user(rng, login):
+    user_id = rng.randint(1, 10**8)
+    return {"login": login, "id": user_id, "node_id": f"U_{user_id}",
+            "url": f"https://api.github.com/users/{login}",
+            "avatar_url": f"https://avatars.githubusercontent.com/u/{user_id}?"}
+
+
+def build_event(event_id, event_type, created_at, repo, login, rng):
+    """
+    Builds one event with the envelope and payload GitHub sends for its type.
+
+    Args:
+        event_id (int): Event id.
+        event_type (str): GitHub event type.
+        created_at (datetime): Event time (UTC).
+        repo (str): `owner/name` of the repository.
+        login (str): Actor login.
+        rng (random.Random): Source of randomness.
+
+    Returns:
+        dict: The event.
+    """
+    user = _user(rng, login)
+    number = rng.randint(1, 50_000)
+    event = {
+        "id": str(event_id),
+        "type": event_type,
+        "actor": dict(user, display_login=login, gravatar_id=""),
+        "repo": {"id": rng.randint(1, 10**9), "name": repo, "url": f"https://api.github.com/repos/{repo}"},
+        "public": True,
+        "created_at": created_at.strftime("%Y-%m-%dT%H:%M:%SZ"),
+    }
+    if rng.random() < 0.3:
+        owner = repo.split("/")[0]
+        event["org"] = {"id": rng.randint(1, 10**7), "login": owner, "gravatar_id": "",
+                        "url": f"https://api.github.com/orgs/{owner}",
+                        "avatar_url": f"https://avatars.githubusercontent.com/u/{number}?"}
+
+    if event_type == "WatchEvent":
+        event["payload"] = {"action": "started"}
+    elif event_type == "PullRequestEvent":
+        action = rng.choices(["opened", "closed", "reopened", "synchronize"], [0.45, 0.35, 0.05, 0.15])[0]
+        merged = action == "closed" and rng.random() < 0.7
+        event["payload"] = {
+            "action": action,
+            "number": number,
+            "pull_request": {
+                "url": f"https://api.github.com/repos/{repo}/pulls/{number}",
+                "id": rng.randint(1, 10**10), "number": number,
+                "state": "closed" if action == "closed" else "open",
+                "locked": False, "title": rng.choice(["Fix flaky test", "Bump dependency", "Add feature flag"]),
+                "user": user, "body": "x" * rng.randint(0, 800),
+                "created_at": event["created_at"], "updated_at": event["created_at"],
+                "closed_at": event["created_at"] if action == "closed" else None,
+                "merged_at": event["created_at"] if merged else None,
+                "merged": merged if action == "closed" else rng.choice([False, None]),
+                "head": {"ref": "feature", "sha": "%040x" % rng.getrandbits(160), "repo": {"name": repo}},
+                "base": {"ref": "main", "sha": "%040x" % rng.getrandbits(160), "repo": {"name": repo}},
+                "labels": [{"name": "bug"}] if rng.random() < 0.2 else [],
+                "commits": rng.randint(1, 20), "additions": rng.randint(0, 500),
+                "deletions": rng.randint(0, 200), "changed_files": rng.randint(1, 30),
+            },
+        }
+    elif event_type == "IssuesEvent":
+        action = rng.choices(["opened", "closed", "reopened", "labeled"], [0.5, 0.35, 0.05, 0.1])[0]
+        event["payload"] = {
+            "action": action,
+            "issue": {
+                "url": f"https://api.github.com/repos/{repo}/issues/{number}",
+                "id": rng.randint(1, 10**10), "number": number,
+                "title": rng.choice(["Something broke", "Crash on startup", "Docs typo", "Feature request"]),
+                "user": user, "state": "closed" if action == "closed" else "open",
+                "labels": [], "comments": rng.randint(0, 40), "body": "y" * rng.randint(0, 600),
+                "created_at": event["created_at"], "updated_at": event["created_at"],
+            },
+        }
+    elif event_type == "PushEvent":
+        event["payload"] = {"push_id": rng.randint(1, 10**10), "size": 1, "ref": "refs/heads/main",
+                            "head": "%040x" % rng.getrandbits(160), "before": "%040x" % rng.getrandbits(160),
+                            "commits": [{"sha": "%040x" % rng.getrandbits(160), "message": "Update",
+                                         "author": {"name": login, "email": f"{login}@users.noreply.github.com"}}]}
+    else:
+        event["payload"] = {"action": "created"} if rng.random() < 0.5 else {}
+    return event
+
+
+def synthetic_event(i, event_type, rng):
+    """
+    Builds a single event of `event_type` with id `FIRST_EVENT_ID + i` and a random time on one day.
+    """
+    created_at = datetime(2025, 7, 10, tzinfo=timezone.utc) + timedelta(seconds=rng.randint(0, 86_399))
+    repo = f"org{rng.randint(0, 500)}/repo{rng.randint(0, 50)}"
+    return build_event(FIRST_EVENT_ID + i, event_type, created_at, repo, f"user{rng.randint(0, 5000)}", rng)
+
+
+class EventGenerator:
+    """
+    Endless, reproducible stream of events in arrival order.
+
+    Args:
+        seed (int): Random seed; equal seeds give equal streams.
+        events_per_second (float): Mean arrival rate used to space `created_at`.
+        start (datetime, optional): Time of the first event; defaults to now (UTC).
+        repos (int): Number of distinct repositories.
+        actors (int): Number of distinct actors.
+        other_share (float): Fraction of events with types outside INTERESTED_TYPES.
+        first_id (int): Id of the first event.
+    """
+
+    def __init__(self, seed=42, events_per_second=50.0, start=None, repos=5_000, actors=20_000,
+                 other_share=0.0, first_id=FIRST_EVENT_ID):
+        self.rng = random.Random(seed)
+        self.events_per_second = events_per_second
+        self.clock = start or datetime.now(timezone.utc)
+        self.repos = repos
+        self.actors = actors
+        self.next_id = first_id
+
+        interested = {t: w for t, w in TYPE_WEIGHTS.items() if t in TYPES}
+        others = {t: w for t, w in TYPE_WEIGHTS.items() if t not in TYPES}
+        scale_in = (1 - other_share) / sum(interested.values())
+        scale_out = other_share / sum(others.values())
+        self.types = list(interested) + list(others)
+        self.weights = [w * scale_in for w in interested.values()] + [w * scale_out for w in others.values()]
+
+    def _pick(self, population):
+        # Pareto-distributed rank: a handful of repos/actors dominate, with a long tail
+        return min(population - 1, int(self.rng.paretovariate(1.2)) - 1)
+
+    def event(self, event_type=None, created_at=None):
+        """
+        Returns the next event.
+
+        Args:
+            event_type (str, optional): Force a type instead of drawing one from the mix.
+            created_at (datetime, optional): Force a timestamp instead of advancing the clock.
+        """
+        if created_at is None:
+            self.clock += timedelta(seconds=self.rng.expovariate(self.events_per_second))
+            created_at = self.clock
+        event_type = event_type or self.rng.choices(self.types, self.weights)[0]
+        repo_rank = self._pick(self.repos)
+        repo = f"org{repo_rank % 997}/repo{repo_rank}"
+        login = f"user{self._pick(self.actors)}"
+        event = build_event(self.next_id, event_type, created_at, repo, login, self.rng)
+        self.next_id += self.rng.randint(1, 3)
+        return event
+
+    def events(self, count, event_type=None):
+        """
+        Returns the next `count` events.
+        """
+        return [self.event(event_type) for _ in range(count)]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=1000, help="Events to write to stdout as NDJSON")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--other-share", type=float, default=0.0,
+                        help="Fraction of events with types outside INTERESTED_TYPES")
+    args = parser.parse_args()
+
+    generator = EventGenerator(seed=args.seed, other_share=args.other_share)
+    for _ in range(args.events):
+        sys.stdout.write(json.dumps(generator.event()) + "\n")
@@ -0,0 +1,182 @@
+"""
+Local mock of the GitHub `/events` endpoint for load and end-to-end runs.
+
+New events arrive at a configurable rate and only the newest `window` are
+served (GitHub keeps 300), paginated with `per_page`/`page` and a `Link`
+header. Pages carry an ETag and answer 304 to a matching `If-None-Match`.
+Optional knobs add an `X-Poll-Interval`, a primary rate limit (403 once
+exhausted, 304s are free) and secondary throttling (429 with `Retry-After`).
+
+Point the ingester at it with the GITHUB_EVENTS_URL environment variable:
+
+    PYTHONPATH=src python benchmarks/mock_github.py --port 8765 --rate 50 &
+    GITHUB_EVENTS_URL=http://127.0.0.1:8765/events PYTHONPATH=src python src/ingest.py --duration 60
+"""
+import json
+import time
+import argparse
+import threading
+from collections import deque
+from datetime import datetime, timezone
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from event_generator import EventGenerator
+
+# Constants
+EVENTS_WINDOW = 300                  # Newest events the API serves, as on GitHub
+MAX_PER_PAGE = 100                   # Largest page size GitHub accepts
+
+
+class MockEventsServer:
+    """
+    Serves a generated event stream the way the GitHub Events API does.
+
+    Args:
+        rate (float): New events per second.
+        generator (EventGenerator, optional): Source of events; one with 50% non-interesting types by default.
+        window (int): Newest events kept and served.
+        poll_interval (int, optional): Sent as `X-Poll-Interval`.
+        rate_limit (int, optional): Requests allowed per `rate_limit_window` seconds; unlimited if None.
+        rate_limit_window (float): Length of the primary rate-limit window.
+        throttle_every (int): Answer every Nth request with a 429 (0 disables).
+        latency_seconds (float): Delay added to every response.
+        host (str): Interface to bind.
+        port (int): Port to bind; 0 picks a free one.
+    """
+
+    def __init__(self, rate=50.0, generator=None, window=EVENTS_WINDOW, poll_interval=None,
+                 rate_limit=None, rate_limit_window=3600.0, throttle_every=0, latency_seconds=0.0,
+                 host="127.0.0.1", port=0):
+        self.rate = rate
+        self.generator = generator or EventGenerator(events_per_second=rate, other_share=0.5)
+        self.events = deque(maxlen=window)   # Newest last
+        self.poll_interval = poll_interval
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.throttle_every = throttle_every
+        self.latency_seconds = latency_seconds
+        self.lock = threading.Lock()
+
+        self.started_at = time.monotonic()
+        self.generated = 0
+        self.window_reset = time.time() + rate_limit_window
+        self.remaining = rate_limit
+        self.stats = {"requests": 0, "ok": 0, "not_modified": 0, "rate_limited": 0, "throttled": 0,
+                      "events_served": 0}
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                status, headers, body = server.respond(self.path, self.headers.get("If-None-Match"))
+                payload = json.dumps(body).encode() if body is not None else b""
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, str(value))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.url = f"http://{host}:{self.httpd.server_port}/events"
+
+    def advance(self, count=None):
+        """
+        Adds the events due since the start (or exactly `count` events).
+
+        Caller holds the lock.
+        """
+        if count is None:
+            count = int((time.monotonic() - self.started_at) * self.rate) - self.generated
+            self.generated += count
+        now = datetime.now(timezone.utc)
+        for _ in range(count):
+            self.events.append(self.generator.event(created_at=now))
+
+    def respond(self, path, if_none_match):
+        """
+        Computes the status, headers and JSON body for one request.
+        """
+        if self.latency_seconds:
+            time.sleep(self.latency_seconds)
+        query = parse_qs(urlparse(path).query)
+        per_page = min(MAX_PER_PAGE, int(query.get("per_page", ["30"])[0]))
+        page = int(query.get("page", ["1"])[0])
+
+        with self.lock:
+            self.stats["requests"] += 1
+            if self.throttle_every and self.stats["requests"] % self.throttle_every == 0:
+                self.stats["throttled"] += 1
+                return 429, {"Retry-After": 1}, {"message": "You have exceeded a secondary rate limit."}
+
+            headers = {}
+            if self.rate_limit is not None:
+                if time.time() >= self.window_reset:
+                    self.window_reset = time.time() + self.rate_limit_window
+                    self.remaining = self.rate_limit
+                headers.update({"X-RateLimit-Limit": self.rate_limit, "X-RateLimit-Reset": int(self.window_reset)})
+                if self.remaining <= 0:
+                    self.stats["rate_limited"] += 1
+                    headers["X-RateLimit-Remaining"] = 0
+                    return 403, headers, {"message": "API rate limit exceeded."}
+            if self.poll_interval:
+                headers["X-Poll-Interval"] = self.poll_interval
+
+            self.advance()
+            newest_first = list(reversed(self.events))
+            body = newest_first[(page - 1) * per_page:page * per_page]
+            last_page = max(1, -(-len(newest_first) // per_page))
+            if last_page > 1:
+                base = self.url
+                links = [f'<{base}?per_page={per_page}&page={last_page}>; rel="last"']
+                if page < last_page:
+                    links.insert(0, f'<{base}?per_page={per_page}&page={page + 1}>; rel="next"')
+                headers["Link"] = ", ".join(links)
+
+            etag = f'W/"{page}-{per_page}-{body[0]["id"] if body else ""}-{len(body)}"'
+            headers["ETag"] = etag
+            # Like GitHub, only full responses count against the limit
+            if self.rate_limit is not None:
+                self.remaining -= if_none_match != etag
+                headers["X-RateLimit-Remaining"] = self.remaining
+            if if_none_match == etag:
+                self.stats["not_modified"] += 1
+                return 304, headers, None
+
+            self.stats["ok"] += 1
+            self.stats["events_served"] += len(body)
+            return 200, headers, body
+
+    def start(self):
+        threading.Thread(target=self.httpd.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=50.0, help="New events per second")
+    parser.add_argument("--poll-interval", type=int, default=None, help="X-Poll-Interval to advertise")
+    parser.add_argument("--rate-limit", type=int, default=None, help="Requests per hour before 403s")
+    parser.add_argument("--throttle-every", type=int, default=0, help="Send a 429 every N requests")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds added to every response")
+    args = parser.parse_args()
+
+    server = MockEventsServer(rate=args.rate, poll_interval=args.poll_interval, rate_limit=args.rate_limit,
+                              throttle_every=args.throttle_every, latency_seconds=args.latency, port=args.port)
+    print(f"[INFO] Serving mock GitHub events at {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"[INFO] {server.stats}")
+        server.stop()
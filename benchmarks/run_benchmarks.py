@@ -0,0 +1,264 @@
+"""
+End-to-end benchmark suite: every pipeline stage on synthetic data, results as JSON.
+
+Stages, each fed by the previous one:
+  - ingest_poll:        `GitHubEventsClient.poll_all_pages` against the local mock `/events` server
+  - flush_to_bronze:    buffered events through `ingest.flush_to_bronze` into bronze segments
+  - transform_events:   in-memory field extraction into DataFrames
+  - convert_pandas / convert_arrow: `convert_json_to_parquet` over the bronze segments, per engine
+  - materialize:        `create_duckdb_database` full refresh from silver
+  - kpi_<id>:           `/kpi` latency under concurrent load, served by uvicorn, cache disabled
+
+Results go to `benchmarks/results/<commit>.json` (or `--output`) together with
+the commit, machine and arguments; compare two runs with `compare.py`.
+Run from the repository root:
+
+    PYTHONPATH=src python benchmarks/run_benchmarks.py --events 100000
+    PYTHONPATH=src python benchmarks/compare.py benchmarks/results/<old>.json benchmarks/results/<new>.json
+"""
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import socket
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from collections import deque
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+from event_generator import EventGenerator, TYPES
+from mock_github import MockEventsServer
+
+# Constants
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+STAGES = ["ingest_poll", "flush_to_bronze", "transform_events", "convert_pandas", "convert_arrow",
+          "materialize", "kpi"]
+REQUIRES = {                         # Stages whose output a stage consumes (any one of them)
+    "transform_events": ["flush_to_bronze"],
+    "convert_pandas": ["flush_to_bronze"],
+    "convert_arrow": ["flush_to_bronze"],
+    "materialize": ["convert_pandas", "convert_arrow"],
+    "kpi": ["materialize"],
+}
+KPI_URLS = {
+    "event_count_offset": "/kpi/event_count_offset?offset=10080",
+    "avg_pr_time": "/kpi/avg_pr_time",
+}
+
+
+def percentile(values, q):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))] if ordered else 0.0
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def bench_ingest_poll(workdir, args, state):
+    from utils.github_client import GitHubEventsClient, event_id
+
+    server = MockEventsServer(rate=args.mock_rate).start()
+    client = GitHubEventsClient(url=server.url, min_interval=0)
+    with server.lock:
+        server.advance(server.events.maxlen)  # Start with a full window, like the real timeline
+
+    latencies, fetched, pages, last_seen_id = [], 0, 0, None
+    started = time.perf_counter()
+    for _ in range(args.poll_cycles):
+        cycle_started = time.perf_counter()
+        result = client.poll_all_pages(last_seen_id=last_seen_id)
+        latencies.append(time.perf_counter() - cycle_started)
+        if result.events:
+            last_seen_id = max(last_seen_id or 0, event_id(result.events[0]))
+        fetched += len(result.events)
+        pages += result.pages_fetched
+        time.sleep(args.poll_pause)
+    elapsed = time.perf_counter() - started
+    client.close()
+    server.stop()
+    return {
+        "cycle_p50_ms": percentile(latencies, 0.50) * 1000,
+        "cycle_p99_ms": percentile(latencies, 0.99) * 1000,
+        "pages_per_cycle": pages / args.poll_cycles,
+        "events_fetched": fetched,
+        "not_modified_share": server.stats["not_modified"] / max(1, server.stats["requests"]),
+        "seconds": elapsed,
+    }
+
+
+def bench_flush_to_bronze(workdir, args, state):
+    import ingest
+
+    generator = EventGenerator(seed=args.seed, events_per_second=args.mock_rate)
+    per_type = args.events // len(TYPES)
+    events = {event_type: generator.events(per_type, event_type) for event_type in TYPES}
+    state["events"] = events
+
+    ingest.BASE_STORAGE_PATH = workdir
+    ingest.bronze_writers.clear()
+    started = time.perf_counter()
+    for event_type, batch in events.items():
+        for offset in range(0, len(batch), args.flush_batch):
+            ingest.flush_to_bronze(deque(batch[offset:offset + args.flush_batch]), event_type)
+    for writer in ingest.bronze_writers.values():
+        writer.close()
+    elapsed = time.perf_counter() - started
+    ingest.bronze_writers.clear()
+
+    bronze_bytes = directory_bytes(os.path.join(workdir, "bronze"))
+    return {"seconds": elapsed, "events_per_sec": per_type * len(TYPES) / elapsed,
+            "mib_per_sec": bronze_bytes / 2**20 / elapsed, "bronze_mib": bronze_bytes / 2**20}
+
+
+def bench_transform_events(workdir, args, state):
+    from transform import transform_events
+
+    started = time.perf_counter()
+    rows = sum(len(transform_events(batch)) for batch in state["events"].values())
+    elapsed = time.perf_counter() - started
+    return {"seconds": elapsed, "events_per_sec": rows / elapsed}
+
+
+def bench_convert(engine):
+    def run(workdir, args, state):
+        from transform import convert_json_to_parquet
+
+        storage = os.path.join(workdir, f"convert_{engine}")
+        shutil.copytree(os.path.join(workdir, "bronze"), os.path.join(storage, "bronze"))
+        for event_type in TYPES:
+            os.makedirs(os.path.join(storage, "silver", event_type), exist_ok=True)
+
+        started = time.perf_counter()
+        summary = convert_json_to_parquet(engine=engine, storage_path=storage)
+        elapsed = time.perf_counter() - started
+        state["silver_dir"] = os.path.join(storage, "silver")
+        return {"seconds": elapsed, "events_per_sec": summary["rows"] / elapsed, "files": summary["files"],
+                "silver_mib": directory_bytes(state["silver_dir"]) / 2**20}
+    return run
+
+
+def bench_materialize(workdir, args, state):
+    from materialize_duckdb import create_duckdb_database
+
+    db_path = os.path.join(workdir, "db", "github_events.duckdb")
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    started = time.perf_counter()
+    create_duckdb_database(full_refresh=True, db_path=db_path, silver_dir_path=state["silver_dir"])
+    elapsed = time.perf_counter() - started
+    state["db_path"] = db_path
+    return {"seconds": elapsed, "events_per_sec": args.events // len(TYPES) * len(TYPES) / elapsed}
+
+
+def bench_kpi(workdir, args, state):
+    import uvicorn
+    import utils.db_utils as db_utils
+    import utils.metrics as metrics
+    from utils.kpi_cache import KpiCache
+    from api.main import app
+    from bench_kpi_load import load
+
+    db_utils.DUCKDB_PATH = state["db_path"]
+    metrics.kpi_cache = KpiCache(max_bytes=0)  # Measure queries, not cache hits
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+
+    results = {}
+    for kpi_id, path in KPI_URLS.items():
+        url = f"http://127.0.0.1:{port}{path}"
+        load(url, min(50, args.kpi_requests), args.concurrency)  # Warm-up
+        p50, p99, rps = load(url, args.kpi_requests, args.concurrency)
+        results[f"kpi_{kpi_id}"] = {"p50_ms": p50, "p99_ms": p99, "requests_per_sec": rps}
+    server.should_exit = True
+    return results
+
+
+STAGE_FUNCTIONS = {
+    "ingest_poll": bench_ingest_poll,
+    "flush_to_bronze": bench_flush_to_bronze,
+    "transform_events": bench_transform_events,
+    "convert_pandas": bench_convert("pandas"),
+    "convert_arrow": bench_convert("arrow"),
+    "materialize": bench_materialize,
+    "kpi": bench_kpi,
+}
+
+
+def run_suite(args):
+    """
+    Runs the selected stages in order and returns the results document.
+    """
+    workdir = tempfile.mkdtemp(prefix="gh-events-bench-")
+    state = {}
+    stages = {}
+    try:
+        for stage in STAGES:
+            if stage not in args.stages:
+                continue
+            # The stages print per-file progress; keep the report readable
+            with redirect_stdout(io.StringIO()):
+                outcome = STAGE_FUNCTIONS[stage](workdir, args, state)
+            nested = outcome if stage == "kpi" else {stage: outcome}
+            for name, metrics in nested.items():
+                stages[name] = metrics
+                print(f"{name:<18} " + "  ".join(f"{key} {value:,.2f}" if isinstance(value, float)
+                                                  else f"{key} {value}" for key, value in metrics.items()))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": vars(args),
+        },
+        "stages": stages,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=60_000, help="Synthetic events across the three types")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--flush-batch", type=int, default=500, help="Events per flush_to_bronze call")
+    parser.add_argument("--mock-rate", type=float, default=200.0, help="Events per second arriving at the mock API")
+    parser.add_argument("--poll-cycles", type=int, default=30, help="Poll cycles against the mock API")
+    parser.add_argument("--poll-pause", type=float, default=0.1, help="Seconds between poll cycles")
+    parser.add_argument("--kpi-requests", type=int, default=500, help="Requests per KPI")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent KPI clients")
+    parser.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES, help="Stages to run")
+    parser.add_argument("--output", help="Results file; defaults to benchmarks/results/<commit>.json")
+    args = parser.parse_args()
+
+    for stage in args.stages:
+        if stage in REQUIRES and not set(REQUIRES[stage]) & set(args.stages):
+            sys.exit(f"[ERROR] Stage {stage} needs {' or '.join(REQUIRES[stage])} to run first")
+
+    document = run_suite(args)
+    output = args.output or os.path.join(RESULTS_DIR, f"{document['meta']['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    print(f"[SUCCESS] Results written to {output}")
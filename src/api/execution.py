@@ -0,0 +1,303 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+import duckdb
+from utils.db_utils import POOL_SIZE
+
+# Constants
+QUERY_WORKERS = POOL_SIZE            # Threads running DuckDB queries; one per pooled cursor
+QUERY_QUEUE_LIMIT = 32               # Admitted queries that may wait for a worker before new ones get a 429
+QUEUE_WAIT_SECONDS = 5.0             # Longest a query may wait for a worker before it fails with a 503
+RETRY_AFTER_SECONDS = 1              # Retry-After sent with 429 and 503 responses
+
+
+class OverloadedError(Exception):
+    """
+    Raised when the query queue is full and a request is turned away (429).
+    """
+
+
+class QueueTimeoutError(Exception):
+    """
+    Raised when an admitted query waited too long for a worker (503).
+    """
+
+
+class QueryTimeoutError(Exception):
+    """
+    Raised when a query ran past its KPI's timeout and was interrupted (504).
+    """
+
+
+class QueryDeadline:
+    """
+    Interrupts a query's DuckDB cursor once its time budget is spent.
+
+    `guard` is passed down to the query helpers in `utils.db_utils`; the
+    cursor is only interruptible while it is executing this query, so a
+    late expiry never hits a cursor already handed to another request.
+    """
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.cursor = None
+        self.expired = False
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def start(self):
+        self.timer = threading.Timer(self.seconds, self.expire)
+        self.timer.daemon = True
+        self.timer.start()
+
+    def stop(self):
+        if self.timer is not None:
+            self.timer.cancel()
+
+    def expire(self):
+        with self.lock:
+            self.expired = True
+            if self.cursor is not None:
+                self.cursor.interrupt()
+
+    @contextmanager
+    def guard(self, cursor):
+        with self.lock:
+            if self.expired:
+                raise QueryTimeoutError(f"Query exceeded its {self.seconds:g}s timeout")
+            self.cursor = cursor
+        try:
+            yield
+        except duckdb.InterruptException as e:
+            raise QueryTimeoutError(f"Query exceeded its {self.seconds:g}s timeout") from e
+        finally:
+            with self.lock:
+                self.cursor = None
+
+
+class StreamLease:
+    """
+    What a streamed query holds until its stream is closed: its cursor, its
+    admission slot in the executor and its running deadline.
+    """
+
+    def __init__(self, executor, deadline, release):
+        self.executor = executor
+        self.deadline = deadline
+        self.release = release
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def check(self):
+        """
+        Raises QueryTimeoutError once the query's time budget is spent.
+        """
+        if self.deadline.expired:
+            raise QueryTimeoutError(f"Query exceeded its {self.deadline.seconds:g}s timeout")
+
+    def close(self):
+        """
+        Gives everything back; only the first call does anything, from whichever thread.
+        """
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        try:
+            self.release()
+        finally:
+            self.deadline.stop()
+            self.executor._release(self.deadline.expired)
+
+
+def _close_unclaimed(future: Future):
+    """
+    Closes the lease of a stream whose request went away before it could be sent.
+    """
+    if not future.cancelled() and future.exception() is None:
+        future.result()[1].close()
+
+
+class QueryExecutor:
+    """
+    Runs blocking DuckDB work off the event loop with bounded concurrency.
+
+    Queries run on a dedicated pool of `workers` threads, so they can neither
+    starve Starlette's threadpool nor wait on a pooled cursor. At most
+    `queue_limit` more may wait for a worker; beyond that requests are
+    rejected at once, and a query still waiting after `queue_wait` seconds
+    is dropped. Identical concurrent requests (same key) share one
+    execution instead of queueing the same query several times. Streamed
+    results (`open`) keep their admission slot until the stream is closed.
+    """
+
+    def __init__(self, workers=QUERY_WORKERS, queue_limit=QUERY_QUEUE_LIMIT, queue_wait=QUEUE_WAIT_SECONDS):
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.queue_wait = queue_wait
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="duckdb-query")
+        self.lock = threading.Lock()
+        self.pending = 0             # Admitted and not yet finished
+        self.inflight = {}           # key -> Future shared by coalesced requests
+        self.streams = 0             # Streams being sent (admitted, off the workers)
+
+        self.completed = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.queue_timeouts = 0
+        self.timeouts = 0
+
+    async def run(self, fn, timeout_seconds, key=None):
+        """
+        Runs `fn(guard)` on a query worker and awaits its result.
+
+        Args:
+            fn (Callable): Does the work; receives the deadline's guard to
+                pass to `run_query_arrow`/`query_batches`.
+            timeout_seconds (float): Execution budget once a worker picks it up.
+            key (Hashable, optional): Requests with equal keys running at the
+                same time share one execution; None disables coalescing.
+
+        Returns:
+            Any: What `fn` returned.
+
+        Raises:
+            OverloadedError: If the queue is full.
+            QueueTimeoutError: If no worker became free within `queue_wait`.
+            QueryTimeoutError: If the query was interrupted at its timeout.
+        """
+        return await self._wait(self.submit(fn, timeout_seconds, key))
+
+    async def open(self, fn, timeout_seconds):
+        """
+        Runs `fn(guard)` for a result that is consumed after it returns, e.g. a record batch stream.
+
+        Unlike `run`, the query keeps its admission slot and its deadline keeps
+        running until the returned lease is closed, so streams count against
+        the queue limit and cannot outlive the timeout. `fn` returns
+        `(result, release)`; closing the lease calls `release`.
+
+        Args:
+            fn (Callable): Does the work, see `run`.
+            timeout_seconds (float): Budget for the execution and the streaming together.
+
+        Returns:
+            Tuple[Any, StreamLease]: The result and its lease.
+
+        Raises:
+            The same errors as `run`.
+        """
+        future = self.submit(fn, timeout_seconds, hold=True)
+        try:
+            return await self._wait(future)
+        except asyncio.CancelledError:
+            future.add_done_callback(_close_unclaimed)
+            raise
+
+    async def _wait(self, future: Future):
+        """
+        Awaits a submitted query, dropping it if no worker picked it up within `queue_wait`.
+
+        The wait is enforced here rather than when a worker dequeues the job,
+        so a request is answered on time even while every worker stays busy.
+        """
+        # Shielded so a disconnecting client does not cancel work other requests share
+        wrapped = asyncio.wrap_future(future)
+        try:
+            return await asyncio.wait_for(asyncio.shield(wrapped), self.queue_wait)
+        except asyncio.TimeoutError:
+            if future.cancel():  # Fails once a worker is running it; then it is bounded by its deadline
+                with self.lock:
+                    self.queue_timeouts += 1
+                raise QueueTimeoutError(f"Waited {self.queue_wait:g}s for a query worker")
+        except asyncio.CancelledError:
+            if future.cancelled() and not asyncio.current_task().cancelling():
+                # A coalesced request dropped the query it shared with this one
+                raise QueueTimeoutError(f"Waited {self.queue_wait:g}s for a query worker")
+            raise
+        return await asyncio.shield(wrapped)
+
+    def submit(self, fn, timeout_seconds, key=None, hold=False):
+        """
+        Admits `fn` and returns a future of its result (see `run`, and `open` for `hold`).
+        """
+        with self.lock:
+            future = self.inflight.get(key) if key is not None else None
+            if future is not None:
+                self.coalesced += 1
+                return future
+            if self.pending >= self.workers + self.queue_limit:
+                self.rejected += 1
+                raise OverloadedError(f"{self.pending} queries already admitted")
+            self.pending += 1
+            future = self.pool.submit(self._execute, fn, timeout_seconds, time.monotonic(), hold)
+            if key is not None:
+                self.inflight[key] = future
+        future.add_done_callback(lambda done: self._finished(key, done, hold))
+        return future
+
+    def _execute(self, fn, timeout_seconds, submitted_at, hold=False):
+        # Picked up just as its waiter gave up, before it could cancel the job
+        waited = time.monotonic() - submitted_at
+        if waited > self.queue_wait:
+            with self.lock:
+                self.queue_timeouts += 1
+            raise QueueTimeoutError(f"Waited {waited:.1f}s for a query worker")
+
+        deadline = QueryDeadline(timeout_seconds)
+        deadline.start()
+        lease = None
+        try:
+            result = fn(deadline.guard)
+            if not hold:
+                return result
+            result, release = result
+            lease = StreamLease(self, deadline, release)
+            return result, lease
+        except QueryTimeoutError:
+            with self.lock:
+                self.timeouts += 1
+            raise
+        finally:
+            if lease is None:
+                deadline.stop()
+
+    def _finished(self, key, future: Future, hold=False):
+        with self.lock:
+            if hold and not future.cancelled() and future.exception() is None:
+                self.streams += 1
+                return  # Still admitted until its lease is closed
+            self.pending -= 1
+            self.completed += 1
+            if key is not None and self.inflight.get(key) is future:
+                del self.inflight[key]
+
+    def _release(self, timed_out):
+        with self.lock:
+            self.streams -= 1
+            self.pending -= 1
+            self.completed += 1
+            if timed_out:
+                self.timeouts += 1
+
+    def stats(self):
+        """
+        Returns the executor's queue depth and outcome counters.
+        """
+        with self.lock:
+            return {
+                "workers": self.workers,
+                "queue_limit": self.queue_limit,
+                "pending": self.pending,
+                "streams": self.streams,
+                "completed": self.completed,
+                "coalesced": self.coalesced,
+                "rejected": self.rejected,
+                "queue_timeouts": self.queue_timeouts,
+                "timeouts": self.timeouts,
+            }
+
+    def shutdown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
@@ -1,11 +1,35 @@
-from fastapi import FastAPI, Query, Request
-from utils.metrics import evaluate_kpi
+import asyncio
+import hmac
+from contextlib import ExitStack, asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from pydantic import ValidationError
+from utils.db_utils import CursorTimeoutError, get_pool, query_batches
+from utils.defaults import ADMIN_TOKEN
+from utils.kpi_cache import normalize_params
+from utils.instrumentation import CONTENT_TYPE, REGISTRY, Counter, Histogram, StatsCollector
+from utils.metrics import KpiNotFoundError, evaluate_kpi_table, resolve_kpi, run_kpi, kpi_cache, kpi_registry
+from models.kpi_requests import KpiBatchRequest
+from api.execution import (RETRY_AFTER_SECONDS, OverloadedError, QueryExecutor, QueryTimeoutError,
+                           QueueTimeoutError)
+from api.responses import (MEDIA_TYPES, RESERVED_PARAMS, STREAMING_FORMATS, BatchStream, decode_cursor,
+                           encode_cursor, negotiate_format, parse_limit, table_response)
 
 # Initialize FastAPI app
 app = FastAPI()
 
+# Runs every KPI query; bounded so slow KPIs cannot take the whole API down
+query_executor = QueryExecutor()
+
+# Metrics, served at /metrics
+KPI_REQUESTS = Counter("api_kpi_requests_total", "KPI evaluations by outcome", ["kpi", "status"])
+KPI_SECONDS = Histogram("api_kpi_query_seconds", "Time to evaluate a KPI on a query worker", ["kpi"])
+StatsCollector("api_kpi_cache", kpi_cache.stats, "KPI result cache counters")
+StatsCollector("api_query_executor", query_executor.stats, "KPI query executor queue and outcomes")
+
 @app.get("/kpi/{kpi_id}")
-def fetch_kpi(kpi_id: str, request: Request):
+async def fetch_kpi(kpi_id: str, request: Request):
     """
     API endpoint to fetch a KPI value based on a configured metric.
 
@@ -22,7 +46,29 @@ def fetch_kpi(kpi_id: str, request: Request):
     KPI: Event Counts by Offset (kpi_id=event_count_offset)
     URL: http://0.0.0.0:9000/kpi/event_count_offset?offset=500
     Returns the total number of GitHub events (Watch, Issues, PR) that occurred in the last N minutes.
-    Accepts a query parameter `offset` (in minutes).
+    Accepts a query parameter `offset` (in minutes, 1 to 10080, default 60).
+
+    Parameters are validated against the types and bounds declared in metrics.yaml;
+    unknown or invalid parameters are rejected with a 422.
+
+
+    Response format is chosen with `format=` or the Accept header:
+      - records (default): {"id", "name", "visualisation", "data": [{column: value}, ...]}
+      - split: same envelope with "columns": [...] and "data": [[row values], ...]
+      - arrow: Arrow IPC stream (application/vnd.apache.arrow.stream)
+      - parquet: a Parquet file (application/vnd.apache.parquet)
+      - ndjson: one JSON object per row (application/x-ndjson)
+    Without pagination, arrow and ndjson are streamed batch by batch straight from DuckDB;
+    the KPI's timeout covers the whole stream, which is cut off once it runs out.
+
+    Pagination: `limit=N` returns the first N rows and a `next_cursor` (JSON body, or the
+    X-Next-Cursor header for binary formats); pass it back as `cursor=` for the next page.
+    A cursor issued before new data was published is rejected with a 409.
+
+    Queries run on a dedicated, bounded DuckDB executor and are interrupted after the
+    KPI's `timeout_seconds`. Identical concurrent requests share one query. Status codes:
+    404 unknown KPI, 422 invalid parameters, 429 queue full, 503 no worker or cursor free in time,
+    504 query timed out, 500 query failed.
 
 
     Args:
@@ -30,14 +76,262 @@ def fetch_kpi(kpi_id: str, request: Request):
         request (Request): FastAPI's Request object, used to capture query params.
 
     Returns:
-        dict: The result of the evaluated KPI, or an error message if evaluation fails.
+        dict or Response: The result of the evaluated KPI.
+
+    Raises:
+        HTTPException: With the status codes listed above.
     """
     query_params = dict(request.query_params)  # Capture URL query parameters
+    reserved = {name: query_params.pop(name, None) for name in RESERVED_PARAMS}
+    fmt = negotiate_format(reserved["format"], request.headers.get("accept"))
+    limit = parse_limit(reserved["limit"])
 
     try:
-        # Delegate KPI evaluation to a utility function
-        result = evaluate_kpi(kpi_id, query_params)
-        return result
+        # Validate before queueing anything, so bad requests fail fast
+        entry, bound = resolve_kpi(kpi_id, query_params)
+        timeout = entry.kpi.timeout_seconds
+
+        if limit is None and reserved["cursor"] is None and fmt in STREAMING_FORMATS:
+            reader, lease = await query_executor.open(timed(kpi_id, lambda guard: open_stream(entry, bound, guard)),
+                                                      timeout)
+            KPI_REQUESTS.inc(kpi=kpi_id, status=200)
+            stream = BatchStream(reader, fmt, lease)
+            return StreamingResponse(stream, media_type=MEDIA_TYPES[fmt], background=BackgroundTask(stream.close))
+
+        # Delegate KPI evaluation to a utility function, sharing it with identical concurrent requests.
+        # The snapshot is pinned so the sharing key, the result and the page cursor all name the same data
+        async with pinned_snapshot() as snapshot:
+            key = (kpi_id, normalize_params(bound), snapshot.version)
+            kpi, table = await query_executor.run(
+                timed(kpi_id, lambda guard: evaluate_kpi_table(kpi_id, query_params, guard, snapshot)),
+                timeout, key=key)
     except Exception as e:
-        # Handle and return any errors gracefully
-        return {"error": str(e)}
\ No newline at end of file
+        raise kpi_error(kpi_id, e)
+    KPI_REQUESTS.inc(kpi=kpi_id, status=200)
+
+    if limit is None and reserved["cursor"] is None:
+        return table_response(kpi, table, fmt)
+
+    version = snapshot.version
+    offset = decode_cursor(reserved["cursor"], version) if reserved["cursor"] else 0
+    end = table.num_rows if limit is None else offset + limit
+    next_cursor = encode_cursor(end, version) if end < table.num_rows else None
+    return table_response(kpi, table.slice(offset, end - offset), fmt, next_cursor)
+
+
+def kpi_error(kpi_id, e):
+    """
+    Maps an exception raised while evaluating a KPI to the HTTP error to respond with,
+    counting the outcome in `api_kpi_requests_total`.
+
+    Args:
+        kpi_id (str): The KPI being evaluated.
+        e (Exception): What was raised.
+
+    Returns:
+        HTTPException: Error with the matching status code.
+    """
+    if isinstance(e, KpiNotFoundError):
+        # Don't let arbitrary ids become metric labels
+        KPI_REQUESTS.inc(kpi="unknown", status=404)
+        return HTTPException(status_code=404, detail=str(e))
+    error = http_error(kpi_id, e)
+    KPI_REQUESTS.inc(kpi=kpi_id, status=error.status_code)
+    return error
+
+
+def http_error(kpi_id, e):
+    """
+    Maps an evaluation exception other than an unknown KPI to an HTTPException (see `kpi_error`).
+    """
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, ValidationError):
+        # Unknown, mistyped or out-of-range parameters
+        return HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    if isinstance(e, OverloadedError):
+        return HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    if isinstance(e, (QueueTimeoutError, CursorTimeoutError)):
+        return HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER_SECONDS)})
+    if isinstance(e, QueryTimeoutError):
+        return HTTPException(status_code=504, detail=str(e))
+    print(f"[ERROR] KPI '{kpi_id}' failed: {e}")
+    return HTTPException(status_code=500, detail=str(e))
+
+
+@asynccontextmanager
+async def pinned_snapshot():
+    """
+    Pins the pool's current snapshot (see `ConnectionPool.pinned`) without blocking the event loop.
+
+    Pinning may open a newly published snapshot, and unpinning may close the
+    one it replaced, so both run on a thread.
+
+    Yields:
+        PinnedSnapshot: The pinned snapshot.
+    """
+    pin = get_pool().pinned()
+    entering = asyncio.ensure_future(asyncio.to_thread(pin.__enter__))
+    try:
+        snapshot = await asyncio.shield(entering)
+    except asyncio.CancelledError:
+        entering.add_done_callback(lambda done: _unpin_unclaimed(pin, done))
+        raise
+    try:
+        yield snapshot
+    finally:
+        await asyncio.shield(asyncio.to_thread(pin.__exit__, None, None, None))
+
+
+def _unpin_unclaimed(pin, entered):
+    """
+    Unpins a snapshot whose request went away while it was being pinned.
+    """
+    if not entered.cancelled() and entered.exception() is None:
+        asyncio.ensure_future(asyncio.to_thread(pin.__exit__, None, None, None))
+
+
+def timed(kpi_id, fn):
+    """
+    Wraps a query worker function so its duration is recorded per KPI.
+    """
+    def run(guard):
+        with KPI_SECONDS.time(kpi=kpi_id):
+            return fn(guard)
+    return run
+
+
+def open_stream(entry, bound, guard):
+    """
+    Executes a KPI and returns a reader over its record batches, for streaming without materializing it.
+
+    The query runs before the response starts, so errors still surface as
+    normal responses. The pooled cursor stays borrowed, and the deadline guard
+    entered, until the returned function is called.
+
+    Returns:
+        Tuple[pyarrow.RecordBatchReader, Callable]: The reader and what gives the cursor back once streamed.
+    """
+    stack = ExitStack()
+    try:
+        reader = run_kpi(entry, lambda statement: stack.enter_context(query_batches(statement, bound, guard=guard)))
+    except BaseException:
+        stack.close()
+        raise
+    return reader, stack.close
+
+
+@app.post("/kpi:batch")
+async def fetch_kpi_batch(batch: KpiBatchRequest):
+    """
+    API endpoint evaluating several KPIs in one round trip.
+
+    URL: http://0.0.0.0:9000/kpi:batch (POST)
+    Body: {"kpis": [{"id": "event_count_offset", "params": {"offset": 50}}, {"id": "avg_pr_time"}]}
+
+    All KPIs are evaluated on the same snapshot, so their results are consistent
+    with each other, and run in parallel on the query executor. Each result carries
+    its own `status`: 200 with the KPI's `data`, or the status code `/kpi/{kpi_id}`
+    would have returned with an `error`.
+
+    Args:
+        batch (KpiBatchRequest): The KPIs and their parameters.
+
+    Returns:
+        dict: The snapshot's `version` and one result per requested KPI, in request order.
+    """
+    try:
+        async with pinned_snapshot() as snapshot:
+            outcomes = await asyncio.gather(*(evaluate_in_batch(item, snapshot) for item in batch.kpis),
+                                            return_exceptions=True)
+    except Exception as e:
+        raise kpi_error("batch", e)  # No snapshot to evaluate the batch on
+
+    results = []
+    for item, outcome in zip(batch.kpis, outcomes):
+        if isinstance(outcome, Exception):
+            error = kpi_error(item.id, outcome)
+            results.append({"id": item.id, "status": error.status_code, "error": error.detail})
+        else:
+            results.append(dict(table_response(*outcome, "records"), status=200))
+    return {"version": snapshot.version, "results": results}
+
+
+async def evaluate_in_batch(item, snapshot):
+    """
+    Evaluates one KPI of a batch on the batch's snapshot.
+
+    Returns:
+        Tuple[Metric, pa.Table]: The KPI definition and its result.
+    """
+    entry, bound = resolve_kpi(item.id, item.params)
+    key = (item.id, normalize_params(bound), snapshot.version)
+    result = await query_executor.run(
+        timed(item.id, lambda guard: evaluate_kpi_table(item.id, item.params, guard, snapshot)),
+        entry.kpi.timeout_seconds, key=key)
+    KPI_REQUESTS.inc(kpi=item.id, status=200)
+    return result
+
+
+@app.get("/cache/stats")
+def cache_stats():
+    """
+    API endpoint reporting the KPI result cache's hit/miss counters and size.
+
+    URL: http://0.0.0.0:9000/cache/stats
+
+    Returns:
+        dict: Hits, misses, hit rate, expirations, evictions, entries and bytes used.
+    """
+    return kpi_cache.stats()
+
+
+@app.get("/executor/stats")
+def executor_stats():
+    """
+    API endpoint reporting the KPI query executor's queue depth and outcomes.
+
+    URL: http://0.0.0.0:9000/executor/stats
+
+    Returns:
+        dict: Workers, queue limit, pending queries, and completed/coalesced/rejected/timed-out counts.
+    """
+    return query_executor.stats()
+
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """
+    API endpoint exposing the API's metrics in the Prometheus text format.
+
+    URL: http://0.0.0.0:9000/metrics
+
+    Returns:
+        Response: Request counts and query durations per KPI, plus the cache and executor stats.
+    """
+    return Response(REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
+@app.post("/admin/reload-kpis")
+def reload_kpis(x_admin_token: str = Header(None)):
+    """
+    API endpoint forcing metrics.yaml to be reloaded without waiting for the mtime check.
+
+    URL: http://0.0.0.0:9000/admin/reload-kpis (POST, header `X-Admin-Token`)
+
+    Disabled (404) unless the `ADMIN_TOKEN` environment variable is set; requests
+    must send it in the `X-Admin-Token` header (401 otherwise).
+
+    Returns:
+        dict: Whether the new config was installed, the loaded KPI ids and, if it
+        was rejected, why (`last_error`).
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled; set ADMIN_TOKEN to enable them")
+    if x_admin_token is None or not hmac.compare_digest(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Missing or invalid X-Admin-Token header")
+    try:
+        reloaded = kpi_registry.reload()
+    except Exception:
+        reloaded = False  # Nothing loaded yet; `reload` recorded the error in `last_error`
+    return {"reloaded": reloaded, **kpi_registry.status()}
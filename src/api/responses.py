@@ -0,0 +1,218 @@
+import io
+import json
+import base64
+import weakref
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from api.execution import QueryTimeoutError
+
+# Constants
+MAX_PAGE_ROWS = 10_000               # Largest `limit` accepted for a page
+RESERVED_PARAMS = ("format", "limit", "cursor")   # Query params consumed by the API, not the KPI
+
+# Response formats and their media types
+MEDIA_TYPES = {
+    "records": "application/json",
+    "split": "application/json",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+    "ndjson": "application/x-ndjson",
+}
+STREAMING_FORMATS = ("arrow", "ndjson")
+ACCEPT_FORMATS = {
+    "application/vnd.apache.arrow.stream": "arrow",
+    "application/vnd.apache.parquet": "parquet",
+    "application/x-parquet": "parquet",
+    "application/x-ndjson": "ndjson",
+    "application/json": "records",
+}
+
+
+def negotiate_format(requested, accept):
+    """
+    Picks the response format from an explicit `format` param or the Accept header.
+
+    Args:
+        requested (str, optional): Value of the `format` query parameter.
+        accept (str, optional): The request's Accept header.
+
+    Returns:
+        str: One of MEDIA_TYPES' keys; "records" when nothing specific was asked for.
+
+    Raises:
+        HTTPException: 406 for an unknown `format` value.
+    """
+    if requested:
+        if requested not in MEDIA_TYPES:
+            raise HTTPException(status_code=406, detail=f"Unsupported format '{requested}', "
+                                                        f"expected one of {sorted(MEDIA_TYPES)}")
+        return requested
+    for media_range in (accept or "").split(","):
+        media_type = media_range.split(";")[0].strip().lower()
+        if media_type in ACCEPT_FORMATS:
+            return ACCEPT_FORMATS[media_type]
+    return "records"
+
+
+def encode_cursor(offset, version):
+    """
+    Builds the opaque cursor pointing at the next page of a result.
+    """
+    return base64.urlsafe_b64encode(json.dumps({"offset": offset, "version": version}).encode()).decode()
+
+
+def decode_cursor(cursor, version):
+    """
+    Reads the row offset from a cursor, checking that the data has not changed since.
+
+    Args:
+        cursor (str): Cursor from a previous page's `next_cursor`.
+        version (str): Current data version.
+
+    Returns:
+        int: Offset of the first row of the page.
+
+    Raises:
+        HTTPException: 422 for a malformed cursor, 409 if new data was published since.
+    """
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        offset = int(state["offset"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=422, detail="Malformed cursor")
+    if state.get("version") != version:
+        raise HTTPException(status_code=409, detail="Data changed since this cursor was issued; restart from the first page")
+    return offset
+
+
+def parse_limit(limit):
+    """
+    Validates the `limit` query parameter.
+
+    Returns:
+        int or None: Page size, or None when the whole result is requested.
+    """
+    if limit is None:
+        return None
+    try:
+        value = int(limit)
+    except ValueError:
+        value = 0
+    if not 1 <= value <= MAX_PAGE_ROWS:
+        raise HTTPException(status_code=422, detail=f"limit must be an integer between 1 and {MAX_PAGE_ROWS}")
+    return value
+
+
+def table_response(kpi, table, fmt, next_cursor=None):
+    """
+    Renders a complete KPI result in the requested format.
+
+    Args:
+        kpi (Metric): KPI definition (for the JSON envelope).
+        table (pa.Table): The result (or one page of it).
+        fmt (str): Response format.
+        next_cursor (str, optional): Cursor of the following page, if any.
+
+    Returns:
+        Response or dict: `records` is returned as a dict for FastAPI to encode.
+    """
+    envelope = {"id": kpi.id, "name": kpi.name, "visualisation": kpi.visualisation}
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+
+    if fmt == "records":
+        body = dict(envelope, data=table.to_pylist())
+        if next_cursor:
+            body["next_cursor"] = next_cursor
+        return body
+
+    if fmt == "split":
+        columns = [table.column(name).to_pylist() for name in table.column_names]
+        body = dict(envelope, columns=table.column_names, data=[list(row) for row in zip(*columns)])
+        if next_cursor:
+            body["next_cursor"] = next_cursor
+        return JSONResponse(jsonable_encoder(body), headers=headers)
+
+    if fmt == "parquet":
+        sink = io.BytesIO()
+        pq.write_table(table, sink)
+        return Response(sink.getvalue(), media_type=MEDIA_TYPES[fmt], headers=headers)
+
+    return StreamingResponse(stream_batches(table.schema, table.to_batches(), fmt),
+                             media_type=MEDIA_TYPES[fmt], headers=headers)
+
+
+def stream_batches(schema, batches, fmt, on_close=None):
+    """
+    Encodes record batches as they arrive: an Arrow IPC stream or NDJSON lines.
+
+    Args:
+        schema (pa.Schema): Schema of the batches.
+        batches (Iterable[pa.RecordBatch]): Batches to send.
+        fmt (str): "arrow" or "ndjson".
+        on_close (Callable, optional): Called once the stream ends or the client goes away.
+
+    Yields:
+        bytes: Response body chunks.
+    """
+    try:
+        if fmt == "ndjson":
+            for batch in batches:
+                yield "".join(json.dumps(row, default=str) + "\n" for row in batch.to_pylist()).encode()
+            return
+
+        sink = io.BytesIO()
+        with pa.ipc.new_stream(sink, schema) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+                yield _drain(sink)
+        yield _drain(sink)
+    finally:
+        if on_close is not None:
+            on_close()
+
+
+class BatchStream:
+    """
+    Response body sending a streamed query's record batches, which closes its lease exactly once.
+
+    The lease (and with it the pooled cursor) is released when the stream
+    ends or fails, by the response's background task once it is sent, or at
+    the latest when the stream is garbage collected, e.g. if the response was
+    never iterated. The lease's deadline is checked before every batch, so a
+    slow client cannot keep the cursor past the KPI's timeout; the response
+    is then cut off, since its status was already sent.
+    """
+
+    def __init__(self, reader, fmt, lease):
+        self.reader = reader
+        self.fmt = fmt
+        self.lease = lease
+        self._finalizer = weakref.finalize(self, lease.close)
+
+    def __iter__(self):
+        return stream_batches(self.reader.schema, self._batches(), self.fmt, on_close=self.close)
+
+    def _batches(self):
+        try:
+            for batch in self.reader:
+                self.lease.check()
+                yield batch
+        except duckdb.InterruptException as e:
+            raise QueryTimeoutError("Query exceeded its timeout while streaming") from e
+
+    def close(self):
+        self._finalizer()
+
+
+def _drain(sink):
+    """
+    Returns what the IPC writer has produced so far and resets the buffer.
+    """
+    chunk = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return chunk
@@ -0,0 +1,65 @@
+import os
+import time
+import argparse
+from utils.defaults import *
+from utils.file_ops import load_yaml_file
+from utils.compaction import compact_event_type, TARGET_FILE_BYTES
+from utils.silver_schema import load_event_schemas
+
+# Constants
+COMPACTION_INTERVAL_SECONDS = 300    # How often live mode compacts
+
+
+def compact_silver(silver_dir_path: str = None, target_bytes: int = TARGET_FILE_BYTES):
+    """
+    Compacts the small Parquet files of every event type in the silver layer.
+
+    Loose files written by transform are merged with undersized compacted
+    files into `<EventType>/date=YYYY-MM-DD/hour=HH/` partitions, sorted by
+    `repo.name, created_at` for row-group pruning. Event types configured in
+    filtered_events.yaml are written with their declared schema. Manifest
+    entries of files whose bronze source (in the sibling bronze folder) is
+    gone are pruned.
+
+    Args:
+        silver_dir_path (str, optional): Silver directory; defaults to the configured storage path.
+        target_bytes (int): Target in-memory size per compacted file.
+    """
+    silver_dir_path = silver_dir_path or os.path.join(BASE_STORAGE_PATH, SILVER_DIR)
+    bronze_dir_path = os.path.join(os.path.dirname(os.path.abspath(silver_dir_path)), BRONZE_DIR)
+    schemas = load_event_schemas(load_yaml_file(os.path.join(BASE_PATH, CONFIG_FOLDER, "filtered_events.yaml")))
+
+    for event_type in os.listdir(silver_dir_path):
+        event_dir = os.path.join(silver_dir_path, event_type)
+        if not os.path.isdir(event_dir):
+            continue
+
+        try:
+            result = compact_event_type(event_dir, event_type, target_bytes, schemas.get(event_type),
+                                        bronze_dir=os.path.join(bronze_dir_path, event_type))
+            if result["inputs"]:
+                print(f"[INFO] Compacted {event_type}: {result['inputs']} files -> "
+                      f"{result['outputs']} files ({result['rows']} rows)")
+        except Exception as e:
+            print(f"[ERROR] Failed to compact {event_type}: {e}")
+
+
+# CLI entry point
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--live", action="store_true", help="Keep compacting the silver layer on an interval"
+    )
+    parser.add_argument(
+        "--interval", type=int, default=COMPACTION_INTERVAL_SECONDS, help="Seconds between compactions in live mode"
+    )
+    args = parser.parse_args()
+
+    if args.live:
+        while True:
+            compact_silver()
+            time.sleep(args.interval)
+    else:
+        compact_silver()
+
+    print("[INFO] Silver compaction complete.")
@@ -1,16 +1,24 @@
 #%%
 import time
+import json
+import signal
 import argparse
-import requests
 import os
-import json
-from datetime import datetime
+import threading
 from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timezone
 from utils.defaults import (
     INTERESTED_TYPES, EVENT_DUMP_FILE,
-    BRONZE_DIR, BASE_STORAGE_PATH
+    BRONZE_DIR, STATE_DIR, METRICS_DIR, BASE_STORAGE_PATH
 )
-from utils.file_ops import write_json_to_file
+from utils.bronze_writer import BronzeSegmentWriter
+from utils.github_client import GitHubEventsClient, event_id
+from utils.dedup import SeenIdIndex
+from utils.flushing import FlushPolicy, BackgroundWriter
+from utils.file_ops import load_json_file, write_json_atomic
+from utils.gharchive import list_archives, backfill_archive
+from utils.instrumentation import Counter, Gauge, Histogram, StatsCollector, TextfileExporter, write_textfile, log_timing
 
 #%%
 # Buffers to temporarily hold fetched events before writing to disk
@@ -22,6 +30,55 @@ pr_event_buffer = deque()
 EVENT_THRESHOLD = 10                 # Events per type before flush
 FETCH_INTERVAL_SECONDS = 10          # Frequency of GitHub API requests
 RUN_DURATION = 300                   # Default run time (in seconds) in batch mode
+SEEN_IDS_PATH = os.path.join(BASE_STORAGE_PATH, STATE_DIR, "seen_ids.json")
+BRONZE_COMPRESSION = None            # None, "gzip" or "zstd" for bronze segments
+ARCHIVE_CHECKPOINT = "gharchive_backfill.json"   # Archives already backfilled, under data/state
+
+# Flush limits per event type: whichever of count, size or age is hit first
+FLUSH_POLICIES = {
+    "WatchEvent": FlushPolicy(max_events=EVENT_THRESHOLD, max_bytes=1024 * 1024, max_age_seconds=60),
+    "PullRequestEvent": FlushPolicy(max_events=EVENT_THRESHOLD, max_bytes=1024 * 1024, max_age_seconds=60),
+    "IssuesEvent": FlushPolicy(max_events=EVENT_THRESHOLD, max_bytes=1024 * 1024, max_age_seconds=120),
+}
+
+# One rolling NDJSON segment writer per event type, created on first flush
+bronze_writers = {}
+
+# Background thread that performs the bronze writes (set while fetching)
+background_writer = None
+
+# Approximate JSON size and first-arrival time of each buffer's contents
+buffer_bytes = {event_type: 0 for event_type in INTERESTED_TYPES}
+buffer_started = {event_type: None for event_type in INTERESTED_TYPES}
+
+# Per-run ingestion counters, reported after every poll cycle
+ingest_stats = {
+    "cycles": 0,
+    "pages_fetched": 0,
+    "events_fetched": 0,
+    "gaps_detected": 0,
+    "events_deduped": 0,
+}
+
+# Seen-id index of the running ingestion (set while fetching)
+active_seen_index = None
+
+# Metrics, written to data/metrics/ingest.prom while fetching
+EVENTS_FETCHED = Counter("ingest_events_fetched_total", "Events returned by the GitHub API")
+EVENTS_DEDUPED = Counter("ingest_events_deduped_total", "Fetched events dropped as already ingested")
+EVENTS_ROUTED = Counter("ingest_events_routed_total", "Events routed to a buffer", ["event_type"])
+EVENTS_FLUSHED = Counter("ingest_events_flushed_total", "Events written to bronze", ["event_type"])
+ARCHIVES_BACKFILLED = Counter("ingest_archives_backfilled_total", "GH Archive files split into event types")
+ARCHIVE_EVENTS = Counter("ingest_archive_events_total", "Events kept from GH Archive files", ["event_type"])
+ARCHIVE_SECONDS = Histogram("ingest_archive_seconds", "Time to backfill one GH Archive file")
+POLL_SECONDS = Histogram("ingest_poll_seconds", "Duration of one poll cycle over all pages")
+FLUSH_SECONDS = Histogram("ingest_flush_seconds", "Time to write one batch to bronze", ["event_type"])
+BUFFER_DEPTH = Gauge("ingest_buffer_depth", "Events waiting in a buffer", ["event_type"])
+StatsCollector("ingest_run", lambda: ingest_stats, "Counters of the current ingestion run")
+StatsCollector("ingest_dedup", lambda: active_seen_index.stats() if active_seen_index else {},
+               "Seen-id index counters")
+StatsCollector("ingest_writer", lambda: background_writer.stats() if background_writer else {},
+               "Background bronze writer counters")
 
 # Mapping event types to their respective buffers
 event_router = {
@@ -31,87 +88,331 @@ event_router = {
 }
 
 #%%
-def fetch_github_events(duration: int = RUN_DURATION, live: bool = False):
+def fetch_github_events(duration: int = RUN_DURATION, live: bool = False, client: GitHubEventsClient = None,
+                        seen_index: SeenIdIndex = None):
     """
     Fetches GitHub events and stores them in a bronze layer.
 
     Args:
         duration (int): Time to run the ingestion in batch mode (ignored in live mode).
         live (bool): If True, runs indefinitely. Otherwise, runs for the given duration.
+        client (GitHubEventsClient, optional): Polling client; a pooled default is created if omitted.
+        seen_index (SeenIdIndex, optional): Seen-id index; loaded from SEEN_IDS_PATH if omitted.
 
-    Fetches events from the GitHub API every FETCH_INTERVAL_SECONDS, stores
-    them in memory until the EVENT_THRESHOLD is met, then flushes to disk.
+    Each cycle pulls every available page of the GitHub API (concurrently,
+    stopping once it reaches an event already seen) and waits as long as the
+    response headers ask for (never less than FETCH_INTERVAL_SECONDS). Events
+    already ingested (by this run or a previous one) are dropped before
+    routing. Buffers are flushed according to FLUSH_POLICIES and the disk
+    writes happen on a background thread, so polling never waits on I/O.
+    SIGTERM triggers the same clean drain as a normal exit.
     """
+    global background_writer, active_seen_index
+
+    client = client or GitHubEventsClient(min_interval=FETCH_INTERVAL_SECONDS)
+    if seen_index is None:
+        seen_index = SeenIdIndex(state_path=SEEN_IDS_PATH)
+    active_seen_index = seen_index
+    last_seen_id = seen_index.high_water()
+
+    background_writer = BackgroundWriter(write_bronze_batch, tick_fn=roll_due_segments).start()
+    exporter = TextfileExporter("ingest", metrics_dir=os.path.join(BASE_STORAGE_PATH, METRICS_DIR)).start()
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, handle_sigterm)
+
     try:
         start_time = time.time()
         elapsed = time.time() - start_time
 
-        while live or elapsed < duration:        
+        while live or elapsed < duration:
             print("[INFO] Fetching GitHub events...")
 
+            result = None
             try:
-                res = requests.get(
-                    "https://api.github.com/events",
-                    headers={"User-Agent": "GitMonitor"}
-                )
+                with POLL_SECONDS.time():
+                    result = client.poll_all_pages(last_seen_id=last_seen_id)
+                EVENTS_FETCHED.inc(len(result.events))
+                ingest_stats["cycles"] += 1
+                ingest_stats["pages_fetched"] += result.pages_fetched
+                ingest_stats["events_fetched"] += len(result.events)
+                if result.gap_detected:
+                    ingest_stats["gaps_detected"] += 1
+                    print(f"[WARN] Gap detected: oldest fetched event "
+                          f"{event_id(result.events[-1]) if result.events else None} "
+                          f"is newer than last stored event {last_seen_id}")
+
+                if result.status_code == 200:
+                    if result.events:
+                        last_seen_id = max(last_seen_id or 0, event_id(result.events[0]))
 
-                if res.status_code == 200:
-                    for event in res.json():
-                        event_type = event.get("type")
-                        if event_type in INTERESTED_TYPES:
-                            event_router[event_type].append(event)
+                    # New ids are saved only once the writer has written their events
+                    new_events = seen_index.filter_new(result.events, pending=True)
+                    ingest_stats["events_deduped"] += len(result.events) - len(new_events)
+                    EVENTS_DEDUPED.inc(len(result.events) - len(new_events))
 
+                    dropped = [event.get("id") for event in new_events if not route_event(event)]
+                    seen_index.confirm(dropped)
+
+                    print(f"Cycle | pages: {result.pages_fetched}, new events: {len(new_events)}, "
+                          f"gap: {result.gap_detected}")
+                    dedup = seen_index.stats()
+                    print(f"Dedup | hit rate: {dedup['hit_rate']:.2%}, ids: {dedup['size']}, "
+                          f"memory: {dedup['memory_bytes'] / 1024:.0f} KiB")
                     print(f"Buffer lengths | WatchEvent: {len(watch_event_buffer)}, "
                           f"PullRequestEvent: {len(pr_event_buffer)}, "
                           f"IssuesEvent: {len(issues_event_buffer)}")
 
-                    # Flush to bronze layer when buffer hits threshold
-                    if len(watch_event_buffer) >= EVENT_THRESHOLD:
-                        flush_to_bronze(watch_event_buffer, "WatchEvent")
-                    if len(pr_event_buffer) >= EVENT_THRESHOLD:
-                        flush_to_bronze(pr_event_buffer, "PullRequestEvent")
-                    if len(issues_event_buffer) >= EVENT_THRESHOLD:
-                        flush_to_bronze(issues_event_buffer, "IssuesEvent")
-                
-                elif res.status_code == 403:
-                    print("GH API limit hit or the connection is unreachable.")
+                elif result.status_code == 304:
+                    print("[INFO] No new events since last poll.")
 
-                time.sleep(FETCH_INTERVAL_SECONDS)
-                elapsed = time.time() - start_time
+                # Flush buffers that hit their count, size or age limit, then persist the ids written so far
+                flush_due_buffers()
+                seen_index.save_if_due()
 
             except Exception as e:
-                print(f"[ERROR] Failed to fetch events: {e}")
+                print(f"[ERROR] Failed to process events: {e}")
+
+            # Never sleep past the end of a batch run
+            elapsed = time.time() - start_time
+            wait_seconds = result.wait_seconds if result is not None else FETCH_INTERVAL_SECONDS
+            wait = wait_seconds if live else min(wait_seconds, max(0, duration - elapsed))
+            time.sleep(wait)
+            elapsed = time.time() - start_time
 
     finally:
-        # Ensure all buffers are flushed on exit
+        # Ensure all buffers are flushed and written on exit
         print("[INFO] Fetching completed. Flushing remaining events...")
-        if len(watch_event_buffer) > 0:
-            flush_to_bronze(watch_event_buffer, "WatchEvent")
-        if len(pr_event_buffer) > 0:
-            flush_to_bronze(pr_event_buffer, "PullRequestEvent")
-        if len(issues_event_buffer) > 0:
-            flush_to_bronze(issues_event_buffer, "IssuesEvent")
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, signal.SIG_IGN)  # Don't let a second SIGTERM cut the drain short
+        flush_due_buffers(force=True)
+        background_writer.close()
+        background_writer = None
+        for writer in bronze_writers.values():
+            writer.close()
+        seen_index.save()
+        client.close()
+        exporter.close()
+        active_seen_index = None
+
+
+def handle_sigterm(signum, frame):
+    """
+    Turns SIGTERM into a normal exit so the `finally:` drain in fetch_github_events runs.
+    """
+    print("[INFO] SIGTERM received. Draining buffers...")
+    raise SystemExit(0)
+
+
+def route_event(event):
+    """
+    Appends an event to its type's buffer, tracking the buffer's size and age.
+
+    Args:
+        event (dict): Raw GitHub event.
+
+    Returns:
+        bool: False if the event's type is not ingested and it was dropped.
+    """
+    event_type = event.get("type")
+    if event_type not in INTERESTED_TYPES:
+        return False
+
+    if not event_router[event_type]:
+        buffer_started[event_type] = time.monotonic()
+    event_router[event_type].append(event)
+    buffer_bytes[event_type] += len(json.dumps(event))
+    EVENTS_ROUTED.inc(event_type=event_type)
+    BUFFER_DEPTH.set(len(event_router[event_type]), event_type=event_type)
+    return True
+
+
+def flush_due_buffers(force: bool = False):
+    """
+    Flushes every buffer whose flush policy says it is due.
+
+    Args:
+        force (bool): If True, flush every non-empty buffer regardless of policy.
+
+    Returns:
+        int: Number of buffers flushed.
+    """
+    now = time.monotonic()
+    flushed = 0
+    for event_type, event_buffer in event_router.items():
+        if not event_buffer:
+            continue
+        age = now - buffer_started[event_type]
+        if force or FLUSH_POLICIES[event_type].should_flush(len(event_buffer), buffer_bytes[event_type], age):
+            flush_to_bronze(event_buffer, event_type)
+            flushed += 1
+    return flushed
 
 #%%
+def get_bronze_writer(event_type):
+    """
+    Returns the segment writer for an event type, creating it on first use.
+
+    Args:
+        event_type (str): Type of GitHub event.
+
+    Returns:
+        BronzeSegmentWriter: Writer appending to that type's bronze folder.
+    """
+    if event_type not in bronze_writers:
+        bronze_writers[event_type] = BronzeSegmentWriter(
+            event_type, os.path.join(BASE_STORAGE_PATH, BRONZE_DIR), compression=BRONZE_COMPRESSION
+        )
+    return bronze_writers[event_type]
+
+
+def write_bronze_batch(event_type, events):
+    """
+    Appends a batch of events to the event type's open NDJSON segment in the bronze directory.
+
+    Segments are sealed (renamed to their final, sequence-numbered name) once
+    they reach the configured size or age, so transform only sees complete files.
+    The events' ids are then confirmed in the running seen-id index, so it saves them.
+
+    Args:
+        event_type (str): Type of GitHub event (used in file naming and pathing).
+        events (List[dict]): Events to write.
+    """
+    started = time.perf_counter()
+    sealed = get_bronze_writer(event_type).append(events)
+    elapsed = time.perf_counter() - started
+    if active_seen_index is not None:
+        active_seen_index.confirm(event.get("id") for event in events)
+    FLUSH_SECONDS.observe(elapsed, event_type=event_type)
+    EVENTS_FLUSHED.inc(len(events), event_type=event_type)
+    log_timing("INFO", f"Flushed {len(events)} {event_type} events to bronze", elapsed,
+               event_type=event_type, events=len(events))
+    if sealed:
+        print(f"[INFO] Sealed bronze segment {sealed}")
+
+
+def roll_due_segments():
+    """
+    Seals segments that have been open too long, even without new events.
+    """
+    for writer in bronze_writers.values():
+        sealed = writer.roll_if_due()
+        if sealed:
+            print(f"[INFO] Sealed bronze segment {sealed}")
+
+
 def flush_to_bronze(event_buffer, event_type):
     """
-    Writes buffered events to a timestamped JSON file in the bronze directory.
+    Hands the buffered events to the bronze writer and empties the buffer.
+
+    The write runs on the background writer thread while ingestion is
+    running, and inline otherwise.
 
     Args:
         event_buffer (deque): The buffer containing event dictionaries.
         event_type (str): Type of GitHub event (used in file naming and pathing).
     """
+    events = list(event_buffer)
+    event_buffer.clear()
+    BUFFER_DEPTH.set(0, event_type=event_type)
+    buffer_bytes[event_type] = 0
+    buffer_started[event_type] = None
+
     try:
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-        file_name = f"{event_type}_dump_{timestamp}.json"
-        file_path = os.path.join(BASE_STORAGE_PATH, BRONZE_DIR, event_type, file_name)
+        if background_writer is not None:
+            background_writer.submit(event_type, events)
+        else:
+            write_bronze_batch(event_type, events)
+    except Exception as e:
+        print(f"[ERROR] Failed to write NDJSON for {event_type}: {e}")
+
+#%%
+def backfill_archives(archive_dir, workers: int = 1, target: str = "bronze", storage_path: str = BASE_STORAGE_PATH):
+    """
+    Backfills history from local GH Archive dumps (hourly `.json.gz` files).
+
+    - Streams each archive line by line and keeps only INTERESTED_TYPES
+    - Writes through the bronze segment layout (for transform to convert) or
+      straight to silver Parquet
+    - Fans archives out across a process pool when `workers` is above 1
+    - Checkpoints every archive once its output is complete, so a rerun
+      skips finished archives and redoes an interrupted one from scratch
+
+    Events are written as they are; GH Archive holds each event once, and the
+    live ingestion's seen-id index is neither consulted nor updated.
+
+    Args:
+        archive_dir (str): Directory holding the dumps.
+        workers (int): Number of worker processes, one archive each at a time.
+        target (str): "bronze" or "silver".
+        storage_path (str): Root of the bronze/silver layout.
+
+    Returns:
+        dict: Counts of archives done, skipped and failed, events kept and elapsed seconds.
+    """
+    checkpoint_path = os.path.join(storage_path, STATE_DIR, ARCHIVE_CHECKPOINT)
+    done = load_json_file(checkpoint_path) if os.path.exists(checkpoint_path) else {}
+    archives = list_archives(archive_dir)
+    pending = [path for path in archives if os.path.basename(path) not in done]
+    summary = {"archives": 0, "skipped": len(archives) - len(pending), "failed": 0, "events": 0, "elapsed": 0.0}
+    if not pending:
+        return summary
+
+    started = time.monotonic()
+
+    def handle(archive_path, stats, elapsed, error):
+        if error is not None:
+            summary["failed"] += 1
+            print(f"[ERROR] Failed to backfill {os.path.basename(archive_path)}: {error}")
+            return
+        kept = sum(stats["events"].values())
+        summary["archives"] += 1
+        summary["events"] += kept
+        ARCHIVES_BACKFILLED.inc()
+        ARCHIVE_SECONDS.observe(elapsed)
+        for event_type, count in stats["events"].items():
+            ARCHIVE_EVENTS.inc(count, event_type=event_type)
+        done[stats["archive"]] = {
+            "target": target,
+            "lines": stats["lines"],
+            "malformed": stats["malformed"],
+            "events": stats["events"],
+            "completed_at": datetime.now(timezone.utc).isoformat(),
+        }
+        write_json_atomic(done, checkpoint_path)
+        log_timing("INFO", f"Backfilled {stats['archive']}: {kept}/{stats['lines']} events kept", elapsed,
+                   archive=stats["archive"], lines=stats["lines"], events=kept, malformed=stats["malformed"])
+        print(f"[PROGRESS] {summary['archives'] + summary['failed']}/{len(pending)} archives "
+              f"({summary['failed']} failed) | {summary['events']} events")
+
+    if workers <= 1:
+        for archive_path in pending:
+            handle(*run_archive(archive_path, storage_path, target, BRONZE_COMPRESSION))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(run_archive, archive_path, storage_path, target, BRONZE_COMPRESSION)
+                       for archive_path in pending]
+            for future in as_completed(futures):
+                handle(*future.result())
+
+    summary["elapsed"] = time.monotonic() - started
+    log_timing("INFO", "Archive backfill complete", summary["elapsed"], target=target, workers=workers,
+               archives=summary["archives"], skipped=summary["skipped"], failed=summary["failed"],
+               events=summary["events"])
+    return summary
 
-        write_json_to_file(list(event_buffer), file_path)
-        event_buffer.clear()
 
-        print(f"[INFO] Flushed {event_type} buffer to {file_path}")
+def run_archive(archive_path, storage_path, target, compression):
+    """
+    Backfills one archive, returning `(archive_path, stats, seconds, error)` instead of raising.
+
+    Runs inside the worker processes of `backfill_archives`.
+    """
+    started = time.perf_counter()
+    try:
+        stats = backfill_archive(archive_path, storage_path, target=target, compression=compression)
+        return archive_path, stats, time.perf_counter() - started, None
     except Exception as e:
-        print(f"[ERROR] Failed to write JSON for {event_type}: {e}")
+        return archive_path, None, time.perf_counter() - started, str(e)
 
 #%%
 if __name__ == "__main__":
@@ -119,7 +420,19 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument("--live", action="store_true", help="Run ingestion continuously")
     parser.add_argument("--duration", type=int, default=300, help="Duration in seconds if not live")
+    parser.add_argument("--compression", choices=["none", "gzip", "zstd"], default="none",
+                        help="Compression for bronze NDJSON segments")
+    parser.add_argument("--archive-dir", help="Backfill from the GH Archive .json.gz dumps in this directory "
+                                              "instead of polling the API")
+    parser.add_argument("--workers", type=int, default=1, help="Archives processed in parallel (with --archive-dir)")
+    parser.add_argument("--to", choices=["bronze", "silver"], default="bronze",
+                        help="Where backfilled events are written (with --archive-dir)")
 
     args = parser.parse_args()
+    BRONZE_COMPRESSION = None if args.compression == "none" else args.compression
 
-    fetch_github_events(duration=args.duration, live=args.live)
+    if args.archive_dir:
+        backfill_archives(args.archive_dir, workers=args.workers, target=args.to)
+        write_textfile("ingest_backfill", metrics_dir=os.path.join(BASE_STORAGE_PATH, METRICS_DIR))
+    else:
+        fetch_github_events(duration=args.duration, live=args.live)
@@ -1,57 +1,428 @@
 import duckdb
 import os
+import glob
 import argparse
 import time
 from utils.defaults import *
+from utils.db_utils import publish_snapshot, current_snapshot, SnapshotSchedule
+from utils.rollups import ensure_rollups, apply_rollups, rebuild_rollups
+from utils.instrumentation import Gauge, Histogram, TextfileExporter, log_timing
 
 # Constants
 SILVER_DIR = "silver"
 DUCKDB_PATH = "data/db/github_events.duckdb"
+MANIFEST_TABLE = "_materialized_files"   # Tracks which silver files are already loaded
+MODES = ["table", "external"]            # Copy silver into tables, or query it in place through views
 
-def create_duckdb_database():
+# Metrics, written to data/metrics/materialize.prom by the CLI
+ROUND_SECONDS = Histogram("materialize_seconds", "Duration of one materialization round")
+FRESHNESS_LAG = Gauge("materialize_freshness_lag_seconds",
+                      "Age of the newest event in each table after the last round", ["table"])
+LAST_ROUND = Gauge("materialize_last_round_timestamp_seconds", "Unix time the last round finished")
+
+
+def ensure_manifest(con):
+    """
+    Creates the manifest table that records which Parquet files have been loaded.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the DuckDB database.
+    """
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MANIFEST_TABLE} (
+            table_name VARCHAR,
+            file_path VARCHAR,
+            loaded_at TIMESTAMP DEFAULT current_timestamp,
+            PRIMARY KEY (table_name, file_path)
+        )
+    """)
+
+
+def table_exists(con, table_name):
+    """
+    Checks whether a table exists in the main schema of the database.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the DuckDB database.
+        table_name (str): Name of the table to look up.
+
+    Returns:
+        bool: True if the table exists, False otherwise.
+    """
+    row = con.execute(
+        "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'main' AND table_name = ?",
+        [table_name]
+    ).fetchone()
+    return row[0] > 0
+
+
+def loaded_files(con, table_name):
+    """
+    Returns the set of Parquet files already loaded into a table.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the DuckDB database.
+        table_name (str): Name of the target table.
+
+    Returns:
+        set[str]: File paths recorded in the manifest for this table.
+    """
+    rows = con.execute(
+        f"SELECT file_path FROM {MANIFEST_TABLE} WHERE table_name = ?", [table_name]
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def record_files(con, table_name, parquet_files):
+    """
+    Adds the given Parquet files to the manifest for a table.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the DuckDB database.
+        table_name (str): Name of the target table.
+        parquet_files (List[str]): File paths that were loaded.
+    """
+    con.executemany(
+        f"INSERT OR IGNORE INTO {MANIFEST_TABLE} (table_name, file_path) VALUES (?, ?)",
+        [[table_name, path] for path in parquet_files]
+    )
+
+
+def rebuild_table(con, table_name, parquet_files):
+    """
+    Fully rebuilds a table (and its rollup rows) from all of its Parquet files, deduplicated on `id`
+    and stored in `created_at` order.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the DuckDB database.
+        table_name (str): Name of the target table.
+        parquet_files (List[str]): All Parquet files for the event type.
+    """
+    con.begin()
+    try:
+        con.execute(f"""
+            CREATE OR REPLACE TABLE {table_name} AS
+            SELECT * FROM read_parquet($files, union_by_name = true, hive_partitioning = false)
+            QUALIFY row_number() OVER (PARTITION BY id) = 1
+            ORDER BY created_at
+        """, {"files": parquet_files})
+        rebuild_rollups(con, table_name)
+        con.execute(f"DELETE FROM {MANIFEST_TABLE} WHERE table_name = ?", [table_name])
+        record_files(con, table_name, parquet_files)
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+
+
+def load_new_files(con, table_name, parquet_files):
+    """
+    Appends only the rows of Parquet files not yet in the manifest.
+
+    Rows whose `id` is already present in the table (or repeated across the
+    new files) are skipped, so overlapping bronze dumps do not double count.
+    The same rows are folded into the rollup tables in the same transaction.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the DuckDB database.
+        table_name (str): Name of the target table.
+        parquet_files (List[str]): All Parquet files for the event type.
+
+    Returns:
+        int: Number of newly loaded files.
+    """
+    if not table_exists(con, table_name):
+        rebuild_table(con, table_name, parquet_files)
+        return len(parquet_files)
+
+    new_files = sorted(set(parquet_files) - loaded_files(con, table_name))
+    if not new_files:
+        return 0
+
+    con.begin()
+    try:
+        # Stage the new rows once so the table and its rollups get exactly the same rows
+        con.execute(f"""
+            CREATE OR REPLACE TEMP TABLE _new_rows AS
+            SELECT new.* FROM read_parquet($files, union_by_name = true, hive_partitioning = false) AS new
+            ANTI JOIN {table_name} AS existing USING (id)
+            QUALIFY row_number() OVER (PARTITION BY new.id) = 1
+        """, {"files": new_files})
+        # Kept in time order so range filters on created_at skip older row groups
+        con.execute(f"INSERT INTO {table_name} BY NAME SELECT * FROM _new_rows ORDER BY created_at")
+        apply_rollups(con, table_name, "_new_rows")
+        con.execute("DROP TABLE _new_rows")
+        record_files(con, table_name, new_files)
+        con.commit()
+    except Exception:
+        con.rollback()
+        raise
+    return len(new_files)
+
+
+def create_duckdb_database(full_refresh: bool = False, db_path: str = DUCKDB_PATH, silver_dir_path: str = None,
+                           schedule: SnapshotSchedule = None):
     """
     Materializes cleaned Parquet files (Silver layer) into DuckDB tables.
 
     - Iterates over event type folders inside the Silver directory.
-    - For each event type, reads matching Parquet files.
-    - Creates or replaces a table in DuckDB using the contents.
+    - For each event type, lists matching Parquet files.
+    - Incrementally inserts files not yet recorded in the manifest table,
+      or rebuilds every table from scratch when `full_refresh` is set.
+    - Publishes a read-only snapshot for the API whenever something changed,
+      so readers never contend for this connection's write lock. With a
+      `schedule` (live mode), changes are published when it says so, which
+      may be a later round: each snapshot copies the whole database.
+
+    Args:
+        full_refresh (bool): If True, drop and rebuild every table from all silver files.
+        db_path (str): Path to the DuckDB database file.
+        silver_dir_path (str, optional): Silver directory; defaults to the configured storage path.
+        schedule (SnapshotSchedule, optional): Paces snapshots across rounds.
     """
-    con = duckdb.connect(DUCKDB_PATH)
+    started = time.perf_counter()
+    con = duckdb.connect(db_path)
+    ensure_manifest(con)
+    ensure_rollups(con)
 
-    silver_dir_path = os.path.join(BASE_STORAGE_PATH, SILVER_DIR)
+    silver_dir_path = silver_dir_path or os.path.join(BASE_STORAGE_PATH, SILVER_DIR)
+    changed = full_refresh
 
     for event_type in os.listdir(silver_dir_path):
         event_path = os.path.join(silver_dir_path, event_type)
 
         if os.path.isdir(event_path):
-            # Match all Parquet files for the event type
-            parquet_glob = os.path.join(event_path, f"{event_type}*.parquet")
+            # Match all Parquet files for the event type, including compacted date/hour partitions
+            parquet_files = sorted(glob.glob(os.path.join(event_path, "**", f"{event_type}*.parquet"), recursive=True))
             table_name = event_type.lower()
 
-            # Replace or create a table in DuckDB
-            con.execute(f"""
-                CREATE OR REPLACE TABLE {table_name} AS
-                SELECT * FROM read_parquet('{parquet_glob}')
-            """)
-            print(f"[INFO] Table created/updated: {table_name}")
+            if not parquet_files:
+                continue
+
+            try:
+                if full_refresh:
+                    rebuild_table(con, table_name, parquet_files)
+                    changed = True
+                    print(f"[INFO] Table rebuilt: {table_name} ({len(parquet_files)} files)")
+                else:
+                    # Compacted files re-contain rows already loaded; the id dedupe skips them
+                    new_count = load_new_files(con, table_name, parquet_files)
+                    if new_count:
+                        changed = True
+                        print(f"[INFO] Table updated: {table_name} (+{new_count} files)")
+            except duckdb.IOException as e:
+                # A concurrent compaction may remove files between listing and reading
+                print(f"[WARN] Skipping {table_name} this round: {e}")
+
+    if schedule is None:
+        if changed or current_snapshot(db_path) == db_path:
+            print(f"[INFO] Published snapshot {publish_snapshot(con, db_path)}")
+    else:
+        if changed or current_snapshot(db_path) == db_path:
+            schedule.mark_dirty()
+        if schedule.due():
+            print(f"[INFO] Published snapshot {schedule.publish(con, db_path)}")
+    record_freshness(con)
+    con.close()
+
+    elapsed = time.perf_counter() - started
+    ROUND_SECONDS.observe(elapsed)
+    LAST_ROUND.set(time.time())
+    log_timing("INFO", "Materialization round complete", elapsed, changed=changed, full_refresh=full_refresh)
+
+
+def external_view_sql(table_name, event_path, event_type, compacted=True):
+    """
+    Builds the view that exposes an event type's silver files in place.
+
+    Compacted `date=/hour=` partitions are read with `hive_partitioning`, so
+    filters on the `date` and `hour` columns skip whole files (see the KPIs'
+    `partition_sql`). DuckDB cannot mix hive and non-hive paths in one scan,
+    so loose files are read separately and get the same columns from their
+    UTC `created_at`, as compaction computes them. Their scan uses a recursive
+    glob filtered on the file name, because a glob that matches no file fails
+    and compaction regularly leaves no loose file behind. Hidden paths are
+    excluded: compaction staging folders, and the inputs of a compaction that
+    is committing.
+
+    Rows are deduplicated on `id` like table mode. An event's `created_at`
+    never changes, so copies always share a partition: deduplicating per
+    `(date, hour, id)` keeps partition filters pushed down to the scans.
+
+    Args:
+        table_name (str): Name of the view, e.g. `watchevent`.
+        event_path (str): Absolute `silver/<EventType>` folder.
+        event_type (str): Event type; silver files are named after it.
+        compacted (bool): Whether the event type has compacted partitions yet.
+
+    Returns:
+        str: The `CREATE OR REPLACE VIEW` statement.
+    """
+    loose = os.path.join(event_path, "**", f"{event_type}*.parquet").replace("'", "''")
+    partitions = os.path.join(event_path, "date=*", "hour=*", f"{event_type}*.parquet").replace("'", "''")
+    compacted_scan = f"""
+            SELECT * FROM read_parquet('{partitions}', union_by_name = true, hive_partitioning = true,
+                                       hive_types = {{'date': DATE, 'hour': INTEGER}})
+            UNION ALL BY NAME""" if compacted else ""
+    return f"""
+        CREATE OR REPLACE VIEW {table_name} AS
+        SELECT * FROM ({compacted_scan}
+            SELECT
+                * EXCLUDE (filename),
+                CAST(timezone('UTC', created_at) AS DATE) AS date,
+                CAST(hour(timezone('UTC', created_at)) AS INTEGER) AS hour
+            FROM read_parquet('{loose}', union_by_name = true, hive_partitioning = false, filename = true)
+            WHERE filename NOT LIKE '%/date=%' AND filename NOT LIKE '%/.%'
+        )
+        QUALIFY row_number() OVER (PARTITION BY date, hour, id) = 1
+    """
+
+
+def external_views(silver_dir_path):
+    """
+    Returns the view definitions for every event type that has silver files.
+
+    A glob that matches no file fails at query time, so event types are only
+    exposed once their first file exists, and the compacted scan only once
+    compaction wrote a partition. Partition files are merged, never removed
+    for good; a query running while a merge hides them all fails once.
+
+    Args:
+        silver_dir_path (str): Silver directory.
+
+    Returns:
+        Dict[str, str]: `CREATE VIEW` statement per view name.
+    """
+    views = {}
+    silver_dir_path = os.path.abspath(silver_dir_path)
+    for event_type in sorted(os.listdir(silver_dir_path)):
+        event_path = os.path.join(silver_dir_path, event_type)
+        if os.path.isdir(event_path) and glob.glob(os.path.join(event_path, "**", f"{event_type}*.parquet"), recursive=True):
+            compacted = bool(glob.glob(os.path.join(event_path, "date=*", "hour=*", f"{event_type}*.parquet")))
+            views[event_type.lower()] = external_view_sql(event_type.lower(), event_path, event_type, compacted)
+    return views
+
+
+def silver_fingerprint(silver_dir_path):
+    """
+    Summarizes the visible silver files, to tell when external views see new data.
 
+    Args:
+        silver_dir_path (str): Silver directory.
+
+    Returns:
+        Tuple[Tuple[str, int, int], ...]: `(path, size, mtime_ns)` per Parquet file, sorted.
+    """
+    files = []
+    for root, dirs, names in os.walk(silver_dir_path):
+        dirs[:] = [d for d in dirs if not d.startswith(".")]  # Compaction staging folders
+        for name in names:
+            if name.endswith(".parquet") and not name.startswith("."):
+                stat = os.stat(os.path.join(root, name))
+                files.append((os.path.join(root, name), stat.st_size, stat.st_mtime_ns))
+    return tuple(sorted(files))
+
+
+def create_external_database(db_path: str = DUCKDB_PATH, silver_dir_path: str = None, views: dict = None):
+    """
+    Publishes a snapshot whose tables are views over the silver Parquet files.
+
+    Nothing is copied: queries read silver directly, so new files are visible
+    as soon as transform or compaction writes them, without a materialization
+    round. The views are built in an in-memory database and published as the
+    snapshot readers open, so the table-mode database file is never written
+    and no write lock is taken. There are no rollup tables in this mode; KPIs
+    fall back to their `partition_sql`, else their plain `sql`. The views are
+    republished whenever the silver files change (see `silver_fingerprint`),
+    which moves the data version, so cached KPI results are not served stale.
+
+    Args:
+        db_path (str): Path of the database whose snapshot readers use.
+        silver_dir_path (str, optional): Silver directory; defaults to the configured storage path.
+        views (dict, optional): Output of `external_views`, if already computed.
+
+    Returns:
+        Dict[str, str]: The published view definitions.
+    """
+    started = time.perf_counter()
+    silver_dir_path = silver_dir_path or os.path.join(BASE_STORAGE_PATH, SILVER_DIR)
+    views = external_views(silver_dir_path) if views is None else views
+
+    con = duckdb.connect()
+    for table_name, sql in views.items():
+        con.execute(sql)
+        print(f"[INFO] View defined: {table_name}")
+    print(f"[INFO] Published snapshot {publish_snapshot(con, db_path)}")
+    record_freshness(con)
     con.close()
 
+    elapsed = time.perf_counter() - started
+    ROUND_SECONDS.observe(elapsed)
+    LAST_ROUND.set(time.time())
+    log_timing("INFO", "External views published", elapsed, views=len(views))
+    return views
+
+
+def record_freshness(con):
+    """
+    Sets the freshness lag gauge: how old each table's newest event is.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection.
+    """
+    for event_type in INTERESTED_TYPES:
+        table_name = event_type.lower()
+        if not table_exists(con, table_name):
+            continue
+        try:
+            lag = con.execute(f"SELECT epoch(now()) - epoch(max(created_at)) FROM {table_name}").fetchone()[0]
+        except duckdb.Error as e:
+            print(f"[WARN] Could not measure freshness of {table_name}: {e}")
+            continue
+        if lag is not None:
+            FRESHNESS_LAG.set(lag, table=table_name)
+
 # CLI entry point
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument(
         "--live", action="store_true", help="Live mode to continuously update DuckDB from Silver layer"
     )
+    parser.add_argument(
+        "--full-refresh", action="store_true", help="Rebuild all tables from scratch instead of loading new files only"
+    )
+    parser.add_argument(
+        "--mode", choices=MODES, default="table",
+        help="table: copy silver into DuckDB tables. external: publish views that query silver in place."
+    )
     args = parser.parse_args()
 
-    if args.live:
-        # Keep updating the database every 10 seconds
-        while True:
-            create_duckdb_database()
-            time.sleep(10)
-    else:
-        # Run once and exit
-        create_duckdb_database()
+    exporter = TextfileExporter("materialize").start()
+    try:
+        if args.mode == "external":
+            # Views read new files by themselves, but a new snapshot moves the data version
+            # so the API's cached results are not served stale
+            silver_dir_path = os.path.join(BASE_STORAGE_PATH, SILVER_DIR)
+            fingerprint = silver_fingerprint(silver_dir_path)
+            create_external_database(silver_dir_path=silver_dir_path)
+            while args.live:
+                time.sleep(10)
+                current = silver_fingerprint(silver_dir_path)
+                if current != fingerprint:
+                    fingerprint = current
+                    create_external_database(silver_dir_path=silver_dir_path)
+        elif args.live:
+            # Rebuild once if requested, then keep loading new files every 10 seconds;
+            # snapshots are paced so copying the growing database stays a small share of the time
+            schedule = SnapshotSchedule()
+            create_duckdb_database(full_refresh=args.full_refresh, schedule=schedule)
+            while True:
+                time.sleep(10)
+                create_duckdb_database(schedule=schedule)
+        else:
+            # Run once and exit
+            create_duckdb_database(full_refresh=args.full_refresh)
+    finally:
+        exporter.close()
 
     print("[INFO] DuckDB database materialization complete.")
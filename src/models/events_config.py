@@ -0,0 +1,59 @@
+from pydantic import BaseModel, field_validator, model_validator
+from typing import Dict, List, Literal, Optional
+
+
+class FieldType(BaseModel):
+    """
+    Declares the silver column type of one extracted field.
+
+    Attributes:
+        type (str): string, int64, float64, bool or timestamp.
+        unit (str): Timestamp resolution: s, ms, us or ns. DuckDB timestamps are
+            microseconds, so `us` keeps `created_at` filters pushed down to Parquet.
+        tz (Optional[str]): Timestamp time zone; None for naive timestamps.
+        dictionary (bool): Dictionary-encode a low-cardinality string column
+            (e.g. `type`, `repo.name`), in Arrow and in the Parquet file.
+    """
+    type: Literal["string", "int64", "float64", "bool", "timestamp"]
+    unit: Literal["s", "ms", "us", "ns"] = "us"
+    tz: Optional[str] = "UTC"
+    dictionary: bool = False
+
+    @model_validator(mode="after")
+    def dictionary_only_for_strings(self):
+        """
+        Validates that only string columns are dictionary encoded.
+        """
+        if self.dictionary and self.type != "string":
+            raise ValueError("dictionary encoding is only supported for string fields")
+        return self
+
+
+class EventConfig(BaseModel):
+    """
+    Fields extracted from one event type, and their silver types.
+
+    Attributes:
+        fields (List[str]): Dot-separated field paths, in column order.
+        types (Dict[str, FieldType]): Declared type per field path. A bare type
+            name (`int64`) is shorthand for `{type: int64}`; undeclared fields are strings.
+    """
+    fields: List[str]
+    types: Dict[str, FieldType] = {}
+
+    @field_validator("types", mode="before")
+    def expand_shorthand(cls, v):
+        """
+        Expands `path: int64` entries into `path: {type: int64}`.
+        """
+        return {path: {"type": spec} if isinstance(spec, str) else spec for path, spec in (v or {}).items()}
+
+    @model_validator(mode="after")
+    def types_must_name_fields(self):
+        """
+        Validates that every declared type belongs to an extracted field.
+        """
+        unknown = set(self.types) - set(self.fields)
+        if unknown:
+            raise ValueError(f"types declared for fields that are not extracted: {sorted(unknown)}")
+        return self
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, List
+
+# Constants
+MAX_BATCH_KPIS = 20                  # KPIs accepted in one batch request
+
+
+class KpiRequest(BaseModel):
+    """
+    One KPI to evaluate in a batch.
+
+    Attributes:
+        id (str): ID of the KPI defined in metrics.yaml.
+        params (Dict[str, Any]): Its parameters, validated like query string values.
+    """
+    id: str
+    params: Dict[str, Any] = {}
+
+
+class KpiBatchRequest(BaseModel):
+    """
+    Body of `POST /kpi:batch`.
+
+    Attributes:
+        kpis (List[KpiRequest]): KPIs to evaluate together, in response order.
+    """
+    kpis: List[KpiRequest] = Field(min_length=1, max_length=MAX_BATCH_KPIS)
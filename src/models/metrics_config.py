@@ -1,5 +1,33 @@
-from pydantic import BaseModel, field_validator
-from typing import Literal, List, Optional
+from pydantic import BaseModel, Field, field_validator, model_validator
+from typing import Any, Dict, Literal, List, Optional
+
+class KpiParam(BaseModel):
+    """
+    Declares one query parameter of a KPI.
+
+    Attributes:
+        type (str): Value type: int, float, str or bool.
+        default (Any): Value used when the request omits the parameter;
+            without a default the parameter is required.
+        min (Optional[float]): Smallest allowed value (numeric types).
+        max (Optional[float]): Largest allowed value (numeric types).
+        description (Optional[str]): Human-readable explanation.
+    """
+    type: Literal["int", "float", "str", "bool"]
+    default: Any = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    description: Optional[str] = None
+
+    @model_validator(mode="after")
+    def bounds_must_be_ordered(self):
+        """
+        Validates that `min` is not greater than `max`.
+        """
+        if self.min is not None and self.max is not None and self.min > self.max:
+            raise ValueError("min must not be greater than max")
+        return self
+
 
 class Metric(BaseModel):
     """
@@ -11,11 +39,27 @@ class Metric(BaseModel):
         sql (str): SQL query that defines how the metric is calculated.
         visualisation (Optional[str]): Type of visualization to be used
             (e.g., bar, line, value, or table).
+        cache_ttl_seconds (float): How long an evaluated result may be served
+            from the cache; 0 disables caching for this KPI.
+        params (Dict[str, KpiParam]): Typed parameters, referenced in the SQL
+            as `$name` and bound at execution time.
+        rollup_sql (Optional[str]): Equivalent query over the rollup tables the
+            materializer maintains; used instead of `sql` when those exist.
+        partition_sql (Optional[str]): Equivalent query that also filters on the
+            `date`/`hour` partition columns of the external-mode views, so whole
+            silver files are skipped; used instead of `sql` when those exist.
+        timeout_seconds (float): How long the query may run before it is
+            interrupted and the request fails with a 504.
     """
     id: str
     name: str
     sql: str
     visualisation: Optional[Literal["bar", "line", "value", "table"]] = None
+    cache_ttl_seconds: float = Field(default=60, ge=0)
+    params: Dict[str, KpiParam] = {}
+    rollup_sql: Optional[str] = None
+    partition_sql: Optional[str] = None
+    timeout_seconds: float = Field(default=10, gt=0)
 
     @field_validator('sql')
     def sql_must_not_be_empty(cls, v: str) -> str:
@@ -0,0 +1,349 @@
+#%%
+import os
+import time
+import queue
+import signal
+import argparse
+import threading
+from collections import deque
+import duckdb
+from utils.defaults import INTERESTED_TYPES, BRONZE_DIR, STATE_DIR, BASE_STORAGE_PATH
+from utils.bronze_writer import BronzeSegmentWriter, silver_file_name
+from utils.github_client import GitHubEventsClient
+from utils.dedup import SeenIdIndex
+from utils.flushing import FlushPolicy, BackgroundWriter
+from utils.arrow_utils import tuples_to_table
+from transform import SILVER_DIR, event_schemas, event_extractors, convert_file
+from materialize_duckdb import DUCKDB_PATH, table_exists
+from utils.db_utils import SnapshotPublisher, SnapshotSchedule
+from utils.rollups import ensure_rollups, apply_rollups, rebuild_rollups
+
+#%%
+# Constants
+FETCH_INTERVAL_SECONDS = 10          # Minimum wait between GitHub polls
+RUN_DURATION = 300                   # Default run time (in seconds) in batch mode
+QUEUE_SIZE = 10_000                  # Events (trim queue) / batches (load queue) before producers block
+STATS_INTERVAL_SECONDS = 30          # How often latency percentiles are printed
+LATENCY_WINDOW = 10_000              # Most recent samples kept for the percentiles
+SNAPSHOT_INTERVAL_SECONDS = 5        # Shortest gap between read-only snapshots published for the API
+SEEN_IDS_PATH = os.path.join(BASE_STORAGE_PATH, STATE_DIR, "seen_ids.json")
+
+# Micro-batch limits per event type: rows are appended to DuckDB once either is hit
+BATCH_POLICY = FlushPolicy(max_events=500, max_bytes=float("inf"), max_age_seconds=1.0)
+
+_STOP = object()                     # Sentinel shutting a stage down after it drains
+
+
+class LatencyWindow:
+    """
+    Keeps the most recent latency samples (seconds) and reports percentiles.
+    """
+
+    def __init__(self, size=LATENCY_WINDOW):
+        self.samples = deque(maxlen=size)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q):
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+    def summary(self):
+        return {"count": self.count, "p50": self.percentile(50), "p99": self.percentile(99)}
+
+
+class StreamingPipeline:
+    """
+    Runs ingest, trim and DuckDB loading in one process connected by bounded queues.
+
+    poller (caller's thread) -> trim queue -> trimmer thread -> load queue -> loader thread
+
+    - The poller dedupes fetched events and hands each to the trim queue and
+      to the bronze writer thread.
+    - The trimmer applies the compiled `filtered_events.yaml` extractors and
+      cuts per-type Arrow micro-batches by `BATCH_POLICY`.
+    - The loader appends each batch to its DuckDB table (skipping ids already
+      there) and records how long each event took to become queryable. A
+      publisher thread copies read-only snapshots for the API off this path,
+      every few seconds or less often as the database grows.
+
+    Bronze segments are still written, and every sealed segment is converted
+    to its silver Parquet file on a second background thread. Both writers
+    are off the critical path; silver files keep the names `transform.py`
+    expects, so the file-based jobs never redo them.
+    """
+
+    def __init__(self, client=None, seen_index=None, db_path=DUCKDB_PATH, storage_path=BASE_STORAGE_PATH,
+                 compression=None, batch_policy=BATCH_POLICY):
+        self.client = client or GitHubEventsClient(min_interval=FETCH_INTERVAL_SECONDS)
+        self.seen_index = seen_index if seen_index is not None else SeenIdIndex(state_path=SEEN_IDS_PATH)
+        self.db_path = db_path
+        self.storage_path = storage_path
+        self.compression = compression
+        self.batch_policy = batch_policy
+
+        self.trim_queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.load_queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self.bronze_writers = {}
+        self.bronze_writer = BackgroundWriter(self._write_bronze, tick_fn=self._roll_due_segments)
+        self.silver_writer = BackgroundWriter(self._write_silver, name="silver-writer")
+
+        # created_at -> queryable, and fetched -> queryable (the part this process controls)
+        self.end_to_end = LatencyWindow()
+        self.in_process = LatencyWindow()
+        self.stats = {"events": 0, "batches": 0, "rows_loaded": 0, "failed_batches": 0}
+
+    #%%
+    def run(self, duration=RUN_DURATION, live=False):
+        """
+        Polls GitHub and streams events into DuckDB until the duration ends (or forever when live).
+
+        Args:
+            duration (int): Time to run in batch mode (ignored in live mode).
+            live (bool): If True, runs until interrupted or SIGTERM.
+        """
+        trimmer = threading.Thread(target=self._trim_loop, name="trimmer", daemon=True)
+        loader = threading.Thread(target=self._load_loop, name="loader", daemon=True)
+        self.bronze_writer.start()
+        self.silver_writer.start()
+        trimmer.start()
+        loader.start()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, handle_sigterm)
+
+        last_seen_id = self.seen_index.high_water()
+        start_time = time.time()
+        last_report = time.monotonic()
+        try:
+            while live or time.time() - start_time < duration:
+                result = self.client.poll_all_pages(last_seen_id=last_seen_id)
+                if result.gap_detected:
+                    print(f"[WARN] Gap detected: events between {last_seen_id} and the oldest fetched page were missed")
+                if result.status_code == 200:
+                    fetched_at = time.time()
+                    # New ids are saved only once their bronze segment holds them; until then a restart
+                    # resumes from below the oldest unwritten one (see SeenIdIndex.durable_high_water)
+                    new_events = self.seen_index.filter_new(result.events, pending=True)
+                    last_seen_id = self.seen_index.high_water()
+                    self.route(new_events, fetched_at)
+                self.seen_index.save_if_due()
+
+                if time.monotonic() - last_report >= STATS_INTERVAL_SECONDS:
+                    last_report = time.monotonic()
+                    self.report()
+
+                elapsed = time.time() - start_time
+                time.sleep(result.wait_seconds if live else min(result.wait_seconds, max(0, duration - elapsed)))
+        finally:
+            print("[INFO] Pipeline stopping. Draining stages...")
+            if threading.current_thread() is threading.main_thread():
+                signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            self.trim_queue.put(_STOP)
+            trimmer.join()
+            loader.join()
+            self.bronze_writer.close()
+            for writer in self.bronze_writers.values():
+                sealed = writer.close()
+                if sealed:
+                    self.silver_writer.submit(writer.event_type, sealed)
+            self.silver_writer.close()
+            self.seen_index.save()
+            self.client.close()
+            self.report()
+
+    def route(self, events, fetched_at):
+        """
+        Hands new events to the trim stage and, grouped by type, to the bronze writer.
+
+        Args:
+            events (List[dict]): Deduplicated raw events.
+            fetched_at (float): Epoch seconds when the events were received.
+        """
+        by_type, dropped = {}, []
+        for event in events:
+            if event.get("type") in INTERESTED_TYPES:
+                by_type.setdefault(event["type"], []).append(event)
+                self.trim_queue.put((event, fetched_at))
+                self.stats["events"] += 1
+            else:
+                dropped.append(event.get("id"))
+        self.seen_index.confirm(dropped)
+
+        for event_type, batch in by_type.items():
+            self.bronze_writer.submit(event_type, batch)
+
+    #%%
+    def _trim_loop(self):
+        rows = {event_type: [] for event_type in event_extractors}
+        fetched = {event_type: [] for event_type in event_extractors}
+        started = {event_type: None for event_type in event_extractors}
+
+        def cut(event_type):
+            self.load_queue.put((event_type, tuples_to_table(rows[event_type], event_schemas[event_type]),
+                                 fetched[event_type]))
+            rows[event_type], fetched[event_type], started[event_type] = [], [], None
+
+        while True:
+            try:
+                item = self.trim_queue.get(timeout=self.batch_policy.max_age_seconds / 4)
+            except queue.Empty:
+                item = None
+
+            if item is _STOP:
+                for event_type in rows:
+                    if rows[event_type]:
+                        cut(event_type)
+                self.load_queue.put(_STOP)
+                return
+
+            if item is not None:
+                event, fetched_at = item
+                event_type = event["type"]
+                try:
+                    rows[event_type].append(event_extractors[event_type](event))
+                    fetched[event_type].append(fetched_at)
+                    started[event_type] = started[event_type] or time.monotonic()
+                except Exception as e:
+                    print(f"[WARN] Skipping event due to config error: {e}")
+
+            now = time.monotonic()
+            for event_type in rows:
+                if rows[event_type] and self.batch_policy.should_flush(
+                        len(rows[event_type]), 0, now - started[event_type]):
+                    cut(event_type)
+
+    def _load_loop(self):
+        con = duckdb.connect(self.db_path)
+        ensure_rollups(con)
+        publisher = SnapshotPublisher(con, self.db_path, SnapshotSchedule(min_interval=SNAPSHOT_INTERVAL_SECONDS))
+        publisher.start()
+        try:
+            while True:
+                item = self.load_queue.get()
+                if item is _STOP:
+                    return
+                event_type, batch, fetched = item
+                try:
+                    self.stats["rows_loaded"] += append_batch(con, event_type.lower(), batch)
+                    self.stats["batches"] += 1
+                except Exception as e:
+                    self.stats["failed_batches"] += 1
+                    print(f"[ERROR] Failed to append {len(fetched)} {event_type} rows to DuckDB: {e}")
+                    continue
+
+                publisher.mark_dirty()
+
+                queryable_at = time.time()
+                for created_at, fetched_at in zip(batch.column("created_at").to_pylist(), fetched):
+                    self.in_process.add(queryable_at - fetched_at)
+                    if created_at is not None:
+                        self.end_to_end.add(queryable_at - created_at.timestamp())
+        finally:
+            publisher.close()
+            con.close()
+
+    #%%
+    def _write_bronze(self, event_type, events):
+        if event_type not in self.bronze_writers:
+            self.bronze_writers[event_type] = BronzeSegmentWriter(
+                event_type, os.path.join(self.storage_path, BRONZE_DIR), compression=self.compression
+            )
+        sealed = self.bronze_writers[event_type].append(events)
+        self.seen_index.confirm(event.get("id") for event in events)
+        if sealed:
+            self.silver_writer.submit(event_type, sealed)
+
+    def _roll_due_segments(self):
+        for event_type, writer in self.bronze_writers.items():
+            sealed = writer.roll_if_due()
+            if sealed:
+                self.silver_writer.submit(event_type, sealed)
+
+    def _write_silver(self, event_type, bronze_path):
+        parquet_path = os.path.join(self.storage_path, SILVER_DIR, event_type,
+                                    silver_file_name(os.path.basename(bronze_path)))
+        convert_file(event_type, bronze_path, parquet_path, engine="arrow")
+
+    def report(self):
+        """
+        Prints throughput and created_at -> queryable latency percentiles.
+        """
+        def fmt(summary):
+            if summary["p50"] is None:
+                return "n/a"
+            return f"p50 {summary['p50']:.2f}s, p99 {summary['p99']:.2f}s"
+
+        print(f"[INFO] Pipeline | events: {self.stats['events']}, rows loaded: {self.stats['rows_loaded']}, "
+              f"batches: {self.stats['batches']}, failed: {self.stats['failed_batches']}")
+        print(f"[INFO] Latency | created_at -> queryable: {fmt(self.end_to_end.summary())} | "
+              f"fetched -> queryable: {fmt(self.in_process.summary())}")
+
+
+def append_batch(con, table_name, batch):
+    """
+    Appends an Arrow micro-batch to a DuckDB table, skipping ids already present.
+
+    The inserted rows are folded into the rollup tables in the same transaction.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open connection to the DuckDB database.
+        table_name (str): Name of the target table (created from the batch if missing).
+        batch (pa.Table): Trimmed rows of one event type.
+
+    Returns:
+        int: Number of rows inserted.
+    """
+    con.register("_batch", batch)
+    con.begin()
+    try:
+        if not table_exists(con, table_name):
+            con.execute(f"""
+                CREATE TABLE {table_name} AS
+                SELECT * FROM _batch QUALIFY row_number() OVER (PARTITION BY id) = 1
+            """)
+            inserted = con.fetchone()[0]
+            rebuild_rollups(con, table_name)
+        else:
+            con.execute(f"""
+                CREATE OR REPLACE TEMP TABLE _new_rows AS
+                SELECT new.* FROM _batch AS new
+                ANTI JOIN {table_name} AS existing USING (id)
+                QUALIFY row_number() OVER (PARTITION BY new.id) = 1
+            """)
+            con.execute(f"INSERT INTO {table_name} BY NAME SELECT * FROM _new_rows")
+            inserted = con.fetchone()[0]
+            apply_rollups(con, table_name, "_new_rows")
+            con.execute("DROP TABLE _new_rows")
+        con.commit()
+        return inserted
+    except Exception:
+        con.rollback()
+        raise
+    finally:
+        con.unregister("_batch")
+
+
+def handle_sigterm(signum, frame):
+    """
+    Turns SIGTERM into a normal exit so the pipeline drains its stages.
+    """
+    print("[INFO] SIGTERM received. Draining pipeline...")
+    raise SystemExit(0)
+
+#%%
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--live", action="store_true", help="Run the pipeline continuously")
+    parser.add_argument("--duration", type=int, default=RUN_DURATION, help="Duration in seconds if not live")
+    parser.add_argument("--compression", choices=["none", "gzip", "zstd"], default="none",
+                        help="Compression for bronze NDJSON segments")
+    args = parser.parse_args()
+
+    StreamingPipeline(compression=None if args.compression == "none" else args.compression).run(
+        duration=args.duration, live=args.live
+    )
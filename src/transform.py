@@ -3,14 +3,35 @@ import json
 import time
 import argparse
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 from utils.file_ops import *
+from utils.bronze_writer import is_bronze_file, read_bronze_file, silver_file_name
 from utils.event_utils import *
+from utils.arrow_utils import convert_file_arrow
+from utils.silver_schema import load_event_schemas, frame_to_table, write_silver_table
+from utils.failure_log import FailureLog
+from utils.compaction import compacted_sources
+from utils.bronze_watcher import BronzeWatcher, POLL_FALLBACK_SECONDS
+from utils.instrumentation import Counter, Gauge, Histogram, TextfileExporter, log_timing
 from utils.defaults import *
 
 # Define data layer folder names
 BRONZE_DIR = "bronze"
 SILVER_DIR = "silver"
+QUARANTINE_DIR = "quarantine"
+
+# Backfill tuning
+BACKFILL_CHUNK_SIZE = 32             # Files of one event type handed to a worker at a time
+PROGRESS_INTERVAL_SECONDS = 5        # How often backfill progress is reported
+
+# Metrics, written to data/metrics/transform.prom by the CLI. With --workers above 1
+# the per-file timings are taken in the worker processes and not exported.
+FILE_SECONDS = Histogram("transform_file_seconds", "Time to convert one bronze file to Parquet",
+                         ["event_type", "engine"])
+ROWS_WRITTEN = Counter("transform_rows_total", "Rows written to silver", ["event_type"])
+FILES_FAILED = Counter("transform_failures_total", "Bronze files that failed to convert")
+BRONZE_BACKLOG = Gauge("transform_bronze_backlog_files", "Bronze files waiting to be converted")
 
 # Ensure silver directories for each event type exist
 for event in INTERESTED_TYPES:
@@ -19,71 +40,315 @@ for event in INTERESTED_TYPES:
 # Load YAML config that specifies which fields to extract from each event type
 event_field_config = load_yaml_file(os.path.join(BASE_PATH, CONFIG_FOLDER, "filtered_events.yaml"))
 
-def convert_json_to_parquet():
+# Declared silver schema of each event type; both engines write exactly these types
+event_schemas = load_event_schemas(event_field_config)
+
+# Compile each event type's field list once into a specialised row extractor
+event_extractors = {
+    event_type: compile_row_extractor(config["fields"])
+    for event_type, config in event_field_config.items()
+}
+
+def find_pending_files(storage_path: str = BASE_STORAGE_PATH):
     """
-    Converts raw JSON files from the bronze layer into trimmed Parquet files in the silver layer.
+    Lists bronze files that do not have a silver Parquet file yet.
 
-    - Checks each event type's bronze folder
-    - Avoids reprocessing files that already exist in silver
-    - Applies a YAML-driven schema transformation
+    Args:
+        storage_path (str): Root of the bronze/silver layout.
+
+    Returns:
+        List[Tuple[str, str, str]]: `(event_type, bronze_path, parquet_path)` per pending file.
     """
-    bronze_dir_path = os.path.join(BASE_STORAGE_PATH, BRONZE_DIR)
-    silver_dir_path = os.path.join(BASE_STORAGE_PATH, SILVER_DIR)
+    bronze_dir_path = os.path.join(storage_path, BRONZE_DIR)
+    silver_dir_path = os.path.join(storage_path, SILVER_DIR)
+    pending = []
+
+    if not os.path.isdir(bronze_dir_path):
+        return pending
 
     for eventtype_folder in list_dir(bronze_dir_path):
+        # Files already folded into compacted partitions no longer exist on their own
+        compacted = compacted_sources(os.path.join(silver_dir_path, eventtype_folder))
+
         for filename in list_dir(os.path.join(bronze_dir_path, eventtype_folder)):
+            if not is_bronze_file(filename):
+                continue
+
             json_path = os.path.join(bronze_dir_path, eventtype_folder, filename)
-            parquet_path = os.path.join(silver_dir_path, eventtype_folder, filename.replace(".json", ".parquet"))
+            parquet_name = silver_file_name(filename)
+            parquet_path = os.path.join(silver_dir_path, eventtype_folder, parquet_name)
 
             # Skip if this file has already been transformed
-            if parquet_exists(parquet_path):
-                # print(f"[SKIP] {filename} already processed.")
+            if parquet_name in compacted or parquet_exists(parquet_path):
                 continue
+            pending.append((eventtype_folder, json_path, parquet_path))
+
+    return pending
+
+
+def convert_file(event_type, json_path, parquet_path, engine: str = "pandas"):
+    """
+    Converts a single bronze file into its silver Parquet file.
+
+    The Parquet file is written under a hidden temporary name and renamed
+    into place, so an interrupted run never leaves a half-written file that
+    the "already processed" check would skip forever.
 
-            try:
-                # Load raw events
-                raw_events = load_json_file(json_path)
-                
-                # Transform using dynamic schema
-                transformed_events_df = transform_events(raw_events)
-                
-                # Write to Parquet
-                write_parquet(transformed_events_df, parquet_path)
+    Args:
+        event_type (str): Event type of the file.
+        json_path (str): Bronze file path.
+        parquet_path (str): Destination Parquet path.
+        engine (str): "pandas" or "arrow".
+
+    Returns:
+        int: Number of rows written.
+    """
+    started = time.perf_counter()
+    ensure_directory_exists(os.path.dirname(parquet_path))
+    tmp_path = os.path.join(os.path.dirname(parquet_path), f".{os.path.basename(parquet_path)}.tmp")
+
+    if engine == "arrow":
+        # Project the configured fields as Arrow struct accesses
+        rows = convert_file_arrow(json_path, tmp_path, event_type, event_schemas[event_type])
+    else:
+        # Load raw events
+        raw_events = read_bronze_file(json_path)
+
+        # Transform using dynamic schema
+        transformed_events_df = transform_events(raw_events)
+
+        # Cast to the declared schema and write to Parquet
+        write_silver_table(frame_to_table(transformed_events_df, event_schemas[event_type]), tmp_path)
+        rows = len(transformed_events_df)
+
+    os.replace(tmp_path, parquet_path)
+    FILE_SECONDS.observe(time.perf_counter() - started, event_type=event_type, engine=engine)
+    ROWS_WRITTEN.inc(rows, event_type=event_type)
+    return rows
+
+
+def convert_chunk(chunk, engine: str = "pandas"):
+    """
+    Converts a batch of files in a worker process.
+
+    Args:
+        chunk (List[Tuple[str, str, str]]): `(event_type, bronze_path, parquet_path)` tuples.
+        engine (str): "pandas" or "arrow".
+
+    Returns:
+        List[Tuple[str, str, int, str]]: `(bronze_path, parquet_path, rows, error)` per file;
+        `error` is None on success.
+    """
+    results = []
+    for event_type, json_path, parquet_path in chunk:
+        try:
+            results.append((json_path, parquet_path, convert_file(event_type, json_path, parquet_path, engine), None))
+        except Exception as e:
+            results.append((json_path, parquet_path, 0, str(e)))
+    return results
+
+
+def convert_json_to_parquet(engine: str = "pandas", workers: int = 1, storage_path: str = BASE_STORAGE_PATH):
+    """
+    Converts raw JSON files from the bronze layer into trimmed Parquet files in the silver layer.
+
+    - Checks each event type's bronze folder (legacy JSON dumps and NDJSON segments)
+    - Avoids reprocessing files that already exist in silver
+    - Applies a YAML-driven schema transformation
+    - Records failed files in a retry list and quarantines repeat offenders
+
+    Args:
+        engine (str): "pandas" (default) or "arrow". The Arrow engine reads
+            bronze files straight into Arrow tables and writes Parquet without
+            building Python rows or a DataFrame; both produce the same schema.
+        workers (int): Number of worker processes. Above 1, files are fanned
+            out across a process pool in per-event-type chunks (backfill mode).
+        storage_path (str): Root of the bronze/silver layout.
+
+    Returns:
+        dict: Counts of converted files, failed files, rows and elapsed seconds.
+    """
+    failures = FailureLog(
+        os.path.join(storage_path, STATE_DIR, "transform_failures.json"),
+        os.path.join(storage_path, QUARANTINE_DIR)
+    )
+    pending = find_pending_files(storage_path)
+    summary = {"files": 0, "failed": 0, "rows": 0, "elapsed": 0.0}
+    BRONZE_BACKLOG.set(len(pending))
+    if not pending:
+        return summary
+
+    started = time.monotonic()
+    last_report = started
+
+    def handle(json_path, parquet_path, rows, error):
+        nonlocal last_report
+        BRONZE_BACKLOG.inc(-1)
+        if error is None:
+            failures.clear(json_path)
+            summary["files"] += 1
+            summary["rows"] += rows
+            if workers <= 1:
                 print(f"[SUCCESS] Wrote: {parquet_path}")
-            except Exception as e:
-                print(f"[ERROR] Failed to process {filename}: {e}")
+        else:
+            summary["failed"] += 1
+            FILES_FAILED.inc()
+            quarantined = failures.record(json_path, error)
+            print(f"[ERROR] Failed to process {os.path.basename(json_path)}: {error}"
+                  + (" (quarantined)" if quarantined else ""))
+
+        now = time.monotonic()
+        if workers > 1 and now - last_report >= PROGRESS_INTERVAL_SECONDS:
+            last_report = now
+            report_progress(summary, len(pending), now - started)
+
+    if workers <= 1:
+        for event_type, json_path, parquet_path in pending:
+            handle(*convert_chunk([(event_type, json_path, parquet_path)], engine)[0])
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(convert_chunk, chunk, engine) for chunk in chunk_by_event_type(pending)]
+            for future in as_completed(futures):
+                for result in future.result():
+                    handle(*result)
+
+    failures.save()
+    summary["elapsed"] = time.monotonic() - started
+    if workers > 1:
+        report_progress(summary, len(pending), summary["elapsed"])
+    log_timing("INFO", "Transform round complete", summary["elapsed"], engine=engine,
+               files=summary["files"], failed=summary["failed"], rows=summary["rows"])
+    return summary
+
+
+def watch_bronze(engine: str = "pandas", storage_path: str = BASE_STORAGE_PATH, stop_event=None,
+                 use_notifications: bool = True, poll_interval: float = POLL_FALLBACK_SECONDS):
+    """
+    Transforms bronze files as soon as they are complete, instead of rescanning on a timer.
+
+    Sealed segments are picked up on their final rename and legacy dumps once
+    they are closed (or, in the polling fallback, once they stop changing).
+    Progress is kept in `state/transform_checkpoint.json` (the sequences done
+    per writer stream), so a restart only handles files not transformed yet. Failures go through
+    the same retry list and quarantine as batch runs; pending retries are
+    attempted again at startup.
+
+    Args:
+        engine (str): "pandas" or "arrow".
+        storage_path (str): Root of the bronze/silver layout.
+        stop_event (threading.Event, optional): Stops watching when set.
+        use_notifications (bool): Use filesystem notifications when watchdog is installed.
+        poll_interval (float): Rescan interval of the polling fallback.
+    """
+    silver_dir_path = os.path.join(storage_path, SILVER_DIR)
+    failures = FailureLog(
+        os.path.join(storage_path, STATE_DIR, "transform_failures.json"),
+        os.path.join(storage_path, QUARANTINE_DIR)
+    )
+
+    def handle(event_type, json_path):
+        parquet_name = silver_file_name(os.path.basename(json_path))
+        parquet_path = os.path.join(silver_dir_path, event_type, parquet_name)
+        if parquet_exists(parquet_path) or parquet_name in compacted_sources(os.path.join(silver_dir_path, event_type)):
+            return
+
+        json_path, parquet_path, rows, error = convert_chunk([(event_type, json_path, parquet_path)], engine)[0]
+        if error is None:
+            failures.clear(json_path)
+            print(f"[SUCCESS] Wrote: {parquet_path} ({rows} rows)")
+        else:
+            FILES_FAILED.inc()
+            quarantined = failures.record(json_path, error)
+            print(f"[ERROR] Failed to process {os.path.basename(json_path)}: {error}"
+                  + (" (quarantined)" if quarantined else ""))
+        failures.save()
+
+    for json_path in failures.pending_retries():
+        if os.path.exists(json_path):
+            handle(os.path.basename(os.path.dirname(json_path)), json_path)
+
+    watcher = BronzeWatcher(
+        os.path.join(storage_path, BRONZE_DIR),
+        os.path.join(storage_path, STATE_DIR, "transform_checkpoint.json"),
+        handle,
+        poll_interval=poll_interval,
+        use_notifications=use_notifications,
+    )
+    watcher.run(stop_event)
+
+
+def chunk_by_event_type(pending, chunk_size: int = BACKFILL_CHUNK_SIZE):
+    """
+    Splits pending files into chunks that each hold a single event type.
+
+    Args:
+        pending (List[Tuple[str, str, str]]): Output of `find_pending_files`.
+        chunk_size (int): Maximum files per chunk.
+
+    Returns:
+        List[List[Tuple[str, str, str]]]: Chunks to hand to worker processes.
+    """
+    by_type = {}
+    for item in pending:
+        by_type.setdefault(item[0], []).append(item)
+
+    return [
+        files[i:i + chunk_size]
+        for files in by_type.values()
+        for i in range(0, len(files), chunk_size)
+    ]
+
+
+def report_progress(summary, total, elapsed):
+    """
+    Prints backfill progress and throughput.
+    """
+    done = summary["files"] + summary["failed"]
+    rate = done / elapsed if elapsed else 0.0
+    print(f"[PROGRESS] {done}/{total} files ({summary['failed']} failed) | "
+          f"{rate:.1f} files/s | {summary['rows'] / elapsed if elapsed else 0:.0f} rows/s")
+
 
 def transform_events(raw_events):
     """
     Applies schema-based field extraction to a list of raw GitHub events.
 
+    Uses the extractors compiled from the YAML config at import time and
+    builds the DataFrame from row tuples rather than per-event dicts.
+
     Args:
         raw_events (List[dict]): Raw GitHub events loaded from a JSON file.
 
     Returns:
         pd.DataFrame: A DataFrame of trimmed and typed events.
     """
-    trimmed_events = []
+    rows_by_type = {}
 
     for event in raw_events:
         event_type = event.get("type")
-        
+
         # Skip events not configured
-        if not event_type or event_type not in event_field_config:
+        if not event_type or event_type not in event_extractors:
             continue
 
         try:
-            # Get field paths from YAML config
-            fields = event_field_config[event_type]["fields"]
-            
-            # Dynamically extract only configured fields
-            trimmed = trim_event_dynamic(event, fields)
-            trimmed_events.append(trimmed)
+            rows_by_type.setdefault(event_type, []).append(event_extractors[event_type](event))
         except Exception as e:
             print(f"[WARN] Skipping event due to config error: {e}")
-    
-    # Create DataFrame and ensure datetime type
-    df = pd.DataFrame(trimmed_events)
+
+    if len(rows_by_type) == 1:
+        # Bronze files hold a single event type, so this is the usual path
+        event_type, rows = next(iter(rows_by_type.items()))
+        df = pd.DataFrame.from_records(rows, columns=event_field_config[event_type]["fields"])
+    else:
+        # Mixed input: fall back to dict rows so column order and row order match the input
+        df = pd.DataFrame([
+            trim_event_dynamic(event, event_field_config[event["type"]]["fields"])
+            for event in raw_events
+            if event.get("type") in event_extractors
+        ])
+
+    # Ensure datetime type
     df["created_at"] = pd.to_datetime(df["created_at"], errors="coerce")
     return df
 
@@ -96,11 +361,34 @@ if __name__ == "__main__":
         action="store_true",
         help="Live mode to keep transforming the data in the bronze layer."
     )
+    parser.add_argument(
+        "--engine",
+        choices=["pandas", "arrow"],
+        default="pandas",
+        help="Transform engine: pandas DataFrames or Arrow-native columnar projection."
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Worker processes for backfilling a large bronze backlog."
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Transform bronze files as soon as they are written (filesystem notifications or polling)."
+    )
     args = parser.parse_args()
 
-    if args.live:
-        while True:
-            convert_json_to_parquet()
-            time.sleep(10)
-    else:
-        convert_json_to_parquet()
\ No newline at end of file
+    exporter = TextfileExporter("transform").start()
+    try:
+        if args.watch:
+            watch_bronze(engine=args.engine)
+        elif args.live:
+            while True:
+                convert_json_to_parquet(engine=args.engine, workers=args.workers)
+                time.sleep(10)
+        else:
+            convert_json_to_parquet(engine=args.engine, workers=args.workers)
+    finally:
+        exporter.close()
\ No newline at end of file
@@ -0,0 +1,175 @@
+import json
+import pyarrow as pa
+import pyarrow.json as pa_json
+import pyarrow.compute as pc
+from utils.bronze_writer import segment_compression, read_bronze_file
+from utils.event_utils import compile_row_extractor
+from utils.silver_schema import conform_table, write_silver_table
+
+
+def raw_event_schema(schema):
+    """
+    Builds the nested schema of the raw JSON fields a silver schema is extracted from.
+
+    `payload.pull_request.merged: bool` becomes
+    `payload: struct<pull_request: struct<merged: bool>>`. Timestamps and
+    dictionary columns are read as plain strings and converted afterwards by
+    `conform_table`. The event `type` is always included, for filtering.
+
+    Args:
+        schema (pa.Schema): The event type's silver schema; its names are the field paths.
+
+    Returns:
+        pa.Schema: Schema to parse bronze events with.
+    """
+    tree = {"type": pa.string()}
+    for field in schema:
+        leaf_type = field.type
+        if pa.types.is_dictionary(leaf_type):
+            leaf_type = leaf_type.value_type
+        if pa.types.is_timestamp(leaf_type):
+            leaf_type = pa.string()
+        *parents, leaf = field.name.split(".")
+        node = tree
+        for key in parents:
+            node = node.setdefault(key, {})
+        node[leaf] = leaf_type
+
+    def to_type(node):
+        if isinstance(node, dict):
+            return pa.struct([pa.field(key, to_type(child)) for key, child in node.items()])
+        return node
+
+    return pa.schema([pa.field(key, to_type(child)) for key, child in tree.items()])
+
+
+def read_bronze_table(filepath, schema=None):
+    """
+    Reads a bronze file straight into an Arrow table.
+
+    NDJSON segments (optionally gzip/zstd compressed) are parsed by Arrow's
+    JSON reader. Legacy JSON-array dumps are loaded with `json` and converted
+    with `pa.Table.from_pylist`.
+
+    Given a silver schema, only the fields it is extracted from are parsed
+    (see `raw_event_schema`) and everything else, including the bulk of
+    `payload`, is skipped instead of being inferred and materialized.
+
+    Args:
+        filepath (str): Path to the bronze file.
+        schema (pa.Schema, optional): The event type's silver schema.
+
+    Returns:
+        pa.Table: One row per event, nested objects as struct columns.
+    """
+    raw_schema = raw_event_schema(schema) if schema is not None else None
+    if filepath.endswith(".json"):
+        with open(filepath, "r") as f:
+            return pa.Table.from_pylist(json.load(f), schema=raw_schema)
+
+    parse_options = None
+    if raw_schema is not None:
+        parse_options = pa_json.ParseOptions(explicit_schema=raw_schema, unexpected_field_behavior="ignore")
+    with pa.input_stream(filepath, compression=segment_compression(filepath)) as stream:
+        return pa_json.read_json(stream, parse_options=parse_options)
+
+
+def project_field(table, path):
+    """
+    Extracts a dot-separated path from a table as a flat column.
+
+    Missing fields anywhere along the path produce an all-null column, and a
+    null parent yields null children, matching `extract_nested_field`.
+
+    Args:
+        table (pa.Table): Table of raw events.
+        path (str): Dot-separated field path, e.g. `payload.pull_request.state`.
+
+    Returns:
+        pa.ChunkedArray: The projected column.
+    """
+    keys = path.split(".")
+    if keys[0] not in table.column_names:
+        return pa.chunked_array([pa.nulls(table.num_rows)])
+
+    column = table.column(keys[0])
+    for key in keys[1:]:
+        if not pa.types.is_struct(column.type) or column.type.get_field_index(key) < 0:
+            return pa.chunked_array([pa.nulls(table.num_rows)])
+        column = pc.struct_field(column, [key])
+    return column
+
+
+def trim_table(table, event_type, schema):
+    """
+    Projects the configured fields of one event type from a raw events table.
+
+    Args:
+        table (pa.Table): Table of raw events.
+        event_type (str): Event type to keep; rows of other types are dropped.
+        schema (pa.Schema): The event type's silver schema; its names are the field paths.
+
+    Returns:
+        pa.Table: One column per field path, cast to the declared types.
+    """
+    if "type" in table.column_names:
+        table = table.filter(pc.equal(table.column("type"), event_type))
+
+    projected = pa.table([project_field(table, path) for path in schema.names], names=schema.names)
+    return conform_table(projected, schema)
+
+
+def rows_to_table(raw_events, event_type, schema):
+    """
+    Builds the trimmed table from Python events without going through pandas.
+
+    Used when Arrow's JSON reader cannot infer one type for a raw field
+    (e.g. a payload key that is sometimes a string and sometimes an object).
+
+    Args:
+        raw_events (List[dict]): Raw events.
+        event_type (str): Event type to keep.
+        schema (pa.Schema): The event type's silver schema.
+
+    Returns:
+        pa.Table: One column per field path, cast to the declared types.
+    """
+    extractor = compile_row_extractor(schema.names)
+    return tuples_to_table([extractor(event) for event in raw_events if event.get("type") == event_type], schema)
+
+
+def tuples_to_table(rows, schema):
+    """
+    Builds the trimmed table from row tuples produced by a compiled row extractor.
+
+    Args:
+        rows (List[tuple]): One tuple per event, in schema order.
+        schema (pa.Schema): The event type's silver schema.
+
+    Returns:
+        pa.Table: One column per field path, cast to the declared types.
+    """
+    values = list(zip(*rows)) if rows else [()] * len(schema)
+    return conform_table(pa.table([pa.array(list(v)) for v in values], names=schema.names), schema)
+
+
+def convert_file_arrow(bronze_path, parquet_path, event_type, schema):
+    """
+    Converts one bronze file to a trimmed Parquet file using Arrow only.
+
+    Args:
+        bronze_path (str): Bronze file (legacy JSON or NDJSON segment).
+        parquet_path (str): Destination Parquet path.
+        event_type (str): Event type of the file.
+        schema (pa.Schema): The event type's silver schema, from filtered_events.yaml.
+
+    Returns:
+        int: Number of rows written.
+    """
+    try:
+        table = trim_table(read_bronze_table(bronze_path, schema), event_type, schema)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError):
+        table = rows_to_table(read_bronze_file(bronze_path), event_type, schema)
+
+    write_silver_table(table, parquet_path)
+    return table.num_rows
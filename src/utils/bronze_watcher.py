@@ -0,0 +1,263 @@
+import os
+import re
+import time
+import queue
+import threading
+from utils.bronze_writer import is_bronze_file
+from utils.file_ops import load_json_file, write_json_atomic
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # Fall back to polling when watchdog is not installed
+    Observer = None
+    FileSystemEventHandler = object
+
+# Constants
+WATCH_POLL_SECONDS = 1.0             # Idle wait between notification checks
+POLL_FALLBACK_SECONDS = 10.0         # Rescan interval when polling instead of using notifications
+SETTLE_SECONDS = 2.0                 # Legacy .json dumps must be unchanged this long before polling picks them up
+CHECKPOINT_SAVE_SECONDS = 5.0        # Shortest gap between checkpoint writes while files keep arriving
+
+
+class TransformCheckpoint:
+    """
+    Persistent record of the bronze segments already transformed, per event type.
+
+    Segments are tracked per writer stream (the `prefix` in
+    `<EventType>_<prefix>_<sequence>.ndjson`): every sequence up to `through`
+    is done, plus the ones in `above`. Streams seal their segments in
+    sequence order, so `above` stays short, and `prune` drops streams whose
+    files are all gone, so the record does not grow with history.
+
+    Unlike a modification-time watermark, this never skips a file sealed
+    after a newer file of another stream (e.g. an age-rolled ingest segment
+    landing after a GH Archive backfill segment). Legacy `.json` dumps have
+    no sequence and are not recorded; transform skips those that already
+    have silver output.
+    """
+
+    def __init__(self, state_path):
+        self.state_path = state_path
+        self.marks = {}
+        self.dirty = False
+        self.saved_at = time.monotonic()
+        state = load_json_file(state_path) if os.path.exists(state_path) else {}
+        for event_type, mark in state.items():
+            if "mtime_ns" in mark:
+                # Written by the former mtime watermark: re-check every file; transform skips those with silver output
+                print(f"[INFO] Resetting the {event_type} transform checkpoint to per-stream sequences")
+                continue
+            streams = mark.get("streams", mark)  # Earlier versions also listed legacy dumps next to `streams`
+            self.marks[event_type] = {stream: {"through": m["through"], "above": set(m["above"])}
+                                      for stream, m in streams.items()}
+
+    @staticmethod
+    def segment(event_type, name):
+        """
+        Returns `(stream, sequence)` of a segment name, or None for a legacy dump.
+        """
+        match = re.match(rf"^{re.escape(event_type)}_(.+)_(\d+)\.ndjson", name)
+        return (match.group(1), int(match.group(2))) if match else None
+
+    def is_done(self, event_type, name):
+        segment = self.segment(event_type, name)
+        if segment is None:
+            return False
+        stream = self.marks.get(event_type, {}).get(segment[0])
+        return stream is not None and (segment[1] <= stream["through"] or segment[1] in stream["above"])
+
+    def mark(self, event_type, name):
+        """
+        Records a processed segment; legacy dumps are ignored.
+        """
+        segment = self.segment(event_type, name)
+        if segment is None:
+            return
+        stream = self.marks.setdefault(event_type, {}).setdefault(segment[0], {"through": 0, "above": set()})
+        if segment[1] > stream["through"]:
+            stream["above"].add(segment[1])
+        # Fold the contiguous run into `through`
+        while stream["through"] + 1 in stream["above"]:
+            stream["through"] += 1
+            stream["above"].discard(stream["through"])
+        self.dirty = True
+
+    def prune(self, present):
+        """
+        Forgets streams that have no file left on disk.
+
+        A writer numbers a stream from one past its highest file on disk, so a
+        stream whose files were all removed would otherwise be skipped when it
+        starts over.
+
+        Args:
+            present (Dict[str, Set[str]]): Streams with at least one file, per event type.
+        """
+        for event_type, streams in self.marks.items():
+            for stream in [s for s in streams if s not in present.get(event_type, ())]:
+                del streams[stream]
+                self.dirty = True
+
+    def save(self):
+        if self.dirty:
+            write_json_atomic({event_type: {stream: {"through": m["through"], "above": sorted(m["above"])}
+                                            for stream, m in streams.items()}
+                               for event_type, streams in self.marks.items()}, self.state_path)
+            self.dirty = False
+        self.saved_at = time.monotonic()
+
+    def save_if_due(self, interval=CHECKPOINT_SAVE_SECONDS):
+        if self.dirty and time.monotonic() - self.saved_at >= interval:
+            self.save()
+
+
+class _BronzeEventHandler(FileSystemEventHandler):
+    """
+    Queues bronze files as soon as their write is complete.
+
+    Segments become visible through an atomic rename from their hidden
+    `.tmp` name, so only the move is reported. Legacy `.json` dumps are
+    written in place and are reported once the writer closes them.
+    """
+
+    def __init__(self, pending):
+        self.pending = pending
+
+    def on_moved(self, event):
+        if not event.is_directory and is_bronze_file(os.path.basename(event.dest_path)):
+            self.pending.put(event.dest_path)
+
+    def on_closed(self, event):
+        if not event.is_directory and event.src_path.endswith(".json") and is_bronze_file(os.path.basename(event.src_path)):
+            self.pending.put(event.src_path)
+
+
+class BronzeWatcher:
+    """
+    Hands new, complete bronze files to a callback as they appear.
+
+    Uses filesystem notifications (inotify and friends via watchdog) when
+    available, otherwise rescans the bronze folders every `poll_interval`
+    seconds. Either way, files are filtered against the checkpoint, which is
+    saved at most every `CHECKPOINT_SAVE_SECONDS` and after each full scan;
+    files handled since the last save are handed over again after a crash,
+    which the callback must tolerate. Recovery after a restart starts from it.
+    """
+
+    def __init__(self, bronze_dir, checkpoint_path, handle_fn, poll_interval=POLL_FALLBACK_SECONDS,
+                 settle_seconds=SETTLE_SECONDS, use_notifications=True):
+        self.bronze_dir = bronze_dir
+        self.checkpoint = TransformCheckpoint(checkpoint_path)
+        self.handle_fn = handle_fn
+        self.poll_interval = poll_interval
+        self.settle_seconds = settle_seconds
+        self.use_notifications = use_notifications and Observer is not None
+        self.pending = queue.Queue()
+        self.handled_dumps = set()   # Legacy dumps handed over by this process (they have no sequence)
+
+    def _is_done(self, event_type, name):
+        return name in self.handled_dumps or self.checkpoint.is_done(event_type, name)
+
+    def scan(self):
+        """
+        Lists complete bronze files not handled yet, oldest first, and prunes the checkpoint.
+
+        Returns:
+            List[Tuple[str, str, int]]: `(event_type, path, mtime_ns)` per file.
+        """
+        found = []
+        if not os.path.isdir(self.bronze_dir):
+            return found
+
+        present = {}
+        settled_before = time.time_ns() - int(self.settle_seconds * 1e9)
+        for type_entry in os.scandir(self.bronze_dir):
+            if not type_entry.is_dir() or type_entry.name.startswith("."):
+                continue
+            streams = present.setdefault(type_entry.name, set())
+            for entry in os.scandir(type_entry.path):
+                if not is_bronze_file(entry.name):
+                    continue
+                segment = self.checkpoint.segment(type_entry.name, entry.name)
+                if segment is not None:
+                    streams.add(segment[0])
+                if self._is_done(type_entry.name, entry.name):
+                    continue
+                mtime_ns = entry.stat().st_mtime_ns
+                # A legacy dump could still be being written; a later pass picks it up
+                if entry.name.endswith(".json") and mtime_ns > settled_before:
+                    continue
+                found.append((type_entry.name, entry.path, mtime_ns))
+
+        self.checkpoint.prune(present)
+        return sorted(found, key=lambda item: item[2])
+
+    def process(self, path):
+        """
+        Runs the callback for one file unless it was already handled.
+
+        Returns:
+            bool: True if the callback ran.
+        """
+        if not os.path.exists(path):
+            return False  # Quarantined or removed in the meantime
+
+        event_type = os.path.basename(os.path.dirname(path))
+        name = os.path.basename(path)
+        if self._is_done(event_type, name):
+            return False
+
+        self.handle_fn(event_type, path)
+        if self.checkpoint.segment(event_type, name) is None:
+            self.handled_dumps.add(name)
+        self.checkpoint.mark(event_type, name)
+        self.checkpoint.save_if_due()
+        return True
+
+    def catch_up(self):
+        """
+        Processes every file not handled yet (restart recovery / polling pass), then saves the checkpoint.
+
+        Returns:
+            int: Number of files processed.
+        """
+        processed = sum(self.process(path) for _, path, _ in self.scan())
+        self.checkpoint.save()
+        return processed
+
+    def run(self, stop_event=None):
+        """
+        Watches the bronze folder until `stop_event` is set (or forever).
+
+        Args:
+            stop_event (threading.Event, optional): Stops the watcher when set.
+        """
+        stop_event = stop_event or threading.Event()
+        observer = None
+        if self.use_notifications:
+            os.makedirs(self.bronze_dir, exist_ok=True)
+            observer = Observer()
+            observer.schedule(_BronzeEventHandler(self.pending), self.bronze_dir, recursive=True)
+            observer.start()
+            print(f"[INFO] Watching {self.bronze_dir} for new bronze files")
+        else:
+            print(f"[INFO] Polling {self.bronze_dir} every {self.poll_interval}s for new bronze files")
+
+        try:
+            # Files sealed while we were down (or before the observer started)
+            self.catch_up()
+            while not stop_event.is_set():
+                if observer is None:
+                    stop_event.wait(self.poll_interval)
+                    self.catch_up()
+                    continue
+                try:
+                    self.process(self.pending.get(timeout=WATCH_POLL_SECONDS))
+                except queue.Empty:
+                    self.checkpoint.save_if_due()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self.checkpoint.save()
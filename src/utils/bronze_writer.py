@@ -0,0 +1,293 @@
+import io
+import os
+import re
+import gzip
+import json
+import time
+from utils.file_ops import ensure_directory_exists
+
+try:
+    import zstandard
+except ImportError:  # zstd segments are optional
+    zstandard = None
+
+# Constants
+SEGMENT_MAX_BYTES = 8 * 1024 * 1024  # Roll the open segment once it reaches this size on disk
+SEGMENT_MAX_AGE_SECONDS = 60         # ...or once it has been open this long
+COMPRESSION_SUFFIXES = {None: "", "gzip": ".gz", "zstd": ".zst"}
+BRONZE_EXTENSIONS = (".json", ".ndjson", ".ndjson.gz", ".ndjson.zst")
+
+
+def segment_file_name(event_type, sequence, compression=None, prefix="seg"):
+    """
+    Builds the file name of a sealed bronze segment.
+
+    Args:
+        event_type (str): Type of GitHub event.
+        sequence (int): Monotonically increasing segment number.
+        compression (str, optional): None, "gzip" or "zstd".
+        prefix (str): Stream name that keeps independent writers apart.
+
+    Returns:
+        str: e.g. `WatchEvent_seg_0000000042.ndjson.gz`.
+    """
+    return f"{event_type}_{prefix}_{sequence:010d}.ndjson{COMPRESSION_SUFFIXES[compression]}"
+
+
+def segment_compression(filepath):
+    """
+    Infers a segment's compression from its name (ignoring a `.tmp` suffix).
+
+    Args:
+        filepath (str): Segment path.
+
+    Returns:
+        str or None: "gzip", "zstd" or None.
+    """
+    name = filepath[:-len(".tmp")] if filepath.endswith(".tmp") else filepath
+    if name.endswith(".gz"):
+        return "gzip"
+    if name.endswith(".zst"):
+        return "zstd"
+    return None
+
+
+def open_segment_for_read(filepath):
+    """
+    Opens a (possibly compressed) NDJSON segment as a binary line stream.
+
+    Args:
+        filepath (str): Path of a `.ndjson`, `.ndjson.gz` or `.ndjson.zst` file.
+
+    Returns:
+        IO[bytes]: Readable binary stream of the decompressed content.
+    """
+    compression = segment_compression(filepath)
+    if compression == "gzip":
+        return gzip.open(filepath, "rb")
+    if compression == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst segments")
+        reader = zstandard.ZstdDecompressor().stream_reader(open(filepath, "rb"), read_across_frames=True, closefd=True)
+        return io.BufferedReader(reader)
+    return open(filepath, "rb")
+
+
+def is_bronze_file(filename):
+    """
+    Checks whether a file name is a sealed bronze file in either format.
+
+    Args:
+        filename (str): File name (not path).
+
+    Returns:
+        bool: True for legacy `.json` dumps and sealed NDJSON segments.
+    """
+    return not filename.startswith(".") and filename.endswith(BRONZE_EXTENSIONS)
+
+
+def silver_file_name(filename):
+    """
+    Maps a bronze file name to the name of its silver Parquet file.
+
+    Args:
+        filename (str): Bronze file name, e.g. `WatchEvent_seg_0000000001.ndjson.gz`.
+
+    Returns:
+        str: e.g. `WatchEvent_seg_0000000001.parquet`.
+    """
+    for extension in sorted(BRONZE_EXTENSIONS, key=len, reverse=True):
+        if filename.endswith(extension):
+            return filename[:-len(extension)] + ".parquet"
+    return filename + ".parquet"
+
+
+def read_bronze_file(filepath):
+    """
+    Loads the events of a bronze file in either the legacy or the segment format.
+
+    Legacy dumps are a single pretty-printed JSON array; segments are
+    newline-delimited JSON, optionally gzip or zstd compressed.
+
+    Args:
+        filepath (str): Path to the bronze file.
+
+    Returns:
+        List[dict]: Events in file order.
+    """
+    if filepath.endswith(".json"):
+        with open(filepath, "r") as f:
+            return json.load(f)
+
+    with open_segment_for_read(filepath) as stream:
+        return [json.loads(line) for line in stream if line.strip()]
+
+
+class BronzeSegmentWriter:
+    """
+    Appends events of one type as newline-delimited JSON to rolling segments.
+
+    The open segment is written to a hidden temporary file and only renamed
+    to its final, sequence-numbered name once it is sealed (by size, age or
+    on close), so downstream readers never see a partial segment.
+    """
+
+    def __init__(self, event_type, bronze_dir, compression=None, prefix="seg",
+                 max_bytes=SEGMENT_MAX_BYTES, max_age_seconds=SEGMENT_MAX_AGE_SECONDS):
+        if compression not in COMPRESSION_SUFFIXES:
+            raise ValueError(f"Unsupported compression '{compression}'")
+        if compression == "zstd" and zstandard is None:
+            raise RuntimeError("zstandard is required for zstd compressed segments")
+
+        self.event_type = event_type
+        self.directory = os.path.join(bronze_dir, event_type)
+        self.compression = compression
+        self.prefix = prefix
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+
+        self._stream = None          # Open segment (raw file plus optional compressor)
+        self._opened_at = None
+        self._final_path = None
+        self._tmp_path = None
+
+        ensure_directory_exists(self.directory)
+        self._recover_stale_segments()
+        self.sequence = self._next_sequence()
+
+    def _next_sequence(self):
+        """
+        Returns one past the highest sequence number already on disk.
+        """
+        pattern = re.compile(rf"^\.?{re.escape(self.event_type)}_{re.escape(self.prefix)}_(\d+)\.ndjson")
+        sequences = [int(m.group(1)) for m in map(pattern.match, os.listdir(self.directory)) if m]
+        return max(sequences, default=0) + 1
+
+    def _recover_stale_segments(self):
+        """
+        Seals temporary segments left behind by a crashed writer.
+
+        Only complete JSON lines are kept; a torn trailing line is dropped.
+        """
+        for name in os.listdir(self.directory):
+            if not (name.startswith(f".{self.event_type}_{self.prefix}_") and name.endswith(".tmp")):
+                continue
+
+            tmp_path = os.path.join(self.directory, name)
+            final_path = os.path.join(self.directory, name[1:-len(".tmp")])
+            lines = []
+            try:
+                with open_segment_for_read(tmp_path) as stream:
+                    for line in stream:
+                        if line.endswith(b"\n"):
+                            lines.append(line)
+            except Exception:
+                pass  # Truncated compressed stream; keep what decoded cleanly
+
+            if lines:
+                with _SegmentStream(tmp_path, segment_compression(tmp_path)) as (raw, stream):
+                    stream.write(b"".join(lines))
+                os.replace(tmp_path, final_path)
+                print(f"[INFO] Recovered {len(lines)} events into {final_path}")
+            else:
+                os.remove(tmp_path)
+
+    def append(self, events):
+        """
+        Appends events to the open segment, starting a new one if needed.
+
+        Args:
+            events (Iterable[dict]): Events to write.
+
+        Returns:
+            str or None: Path of a segment sealed by this call, if any.
+        """
+        if self._stream is None:
+            self._start_segment()
+
+        payload = "".join(json.dumps(event, separators=(",", ":")) + "\n" for event in events)
+        self._stream.stream.write(payload.encode("utf-8"))
+        self._stream.flush()
+
+        if self._stream.raw.tell() >= self.max_bytes:
+            return self.roll()
+        return self.roll_if_due()
+
+    def roll_if_due(self):
+        """
+        Seals the open segment if it is older than `max_age_seconds`.
+
+        Returns:
+            str or None: Path of the sealed segment, if one was sealed.
+        """
+        if self._stream is not None and time.monotonic() - self._opened_at >= self.max_age_seconds:
+            return self.roll()
+        return None
+
+    def roll(self):
+        """
+        Seals the open segment: closes it and renames it to its final name.
+
+        Returns:
+            str or None: Path of the sealed segment, or None if nothing was open.
+        """
+        if self._stream is None:
+            return None
+
+        self._stream.close()
+        os.replace(self._tmp_path, self._final_path)
+        sealed = self._final_path
+
+        self._stream = None
+        self.sequence += 1
+        return sealed
+
+    def close(self):
+        """
+        Seals any open segment.
+
+        Returns:
+            str or None: Path of the sealed segment, if any.
+        """
+        return self.roll()
+
+    def _start_segment(self):
+        name = segment_file_name(self.event_type, self.sequence, self.compression, self.prefix)
+        self._final_path = os.path.join(self.directory, name)
+        self._tmp_path = os.path.join(self.directory, f".{name}.tmp")
+        self._stream = _SegmentStream(self._tmp_path, self.compression)
+        self._opened_at = time.monotonic()
+
+
+class _SegmentStream:
+    """
+    A raw file plus an optional compressor writing into it.
+    """
+
+    def __init__(self, path, compression):
+        self.raw = open(path, "wb")
+        if compression == "gzip":
+            self.stream = gzip.GzipFile(fileobj=self.raw, mode="wb")
+        elif compression == "zstd":
+            self.stream = zstandard.ZstdCompressor().stream_writer(self.raw, closefd=False)
+        else:
+            self.stream = self.raw
+
+    def __enter__(self):
+        return self.raw, self.stream
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def flush(self):
+        if self.stream is not self.raw:
+            if isinstance(self.stream, gzip.GzipFile):
+                self.stream.flush()
+            else:
+                self.stream.flush(zstandard.FLUSH_BLOCK)
+        self.raw.flush()
+
+    def close(self):
+        if self.stream is not self.raw:
+            self.stream.close()
+        self.raw.close()
@@ -0,0 +1,344 @@
+import os
+import re
+import glob
+import shutil
+import threading
+from datetime import datetime, timezone
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from utils.bronze_writer import is_bronze_file, silver_file_name
+from utils.file_ops import load_json_file, write_json_atomic, ensure_directory_exists
+from utils.silver_schema import conform_table, decoded_schema, write_silver_table, ROW_GROUP_SIZE
+
+# Constants
+COMPACTION_MANIFEST = "_compaction_manifest.json"
+TARGET_FILE_BYTES = 128 * 1024 * 1024    # Target in-memory (Arrow) size of a compacted file
+SMALL_FILE_BYTES = 32 * 1024 * 1024      # Compacted files below this are merged again
+BATCH_INPUT_BYTES = 64 * 1024 * 1024     # On-disk size of the loose files read into memory at once
+SORT_KEYS = [("repo.name", "ascending"), ("created_at", "ascending")]
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+BRONZE_DERIVED = re.compile(r"_\d+\.parquet$")  # Segments and dumps end in a number; backfill silver files do not
+
+# Parsed `sources` per manifest path, keyed by the file's identity so a rewrite is picked up
+_sources_cache = {}
+_sources_lock = threading.Lock()
+
+
+def load_compaction_manifest(event_dir):
+    """
+    Loads the compaction manifest of an event type's silver folder.
+
+    Args:
+        event_dir (str): `data/silver/<EventType>` folder.
+
+    Returns:
+        dict: `{"sources": {parquet_name: run_id}, "runs": {run_id: {"inputs": [...], "outputs": [...]}}}`;
+            `runs` holds compactions that have not finished committing.
+    """
+    path = os.path.join(event_dir, COMPACTION_MANIFEST)
+    manifest = load_json_file(path) if os.path.exists(path) else {"sources": {}}
+    manifest.setdefault("runs", {})
+    return manifest
+
+
+def save_compaction_manifest(event_dir, manifest):
+    write_json_atomic(manifest, os.path.join(event_dir, COMPACTION_MANIFEST))
+
+
+def compacted_sources(event_dir):
+    """
+    Returns the names of silver files already folded into compacted partitions.
+
+    Transform uses this so it does not regenerate files that compaction removed.
+    It is checked for every bronze file, so the manifest is parsed once and
+    only read again after compaction has replaced it.
+
+    Returns:
+        frozenset[str]: Silver file names.
+    """
+    path = os.path.join(event_dir, COMPACTION_MANIFEST)
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return frozenset()
+    identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    with _sources_lock:
+        cached = _sources_cache.get(path)
+    if cached is not None and cached[0] == identity:
+        return cached[1]
+    sources = frozenset(load_compaction_manifest(event_dir)["sources"])
+    with _sources_lock:
+        _sources_cache[path] = (identity, sources)
+    return sources
+
+
+def prune_compacted_sources(event_dir, bronze_dir):
+    """
+    Forgets compacted silver files whose bronze file is gone, so the manifest does not grow with history.
+
+    Once its bronze file is deleted a loose file cannot be regenerated, and
+    keeping the entry would be wrong: a writer whose stream has no file left
+    numbers it from one again, and transform would skip the new segment.
+    Files the GH Archive backfill wrote straight to silver have no bronze
+    file and are kept; nothing is pruned while `bronze_dir` does not exist.
+
+    Args:
+        event_dir (str): `data/silver/<EventType>` folder.
+        bronze_dir (str): `data/bronze/<EventType>` folder.
+
+    Returns:
+        int: Number of entries removed.
+    """
+    if not os.path.isdir(bronze_dir):
+        return 0
+    manifest = load_compaction_manifest(event_dir)
+    on_disk = {silver_file_name(name) for name in os.listdir(bronze_dir) if is_bronze_file(name)}
+    stale = [name for name, run_id in manifest["sources"].items()
+             if BRONZE_DERIVED.search(name) and name not in on_disk and run_id not in manifest["runs"]]
+    if stale:
+        for name in stale:
+            del manifest["sources"][name]
+        save_compaction_manifest(event_dir, manifest)
+    return len(stale)
+
+
+def loose_files(event_dir, event_type):
+    """
+    Lists silver files written directly by transform (not yet compacted).
+    """
+    return sorted(glob.glob(os.path.join(event_dir, f"{event_type}*.parquet")))
+
+
+def small_compacted_files(event_dir, event_type, date="*", hour="*"):
+    """
+    Lists compacted files that are still well below the target size, optionally of one partition.
+    """
+    pattern = os.path.join(event_dir, f"date={date}", f"hour={hour}", f"{event_type}_compacted_*.parquet")
+    return sorted(p for p in glob.glob(pattern) if os.path.getsize(p) < SMALL_FILE_BYTES)
+
+
+def input_batches(paths, batch_bytes=BATCH_INPUT_BYTES):
+    """
+    Splits files into consecutive batches of at most `batch_bytes` on disk (at least one file each).
+    """
+    batch, size = [], 0
+    for path in paths:
+        file_size = os.path.getsize(path)
+        if batch and size + file_size > batch_bytes:
+            yield batch
+            batch, size = [], 0
+        batch.append(path)
+        size += file_size
+    if batch:
+        yield batch
+
+
+def hidden_path(path):
+    """
+    Returns the name an input is moved to while its compaction commits; readers skip it.
+    """
+    return os.path.join(os.path.dirname(path), f".{os.path.basename(path)}.compacting")
+
+
+def recover_interrupted_runs(event_dir):
+    """
+    Finishes or undoes compactions that stopped before committing, and removes stale staging folders.
+
+    A run whose outputs are all in place is rolled forward (its hidden inputs
+    are deleted); any other run is rolled back (moved outputs are deleted
+    before the inputs are restored, and their manifest entries dropped), so no
+    row is ever visible both in a loose and in a compacted file.
+
+    Args:
+        event_dir (str): `data/silver/<EventType>` folder.
+    """
+    manifest = load_compaction_manifest(event_dir)
+    for run_id, run in list(manifest["runs"].items()):
+        committed = all(os.path.exists(os.path.join(event_dir, path)) for path in run["outputs"])
+        if not committed:
+            for relative_path in run["outputs"]:
+                if os.path.exists(os.path.join(event_dir, relative_path)):
+                    os.remove(os.path.join(event_dir, relative_path))
+        for relative_path in run["inputs"]:
+            path = os.path.join(event_dir, relative_path)
+            if committed:
+                for leftover in (path, hidden_path(path)):
+                    if os.path.exists(leftover):
+                        os.remove(leftover)
+            elif os.path.exists(hidden_path(path)):
+                os.replace(hidden_path(path), path)
+        if not committed:
+            manifest["sources"] = {name: rid for name, rid in manifest["sources"].items() if rid != run_id}
+        print(f"[WARN] {'Completed' if committed else 'Rolled back'} interrupted compaction {run_id} in {event_dir}")
+        del manifest["runs"][run_id]
+        save_compaction_manifest(event_dir, manifest)
+
+    for name in os.listdir(event_dir):
+        if name.startswith(".compaction_"):
+            shutil.rmtree(os.path.join(event_dir, name), ignore_errors=True)
+
+
+def partition_keys(table):
+    """
+    Computes the hive partition values (`date`, `hour`) of each row from `created_at`.
+
+    Returns:
+        Tuple[pa.Array, pa.Array]: UTC date strings and two-digit hour strings.
+    """
+    created_at = table.column("created_at")
+    if created_at.type.tz is None:
+        created_at = pc.assume_timezone(created_at, "UTC")
+    dates = pc.fill_null(pc.strftime(created_at, format="%Y-%m-%d", locale="C"), NULL_PARTITION)
+    hours = pc.fill_null(pc.strftime(created_at, format="%H", locale="C"), NULL_PARTITION)
+    return dates, hours
+
+
+def write_partition(table, staging_dir, event_type, run_id, date, hour, target_bytes, schema=None):
+    """
+    Sorts one partition's rows and writes them as right-sized Parquet files.
+
+    With a `schema`, the rows are re-encoded to it (dictionary columns included) when written.
+
+    Returns:
+        List[str]: Staged file paths, relative to `staging_dir`.
+    """
+    table = table.sort_by(SORT_KEYS)
+    if schema is not None:
+        table = conform_table(table, schema)
+    bytes_per_row = max(1, table.nbytes // max(1, table.num_rows))
+    rows_per_file = max(1, target_bytes // bytes_per_row)
+    relative_dir = os.path.join(f"date={date}", f"hour={hour}")
+    ensure_directory_exists(os.path.join(staging_dir, relative_dir))
+
+    written = []
+    for part, offset in enumerate(range(0, table.num_rows, rows_per_file)):
+        relative_path = os.path.join(relative_dir, f"{event_type}_compacted_{run_id}_{part:04d}.parquet")
+        write_silver_table(table.slice(offset, rows_per_file), os.path.join(staging_dir, relative_path),
+                           row_group_size=ROW_GROUP_SIZE)
+        written.append(relative_path)
+    return written
+
+
+def read_inputs(paths, schema=None):
+    """
+    Reads silver files into one table, cast to the decoded form of `schema` if given.
+    """
+    if schema is None:
+        return pa.concat_tables([pq.read_table(path) for path in paths], promote_options="permissive")
+    # Sorting does not accept dictionary columns, so merge in decoded form
+    plain = decoded_schema(schema)
+    return pa.concat_tables([conform_table(pq.read_table(path), plain) for path in paths])
+
+
+def drop_duplicate_ids(table):
+    """
+    Keeps the first row of every `id`, preserving row order.
+    """
+    if "id" not in table.column_names:
+        return table
+    positions = pa.table({"id": table.column("id"), "row": pa.array(range(table.num_rows), pa.int64())})
+    first = positions.group_by("id", use_threads=False).aggregate([("row", "min")]).column("row_min")
+    if len(first) == table.num_rows:
+        return table
+    return table.take(pc.take(first, pc.sort_indices(first)))
+
+
+def compact_event_type(event_dir, event_type, target_bytes=TARGET_FILE_BYTES, schema=None,
+                       batch_bytes=BATCH_INPUT_BYTES, bronze_dir=None):
+    """
+    Merges an event type's small silver files into date/hour partitioned files.
+
+    Loose files are read in batches of at most `batch_bytes`. Each batch is
+    merged with the undersized compacted files of the partitions it touches
+    (and only those, so the rest of the history is not rewritten), deduplicated
+    on `id`, and committed as one run:
+    1. Write sorted, right-sized partition files into a hidden staging folder.
+    2. Journal the run (inputs and outputs) in the compaction manifest and
+       record the loose files as compacted (so transform skips them).
+    3. Hide the inputs, then move the staged files into `date=YYYY-MM-DD/hour=HH/`
+       with atomic renames; readers never see a row twice.
+    4. Delete the hidden inputs and clear the run from the journal.
+    A run interrupted after step 2 is completed or undone by the next call.
+
+    Args:
+        event_dir (str): `data/silver/<EventType>` folder.
+        event_type (str): Event type being compacted.
+        target_bytes (int): Target in-memory size per output file.
+        schema (pa.Schema, optional): The event type's declared silver schema. Inputs
+            written before it (or with drifted types) are cast to it, so compacted files
+            always match; without it, input schemas are merged permissively.
+        batch_bytes (int): On-disk size of loose files read into memory at once.
+        bronze_dir (str, optional): The event type's bronze folder; when given,
+            manifest entries whose bronze file is gone are pruned first.
+
+    Returns:
+        dict: Number of input files, output files and rows.
+    """
+    recover_interrupted_runs(event_dir)
+    if bronze_dir is not None:
+        prune_compacted_sources(event_dir, bronze_dir)
+    summary = {"inputs": 0, "outputs": 0, "rows": 0}
+    for batch in input_batches(loose_files(event_dir, event_type), batch_bytes):
+        result = compact_batch(event_dir, event_type, batch, target_bytes, schema)
+        for key in summary:
+            summary[key] += result[key]
+    return summary
+
+
+def compact_batch(event_dir, event_type, loose, target_bytes, schema):
+    """
+    Compacts one batch of loose files together with the small files of the partitions they touch.
+    """
+    table = read_inputs(loose, schema)
+    dates, hours = partition_keys(table)
+
+    run_id = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    staging_dir = os.path.join(event_dir, f".compaction_{run_id}")
+    inputs, outputs, rows = list(loose), [], 0
+    try:
+        for pair in pa.table({"date": dates, "hour": hours}).group_by(["date", "hour"]).aggregate([]).to_pylist():
+            mask = pc.and_(pc.equal(dates, pair["date"]), pc.equal(hours, pair["hour"]))
+            partition = table.filter(mask)
+            small = small_compacted_files(event_dir, event_type, pair["date"], pair["hour"])
+            if small:
+                partition = pa.concat_tables([partition, read_inputs(small, schema)], promote_options="permissive")
+                inputs += small
+            partition = drop_duplicate_ids(partition)
+            rows += partition.num_rows
+            outputs += write_partition(partition, staging_dir, event_type, run_id,
+                                       pair["date"], pair["hour"], target_bytes, schema)
+        commit_run(event_dir, run_id, loose, inputs, outputs, staging_dir)
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+    return {"inputs": len(inputs), "outputs": len(outputs), "rows": rows}
+
+
+def commit_run(event_dir, run_id, loose, inputs, outputs, staging_dir):
+    """
+    Swaps a run's inputs for its staged outputs, journaled so a crash can be recovered.
+    """
+    manifest = load_compaction_manifest(event_dir)
+    manifest["runs"][run_id] = {
+        "inputs": [os.path.relpath(path, event_dir) for path in inputs],
+        "outputs": outputs,
+    }
+    manifest["sources"].update({os.path.basename(path): run_id for path in loose})
+    save_compaction_manifest(event_dir, manifest)
+
+    try:
+        for path in inputs:
+            os.replace(path, hidden_path(path))
+        for relative_path in outputs:
+            final_path = os.path.join(event_dir, relative_path)
+            ensure_directory_exists(os.path.dirname(final_path))
+            os.replace(os.path.join(staging_dir, relative_path), final_path)
+    except Exception:
+        recover_interrupted_runs(event_dir)  # Outputs are not all in place, so this rolls the run back
+        raise
+
+    for path in inputs:
+        os.remove(hidden_path(path))
+    del manifest["runs"][run_id]
+    save_compaction_manifest(event_dir, manifest)
@@ -1,19 +1,480 @@
+import os
+import glob
+import hashlib
+import queue
+import threading
+import time
+import weakref
+from contextlib import contextmanager, nullcontext
 import duckdb
 
 # Path to the DuckDB database file
 DUCKDB_PATH = "data/db/github_events.duckdb"
 
-def run_query(sql: str):
+# Constants
+SNAPSHOT_DIR = "snapshots"           # Read-only copies published by the materializer (next to the database)
+SNAPSHOT_POINTER = "CURRENT"         # File inside SNAPSHOT_DIR naming the snapshot readers should use
+SNAPSHOTS_KEPT = 3                   # Older snapshots are deleted once a newer one is published
+SNAPSHOT_MIN_INTERVAL_SECONDS = 5    # Shortest gap between two snapshots of a changing database
+SNAPSHOT_COST_FACTOR = 10            # ...and at least this many times as long as the last copy took
+SNAPSHOT_SLOW_SECONDS = 30           # Copies slower than this are logged: the database is outgrowing table mode
+POOL_SIZE = 8                        # Cursors shared by concurrent API requests
+CURSOR_WAIT_SECONDS = 5.0            # Longest a query waits for a pooled cursor before failing
+SNAPSHOT_CHECK_SECONDS = 1.0         # How often readers look for a newer snapshot
+STREAM_BATCH_ROWS = 10_000           # Rows per Arrow record batch when streaming results
+PARAMS_VARIABLE = "kpi_params"       # Session variable carrying a prepared statement's values
+
+# Statements already prepared on each pooled cursor, by prepared name
+_prepared = weakref.WeakKeyDictionary()
+_prepared_lock = threading.Lock()
+
+
+class CursorTimeoutError(Exception):
+    """
+    Raised when no pooled cursor became free within the wait limit.
+    """
+
+
+def snapshot_dir(db_path=DUCKDB_PATH):
+    """
+    Returns the folder holding the snapshots of a database.
+    """
+    return os.path.join(os.path.dirname(db_path), SNAPSHOT_DIR)
+
+
+def current_snapshot(db_path=DUCKDB_PATH):
+    """
+    Returns the database file readers should open.
+
+    Args:
+        db_path (str): Path of the database the materializer writes.
+
+    Returns:
+        str: The latest published snapshot, or `db_path` itself if none was published yet.
+    """
+    pointer = os.path.join(snapshot_dir(db_path), SNAPSHOT_POINTER)
+    try:
+        with open(pointer, "r") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return db_path
+    return os.path.join(snapshot_dir(db_path), name)
+
+
+def publish_snapshot(con, db_path=DUCKDB_PATH):
+    """
+    Copies the database into a new snapshot file and points readers at it.
+
+    The copy is written under a temporary name, renamed into place, and only
+    then is the pointer file replaced (atomically), so readers always open a
+    complete snapshot and never touch the file the writer holds locked.
+
+    Every snapshot is a full copy, so its cost grows with the history held:
+    about 0.6M event rows (8 MB) per second on one core, i.e. ~17 s for 10M
+    events. Copying only the tables that changed would not save much, since
+    every live round appends to all event tables and their rollups.
+    `SnapshotSchedule` paces the copies, so readers lag by about
+    `SNAPSHOT_COST_FACTOR` times the copy time; past a few tens of millions of
+    events that is minutes, and external mode (whose snapshots only hold view
+    definitions) is the better fit. Disk use is the database plus
+    `SNAPSHOTS_KEPT` copies: older snapshots, and temporary files left by an
+    interrupted copy, are deleted here.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open read-write connection to `db_path`.
+        db_path (str): Path of the database being snapshotted.
+
+    Returns:
+        str: Path of the new snapshot.
+    """
+    directory = snapshot_dir(db_path)
+    os.makedirs(directory, exist_ok=True)
+    stem = os.path.splitext(os.path.basename(db_path))[0]
+    name = f"{stem}_{time.time_ns()}.duckdb"
+    tmp_path = os.path.join(directory, f".{name}.tmp")
+
+    database = con.execute("SELECT current_database()").fetchone()[0]
+    con.execute(f"ATTACH '{tmp_path}' AS _snapshot")
+    try:
+        con.execute(f'COPY FROM DATABASE "{database}" TO _snapshot')
+        con.execute("DETACH _snapshot")
+        os.replace(tmp_path, os.path.join(directory, name))
+    except BaseException:
+        con.execute("DETACH DATABASE IF EXISTS _snapshot")
+        for partial in glob.glob(f"{tmp_path}*"):  # With its WAL, if any
+            os.remove(partial)
+        raise
+
+    pointer_tmp = os.path.join(directory, f".{SNAPSHOT_POINTER}.tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(name)
+    os.replace(pointer_tmp, os.path.join(directory, SNAPSHOT_POINTER))
+
+    # Readers that still have an older snapshot open keep their file handle
+    for old in sorted(glob.glob(os.path.join(directory, f"{stem}_*.duckdb")))[:-SNAPSHOTS_KEPT]:
+        os.remove(old)
+    for leftover in glob.glob(os.path.join(directory, f".{stem}_*.duckdb.tmp*")):
+        os.remove(leftover)  # From a publisher that died mid-copy
+    return os.path.join(directory, name)
+
+
+class SnapshotSchedule:
+    """
+    Decides when a database with pending changes should be published again.
+
+    `publish_snapshot` copies the whole database, so its cost grows with the
+    history held. Waiting at least `cost_factor` times the last copy's duration
+    (and never less than `min_interval`) caps the time spent publishing at
+    about 1/`cost_factor`, however large the database gets; readers lag by
+    correspondingly more.
+    """
+
+    def __init__(self, min_interval=SNAPSHOT_MIN_INTERVAL_SECONDS, cost_factor=SNAPSHOT_COST_FACTOR):
+        self.min_interval = min_interval
+        self.cost_factor = cost_factor
+        self.dirty = False
+        self.published_at = None
+        self.last_duration = 0.0
+
+    def mark_dirty(self):
+        """
+        Records that the database changed since the last snapshot.
+        """
+        self.dirty = True
+
+    def due(self):
+        if not self.dirty:
+            return False
+        if self.published_at is None:
+            return True
+        return time.monotonic() - self.published_at >= max(self.min_interval, self.cost_factor * self.last_duration)
+
+    def publish(self, con, db_path=DUCKDB_PATH):
+        """
+        Publishes a snapshot now and restarts the schedule from it.
+
+        Returns:
+            str: Path of the new snapshot.
+        """
+        self.dirty = False  # Changes committed while copying mark it dirty again
+        started = time.monotonic()
+        try:
+            path = publish_snapshot(con, db_path)
+        except Exception:
+            self.dirty = True
+            raise
+        self.published_at = time.monotonic()
+        self.last_duration = self.published_at - started
+        if self.last_duration > SNAPSHOT_SLOW_SECONDS:
+            print(f"[WARN] Snapshot copy took {self.last_duration:.0f}s, so readers lag by about "
+                  f"{self.cost_factor * self.last_duration:.0f}s; consider MATERIALIZE_MODE=external")
+        return path
+
+
+class SnapshotPublisher:
+    """
+    Publishes snapshots of a database that is being written, on a background thread.
+
+    The writer only calls `mark_dirty()` after each commit; the copy runs on
+    a separate cursor of the writer's connection, so appends are not held up
+    while it runs, and `SnapshotSchedule` paces it.
+    """
+
+    def __init__(self, con, db_path=DUCKDB_PATH, schedule=None, check_seconds=0.5):
+        self.cursor = con.cursor()
+        self.db_path = db_path
+        self.schedule = schedule or SnapshotSchedule()
+        self.check_seconds = check_seconds
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="snapshot-publisher", daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def mark_dirty(self):
+        self.schedule.mark_dirty()
+
+    def _run(self):
+        while not self.stop_event.wait(self.check_seconds):
+            if self.schedule.due():
+                try:
+                    self.schedule.publish(self.cursor, self.db_path)
+                except Exception as e:
+                    print(f"[ERROR] Failed to publish snapshot: {e}")
+
+    def close(self):
+        """
+        Stops the thread and publishes pending changes one last time.
+        """
+        self.stop_event.set()
+        if self.thread.is_alive():
+            self.thread.join()
+        if self.schedule.dirty:
+            self.schedule.publish(self.cursor, self.db_path)
+        self.cursor.close()
+
+
+class _Generation:
+    """
+    One read-only connection to one snapshot plus the cursors handed out from it.
+    """
+
+    def __init__(self, path, size):
+        self.path = path
+        self.con = duckdb.connect(path, read_only=True)
+        # Views over silver (external mode) would otherwise re-read every Parquet footer per query;
+        # silver files are never modified in place, so cached footers stay valid
+        self.con.execute("SET GLOBAL parquet_metadata_cache = true")
+        self.cursors = queue.Queue()
+        for _ in range(size):
+            self.cursors.put(self.con.cursor())
+        self.in_use = 0
+        self.retired = False
+
+    def close(self):
+        while not self.cursors.empty():
+            self.cursors.get_nowait().close()
+        self.con.close()
+
+
+class PinnedSnapshot:
+    """
+    A snapshot held open by `ConnectionPool.pinned()`.
+    """
+
+    def __init__(self, generation):
+        self.generation = generation
+        self.version = os.path.basename(generation.path)
+
+    @contextmanager
+    def cursor(self, timeout=CURSOR_WAIT_SECONDS):
+        """
+        Borrows a cursor on this snapshot, waiting up to `timeout` seconds while all are in use.
+
+        Raises:
+            CursorTimeoutError: If none was returned in time.
+        """
+        try:
+            cur = self.generation.cursors.get(timeout=timeout)
+        except queue.Empty:
+            raise CursorTimeoutError(f"No database cursor became free within {timeout:g}s")
+        try:
+            yield cur
+        finally:
+            self.generation.cursors.put(cur)
+
+
+class ConnectionPool:
+    """
+    Shares a fixed set of read-only DuckDB cursors between request threads.
+
+    All cursors of a generation come from a single read-only connection to
+    the current snapshot, so the catalog is loaded once, not per request.
+    When the materializer publishes a new snapshot, new requests move to it
+    and the old generation is closed once its last cursor is returned.
+    """
+
+    def __init__(self, db_path=DUCKDB_PATH, size=POOL_SIZE, check_seconds=SNAPSHOT_CHECK_SECONDS):
+        self.db_path = db_path
+        self.size = size
+        self.check_seconds = check_seconds
+        self.lock = threading.Lock()
+        self.generation = None
+        self.checked_at = 0.0
+
+    def _refresh(self):
+        """
+        Moves to a newly published snapshot, checking at most every `check_seconds`. Caller holds the lock.
+        """
+        now = time.monotonic()
+        if self.generation is None or now - self.checked_at >= self.check_seconds:
+            self.checked_at = now
+            path = current_snapshot(self.db_path)
+            if self.generation is None or path != self.generation.path:
+                self._swap(_Generation(path, self.size))
+
+    def _current(self):
+        with self.lock:
+            self._refresh()
+            self.generation.in_use += 1
+            return self.generation
+
+    def version(self):
+        """
+        Returns the data version readers currently see: the snapshot's file name.
+        """
+        with self.lock:
+            self._refresh()
+            return os.path.basename(self.generation.path)
+
+    def _swap(self, generation):
+        """
+        Makes `generation` current and retires the previous one.
+        """
+        old, self.generation = self.generation, generation
+        if old is not None:
+            old.retired = True
+            if old.in_use == 0:
+                old.close()
+
+    @contextmanager
+    def cursor(self, timeout=CURSOR_WAIT_SECONDS):
+        """
+        Borrows a cursor on the current snapshot, waiting up to `timeout` seconds while all are in use.
+
+        Yields:
+            duckdb.DuckDBPyConnection: Cursor to run queries on.
+
+        Raises:
+            CursorTimeoutError: If none was returned in time.
+        """
+        with self.pinned() as snapshot, snapshot.cursor(timeout) as cur:
+            yield cur
+
+    @contextmanager
+    def pinned(self):
+        """
+        Holds the current snapshot open for a group of queries that must see the same data.
+
+        Cursors borrowed from the yielded snapshot keep reading it even if a
+        newer one is published meanwhile.
+
+        Yields:
+            PinnedSnapshot: The snapshot, with its `version` and a `cursor()` to borrow.
+        """
+        generation = self._current()
+        try:
+            yield PinnedSnapshot(generation)
+        finally:
+            with self.lock:
+                generation.in_use -= 1
+                if generation.retired and generation.in_use == 0:
+                    generation.close()
+
+    def close(self):
+        """
+        Closes the pool; cursors still borrowed close their connection when returned.
+        """
+        with self.lock:
+            if self.generation is not None:
+                self._swap(None)
+
+
+# Shared by every request of the API process; created on first use
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """
+    Returns the process-wide connection pool, creating it on first use.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(DUCKDB_PATH)
+        return _pool
+
+
+def data_version():
+    """
+    Returns the version of the data queries currently run against.
+
+    It changes every time the materializer publishes a snapshot, so it can
+    key caches that must be invalidated when new data lands.
+    """
+    return get_pool().version()
+
+
+def run_query(sql: str, params: dict = None):
     """
     Executes a given SQL query against the DuckDB database and returns the result as a DataFrame.
 
+    The query runs on a pooled read-only cursor over the latest snapshot,
+    so it neither reopens the database nor waits on the materializer's lock.
+
     Args:
-        sql (str): The SQL query to execute.
+        sql (str or duckdb.Statement): The SQL query (or an already parsed statement) to execute.
+        params (dict, optional): Values for the query's `$name` parameters.
 
     Returns:
         pandas.DataFrame: Query results returned as a DataFrame.
     """
-    # Establish connection and execute query
-    with duckdb.connect(DUCKDB_PATH) as con:
-        result = con.execute(sql).fetchdf()
-    return result
+    with get_pool().cursor() as cur:
+        return cur.execute(sql, params).fetchdf()
+
+
+def execute(cur, sql, params: dict = None):
+    """
+    Executes a query on a cursor, reusing its prepared plan if the query is a parsed statement.
+
+    DuckDB keeps `PREPARE`d plans per connection, and every pooled cursor is
+    one, so a KPI is parsed, bound and planned once per cursor instead of on
+    every request. Cursors of a newly published snapshot start empty. Values
+    are bound into a session variable that `EXECUTE` reads, so they are never
+    spliced into SQL text. Plain SQL strings are executed directly.
+
+    Args:
+        cur (duckdb.DuckDBPyConnection): Pooled cursor.
+        sql (str or duckdb.Statement): The query.
+        params (dict, optional): Values for the query's `$name` parameters.
+
+    Returns:
+        duckdb.DuckDBPyConnection: The cursor, holding the result.
+    """
+    if not isinstance(sql, duckdb.Statement):
+        return cur.execute(sql, params)
+
+    name = "kpi_" + hashlib.sha1(sql.query.encode()).hexdigest()[:16]
+    with _prepared_lock:
+        prepared = _prepared.setdefault(cur, set())
+    if name not in prepared:
+        cur.execute(f"PREPARE {name} AS {sql.query}")
+        prepared.add(name)
+    if not params:
+        return cur.execute(f"EXECUTE {name}")
+    values = ", ".join(f"'{param}': ${param}" for param in params)
+    cur.execute(f"SET VARIABLE {PARAMS_VARIABLE} = {{{values}}}", params)
+    arguments = ", ".join(f"\"{param}\" := getvariable('{PARAMS_VARIABLE}').\"{param}\"" for param in params)
+    return cur.execute(f"EXECUTE {name}({arguments})")
+
+
+def run_query_arrow(sql, params: dict = None, guard=None, snapshot=None):
+    """
+    Executes a query on a pooled cursor and returns the result as an Arrow table.
+
+    Args:
+        sql (str or duckdb.Statement): The SQL query (or an already parsed statement) to execute.
+        params (dict, optional): Values for the query's `$name` parameters.
+        guard (Callable, optional): Called with the cursor, returns a context manager
+            entered around the execution (e.g. one that can interrupt it).
+        snapshot (PinnedSnapshot, optional): Snapshot to query instead of the current one.
+
+    Returns:
+        pyarrow.Table: Query results, without a pandas round trip.
+    """
+    with (snapshot or get_pool()).cursor() as cur, (guard(cur) if guard else nullcontext()):
+        return execute(cur, sql, params).to_arrow_table()
+
+
+@contextmanager
+def query_batches(sql, params: dict = None, batch_size: int = STREAM_BATCH_ROWS, guard=None):
+    """
+    Executes a query and yields a reader over its Arrow record batches.
+
+    The pooled cursor stays borrowed, and the guard entered, until the block
+    exits, so the result can be streamed to a client without materializing it
+    and the guard's deadline still covers the streaming.
+
+    Args:
+        sql (str or duckdb.Statement): The SQL query (or an already parsed statement) to execute.
+        params (dict, optional): Values for the query's `$name` parameters.
+        batch_size (int): Rows per record batch.
+        guard (Callable, optional): As for `run_query_arrow`; held until the block exits.
+
+    Yields:
+        pyarrow.RecordBatchReader: Reader over the result.
+    """
+    with get_pool().cursor() as cur, (guard(cur) if guard else nullcontext()):
+        yield execute(cur, sql, params).to_arrow_reader(batch_size)
@@ -0,0 +1,190 @@
+import os
+import sys
+import time
+import threading
+from collections import OrderedDict
+from utils.file_ops import load_json_file, write_json_atomic
+
+# Constants
+SEEN_ID_CAPACITY = 100_000           # Ids remembered; ~10 full Events API windows per type mix
+SAVE_INTERVAL_SECONDS = 30           # Minimum time between periodic saves while ingesting
+
+
+class SeenIdIndex:
+    """
+    Bounded LRU set of event ids used to drop duplicates across polls.
+
+    Consecutive polls of the Events API overlap heavily, so every id that has
+    already been routed is remembered here. Once `capacity` is reached the
+    least recently seen ids are evicted. The index can be persisted to disk so
+    a restarted ingestion does not re-ingest the same window; `save_if_due`
+    does so periodically, so a killed process loses at most one interval.
+
+    Ids admitted as `pending` belong to events not written yet. They are left
+    out of saves until `confirm`ed, and the saved high-water mark stays below
+    the oldest of them, so a restart after a crash fetches those events again
+    instead of skipping them.
+    """
+
+    def __init__(self, capacity: int = SEEN_ID_CAPACITY, state_path: str = None,
+                 save_interval: float = SAVE_INTERVAL_SECONDS):
+        self.capacity = capacity
+        self.state_path = state_path
+        self.save_interval = save_interval
+        self.ids = OrderedDict()
+        self.max_id = None           # Largest numeric id admitted, kept up to date on every add
+        self.pending = set()         # Admitted ids whose events are not written yet
+        self.max_confirmed = None    # Largest numeric id admitted and written (or loaded)
+        self.lock = threading.Lock() # confirm() is called from writer threads
+        self.saved_at = time.monotonic()
+        self.hits = 0                # Duplicates dropped
+        self.misses = 0              # New ids admitted
+
+        if state_path and os.path.exists(state_path):
+            self.load()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, event_id):
+        return event_id in self.ids
+
+    def check_and_add(self, event_id, pending: bool = False) -> bool:
+        """
+        Records an id and reports whether it had been seen before.
+
+        Args:
+            event_id (str): Event id to check.
+            pending (bool): If True, a new id is not saved until it is `confirm`ed.
+
+        Returns:
+            bool: True if the id was already in the index (a duplicate).
+        """
+        with self.lock:
+            if event_id in self.ids:
+                self.ids.move_to_end(event_id)
+                self.hits += 1
+                return True
+
+            self.ids[event_id] = None
+            self.misses += 1
+            self.max_id = _larger(self.max_id, event_id)
+            if pending:
+                self.pending.add(event_id)
+            else:
+                self.max_confirmed = _larger(self.max_confirmed, event_id)
+            if len(self.ids) > self.capacity:
+                self.ids.popitem(last=False)
+            return False
+
+    def filter_new(self, events, pending: bool = False):
+        """
+        Returns only the events whose id has not been seen yet.
+
+        Args:
+            events (List[dict]): Raw events from the API.
+            pending (bool): As for `check_and_add`.
+
+        Returns:
+            List[dict]: Events with previously unseen ids, in their original order.
+        """
+        return [event for event in events if not self.check_and_add(event.get("id"), pending)]
+
+    def confirm(self, event_ids):
+        """
+        Marks pending ids as written, so the next save records them.
+
+        Args:
+            event_ids (Iterable[str]): Ids of events that were written (or deliberately dropped).
+        """
+        with self.lock:
+            for event_id in event_ids:
+                if event_id in self.pending:
+                    self.pending.discard(event_id)
+                    self.max_confirmed = _larger(self.max_confirmed, event_id)
+
+    def high_water(self):
+        """
+        Returns the largest numeric id admitted (or loaded), or None if there is none.
+
+        Event ids only grow, so evicting old ids never lowers the mark.
+        """
+        return self.max_id
+
+    def durable_high_water(self):
+        """
+        Returns the mark a restart may resume from: every event at or below it was written.
+
+        It is the largest confirmed id, lowered below the oldest pending id, so
+        an unwritten event is never skipped by a restarted poller even when a
+        newer event of another type was already written.
+        """
+        with self.lock:
+            mark = self.max_confirmed
+            oldest_pending = min((int(i) for i in self.pending if str(i).isdigit()), default=None)
+        if mark is not None and oldest_pending is not None and mark >= oldest_pending:
+            mark = oldest_pending - 1
+        return mark
+
+    def stats(self):
+        """
+        Returns dedup counters and an estimate of the index's memory footprint.
+
+        Returns:
+            dict: hits, misses, hit_rate, size, capacity and memory_bytes.
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self.ids),
+            "capacity": self.capacity,
+            "memory_bytes": sys.getsizeof(self.ids) + sum(sys.getsizeof(i) for i in self.ids),
+        }
+
+    def save(self):
+        """
+        Persists the confirmed ids, oldest first, and the durable high-water mark to `state_path`.
+        """
+        if self.state_path:
+            mark = self.durable_high_water()
+            with self.lock:
+                ids = [i for i in self.ids if i not in self.pending]
+            write_json_atomic({"ids": ids, "high_water": mark}, self.state_path)
+        self.saved_at = time.monotonic()
+
+    def save_if_due(self):
+        """
+        Saves the index if `save_interval` has passed since the last save.
+
+        Returns:
+            bool: True if the index was saved.
+        """
+        if time.monotonic() - self.saved_at < self.save_interval:
+            return False
+        self.save()
+        return True
+
+    def load(self):
+        """
+        Restores ids and the high-water mark from `state_path`, keeping only the most recent `capacity` ids.
+
+        Files from before the mark was saved (a plain list of ids) take the largest id as the mark.
+        """
+        state = load_json_file(self.state_path)
+        if isinstance(state, list):
+            state = {"ids": state, "high_water": None}
+            for event_id in state["ids"]:
+                state["high_water"] = _larger(state["high_water"], event_id)
+        self.ids = OrderedDict.fromkeys(state["ids"][-self.capacity:])
+        self.max_id = self.max_confirmed = state["high_water"]
+
+
+def _larger(mark, event_id):
+    """
+    Returns the larger of a numeric mark and an event id, ignoring non-numeric ids.
+    """
+    if str(event_id).isdigit() and (mark is None or int(event_id) > mark):
+        return int(event_id)
+    return mark
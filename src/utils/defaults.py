@@ -2,10 +2,14 @@ import os
 from pathlib import Path
 
 INTERESTED_TYPES = ["WatchEvent", "PullRequestEvent", "IssuesEvent"]
+GITHUB_EVENTS_URL = os.environ.get("GITHUB_EVENTS_URL", "https://api.github.com/events")
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")  # Enables the API's /admin endpoints for requests sending it
 STORAGE_FOLDER= "data"
 EVENT_DUMP_FILE = "events_dump"
 BRONZE_DIR = "bronze"
 SILVER_DIR = "silver"
+STATE_DIR = "state"
+METRICS_DIR = "metrics"
 BASE_STORAGE_PATH = os.path.join(os.getcwd(), STORAGE_FOLDER)
 BASE_PATH=Path("src").resolve()
 CONFIG_FOLDER= "config"
@@ -33,3 +33,69 @@ def trim_event_dynamic(event, field_paths):
         dict: A trimmed dictionary containing only the requested fields.
     """
     return {path: extract_nested_field(event, path) for path in field_paths}
+
+
+def _compile_extractor(field_paths, as_tuple):
+    """
+    Generates a function that extracts all `field_paths` from an event in one pass.
+
+    Each distinct path prefix (e.g. `payload.pull_request`) is walked once and
+    shared by every field below it, and the paths are split only at compile
+    time. Missing keys and non-dict intermediates yield None, exactly like
+    `extract_nested_field`.
+    """
+    lines = ["def _extract(event, _dict=dict, _isinstance=isinstance):",
+             "    n0 = event"]
+    prefix_vars = {(): "n0"}
+    values = []
+
+    for path in field_paths:
+        keys = tuple(path.split("."))
+        for depth in range(1, len(keys) + 1):
+            prefix = keys[:depth]
+            if prefix in prefix_vars:
+                continue
+            parent = prefix_vars[prefix[:-1]]
+            var = f"n{len(prefix_vars)}"
+            lines.append(f"    {var} = {parent}.get({prefix[-1]!r}) if _isinstance({parent}, _dict) else None")
+            prefix_vars[prefix] = var
+        values.append(prefix_vars[keys])
+
+    if as_tuple:
+        lines.append(f"    return ({''.join(v + ', ' for v in values)})")
+    else:
+        items = ", ".join(f"{path!r}: {var}" for path, var in zip(field_paths, values))
+        lines.append(f"    return {{{items}}}")
+
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace["_extract"]
+
+
+def compile_event_trimmer(field_paths):
+    """
+    Compiles a field list into a specialised equivalent of `trim_event_dynamic`.
+
+    Args:
+        field_paths (List[str]): List of dot-separated paths to extract.
+
+    Returns:
+        Callable[[dict], dict]: Function mapping an event to its trimmed dictionary.
+    """
+    return _compile_extractor(list(field_paths), as_tuple=False)
+
+
+def compile_row_extractor(field_paths):
+    """
+    Compiles a field list into a function returning the values as a tuple row.
+
+    Rows come back in `field_paths` order, ready for
+    `pd.DataFrame.from_records(rows, columns=field_paths)`.
+
+    Args:
+        field_paths (List[str]): List of dot-separated paths to extract.
+
+    Returns:
+        Callable[[dict], tuple]: Function mapping an event to a row tuple.
+    """
+    return _compile_extractor(list(field_paths), as_tuple=True)
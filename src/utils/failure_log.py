@@ -0,0 +1,61 @@
+import os
+import time
+from utils.file_ops import load_json_file, write_json_atomic, ensure_directory_exists
+
+# Constants
+MAX_ATTEMPTS = 3                     # Failures before a file is moved to quarantine
+
+
+class FailureLog:
+    """
+    Persistent retry list for files that failed to process.
+
+    Each failure is recorded with its attempt count and last error. Failed
+    files stay in place so the next run retries them; after `max_attempts`
+    failures a file is moved into the quarantine directory (keeping its
+    event-type folder) so it stops blocking progress.
+    """
+
+    def __init__(self, state_path, quarantine_dir, max_attempts=MAX_ATTEMPTS):
+        self.state_path = state_path
+        self.quarantine_dir = quarantine_dir
+        self.max_attempts = max_attempts
+        self.entries = load_json_file(state_path) if os.path.exists(state_path) else {}
+
+    def record(self, source_path, error):
+        """
+        Records a failed attempt, quarantining the file once it runs out of attempts.
+
+        Args:
+            source_path (str): File that failed.
+            error (str): Error message of the failure.
+
+        Returns:
+            bool: True if the file was moved to quarantine.
+        """
+        entry = self.entries.setdefault(source_path, {"attempts": 0})
+        entry.update(attempts=entry["attempts"] + 1, error=str(error), last_attempt=time.time())
+
+        if entry["attempts"] < self.max_attempts or not os.path.exists(source_path):
+            return False
+
+        target_dir = os.path.join(self.quarantine_dir, os.path.basename(os.path.dirname(source_path)))
+        ensure_directory_exists(target_dir)
+        entry["quarantined_to"] = os.path.join(target_dir, os.path.basename(source_path))
+        os.replace(source_path, entry["quarantined_to"])
+        return True
+
+    def clear(self, source_path):
+        """
+        Forgets earlier failures of a file that has now been processed.
+        """
+        self.entries.pop(source_path, None)
+
+    def pending_retries(self):
+        """
+        Returns files that failed but are not quarantined yet.
+        """
+        return [path for path, entry in self.entries.items() if "quarantined_to" not in entry]
+
+    def save(self):
+        write_json_atomic(self.entries, self.state_path)
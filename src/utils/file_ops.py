@@ -106,6 +106,30 @@ def write_json_to_file(events, filepath):
     return filepath
 
 
+def write_json_atomic(data, filepath):
+    """
+    Writes JSON to a file atomically via a temporary file and rename.
+
+    Readers either see the previous content or the new content, never a
+    partially written file.
+
+    Args:
+        data (Any): JSON-serialisable content.
+        filepath (str): Destination file path.
+
+    Returns:
+        str: Path of the written file.
+    """
+    directory = os.path.dirname(str(filepath))
+    ensure_directory_exists(directory)
+
+    tmp_path = os.path.join(directory, f".{os.path.basename(str(filepath))}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, filepath)
+    return filepath
+
+
 def load_yaml_file(filepath):
     """
     Loads a YAML file safely.
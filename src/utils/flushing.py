@@ -0,0 +1,130 @@
+import time
+import queue
+import threading
+from dataclasses import dataclass
+
+# Constants
+WRITER_QUEUE_SIZE = 64               # Pending batches before submit() blocks (backpressure)
+WRITER_TICK_SECONDS = 1.0            # How often the idle writer runs its housekeeping tick
+
+_STOP = object()                     # Sentinel telling the writer thread to exit
+
+
+@dataclass
+class FlushPolicy:
+    """
+    Decides when an in-memory event buffer should be flushed to disk.
+
+    A buffer is flushed as soon as any limit is reached, so low-volume event
+    types are bounded by age instead of sitting in memory indefinitely.
+
+    Attributes:
+        max_events (int): Flush once this many events are buffered.
+        max_bytes (int): Flush once the buffered events' JSON size reaches this.
+        max_age_seconds (float): Flush once the oldest buffered event is this old.
+    """
+    max_events: int = 10
+    max_bytes: int = 1024 * 1024
+    max_age_seconds: float = 60
+
+    def should_flush(self, count, size_bytes, age_seconds):
+        """
+        Args:
+            count (int): Number of buffered events.
+            size_bytes (int): Approximate JSON size of the buffered events.
+            age_seconds (float): Age of the oldest buffered event.
+
+        Returns:
+            bool: True if the buffer should be flushed now.
+        """
+        if count == 0:
+            return False
+        return (count >= self.max_events
+                or size_bytes >= self.max_bytes
+                or age_seconds >= self.max_age_seconds)
+
+
+class BackgroundWriter:
+    """
+    Runs disk writes on a dedicated thread fed by a bounded queue.
+
+    `submit()` hands a batch to the writer and returns immediately unless the
+    queue is full, in which case it blocks until the writer catches up. This
+    backpressure keeps memory bounded when the disk falls behind. `close()`
+    drains every queued batch before returning.
+    """
+
+    def __init__(self, write_fn, tick_fn=None, max_pending=WRITER_QUEUE_SIZE,
+                 tick_seconds=WRITER_TICK_SECONDS, name="bronze-writer"):
+        self.write_fn = write_fn
+        self.tick_fn = tick_fn
+        self.tick_seconds = tick_seconds
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, name=name, daemon=True)
+
+        self.submitted = 0
+        self.written = 0
+        self.failed = 0
+        self.blocked_seconds = 0.0   # Time producers spent waiting on a full queue
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def submit(self, *args):
+        """
+        Queues a batch for `write_fn(*args)`, blocking while the queue is full.
+        """
+        try:
+            self.queue.put_nowait(args)
+        except queue.Full:
+            print("[WARN] Bronze writer queue full; waiting for disk to catch up")
+            started = time.monotonic()
+            self.queue.put(args)
+            self.blocked_seconds += time.monotonic() - started
+        self.submitted += 1
+
+    def close(self):
+        """
+        Drains all pending batches, runs a final tick and stops the thread.
+        """
+        if self.thread.is_alive():
+            self.queue.put(_STOP)
+            self.thread.join()
+
+    def stats(self):
+        return {
+            "pending": self.queue.qsize(),
+            "submitted": self.submitted,
+            "written": self.written,
+            "failed": self.failed,
+            "blocked_seconds": self.blocked_seconds,
+        }
+
+    def _run(self):
+        while True:
+            try:
+                item = self.queue.get(timeout=self.tick_seconds)
+            except queue.Empty:
+                self._tick()
+                continue
+
+            if item is _STOP:
+                self._tick()
+                return
+
+            try:
+                self.write_fn(*item)
+                self.written += 1
+            except Exception as e:
+                self.failed += 1
+                print(f"[ERROR] Background write failed: {e}")
+            self._tick()
+
+    def _tick(self):
+        if self.tick_fn is None:
+            return
+        try:
+            self.tick_fn()
+        except Exception as e:
+            print(f"[ERROR] Background writer tick failed: {e}")
@@ -0,0 +1,255 @@
+import os
+import re
+import gzip
+import json
+import pyarrow as pa
+import pyarrow.parquet as pq
+from utils.bronze_writer import BronzeSegmentWriter
+from utils.compaction import compacted_sources
+from utils.event_utils import compile_row_extractor
+from utils.arrow_utils import tuples_to_table
+from utils.silver_schema import load_event_schemas, parquet_writer_options, ROW_GROUP_SIZE
+from utils.file_ops import ensure_directory_exists, load_yaml_file
+from utils.defaults import INTERESTED_TYPES, BRONZE_DIR, SILVER_DIR, BASE_CONFIG_PATH
+
+# Constants
+ARCHIVE_SUFFIX = ".json.gz"
+ARCHIVE_NAME = re.compile(r"^(\d{4}-\d{2}-\d{2})-(\d{1,2})\.json\.gz$")   # GH Archive's hourly file name
+STREAM_PREFIX = "gharchive"          # Segments of archive `2015-01-01-15` are `<Type>_gharchive-2015-01-01-15_*`
+BATCH_EVENTS = 1000                  # Events per type held in memory before they are written
+TARGETS = ("bronze", "silver")
+
+
+def list_archives(archive_dir):
+    """
+    Lists the GH Archive dumps in a directory, oldest hour first.
+
+    Files named like GH Archive's (`2015-01-01-15.json.gz`) sort by date and
+    hour; any other `.json.gz` file follows, by name.
+
+    Args:
+        archive_dir (str): Directory holding the hourly `.json.gz` files.
+
+    Returns:
+        List[str]: Paths of the archives.
+    """
+    def order(name):
+        match = ARCHIVE_NAME.match(name)
+        return (0, match.group(1), int(match.group(2)), name) if match else (1, "", 0, name)
+
+    names = [n for n in os.listdir(archive_dir) if n.endswith(ARCHIVE_SUFFIX) and not n.startswith(".")]
+    return [os.path.join(archive_dir, n) for n in sorted(names, key=order)]
+
+
+def archive_stream_name(archive_path):
+    """
+    Returns the writer prefix of an archive's output, e.g. `gharchive-2015-01-01-15`.
+
+    Each archive writes its own stream, so archives processed in parallel
+    never share a segment sequence and a retry only touches its own files.
+    """
+    name = os.path.basename(archive_path)
+    match = ARCHIVE_NAME.match(name)
+    stem = f"{match.group(1)}-{int(match.group(2)):02d}" if match else name[:-len(ARCHIVE_SUFFIX)]
+    return f"{STREAM_PREFIX}-{re.sub(r'[^A-Za-z0-9.-]', '-', stem)}"
+
+
+def iter_archive_events(archive_path, event_types=INTERESTED_TYPES, stats=None):
+    """
+    Streams the events of the wanted types out of an hourly GH Archive dump.
+
+    The file is decompressed and read one line (one event) at a time, so
+    memory does not grow with the size of the archive. Lines that cannot
+    contain a wanted type are skipped before JSON parsing, which is most of
+    an archive (PushEvent alone is about half of it).
+
+    Args:
+        archive_path (str): Gzipped NDJSON file, possibly of several gzip members.
+        event_types (List[str]): Event types to keep.
+        stats (dict, optional): Updated in place with `lines` and `malformed` counts.
+
+    Yields:
+        dict: Events whose `type` is in `event_types`, in file order.
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("lines", 0)
+    stats.setdefault("malformed", 0)
+    wanted = set(event_types)
+    markers = [f'"{event_type}"'.encode() for event_type in event_types]
+
+    with gzip.open(archive_path, "rb") as raw:
+        for line in raw:
+            stats["lines"] += 1
+            if not any(marker in line for marker in markers):
+                continue
+            try:
+                event = json.loads(line)
+            except ValueError:
+                stats["malformed"] += 1
+                continue
+            if isinstance(event, dict) and event.get("type") in wanted:
+                yield event
+
+
+def discard_partial_output(storage_path, stream, event_types=INTERESTED_TYPES):
+    """
+    Removes whatever an interrupted run of an archive left behind.
+
+    Bronze segments are rolled by size only, so re-reading the archive writes
+    the same segments under the same names again; silver files already
+    converted from the removed ones stay valid and transform skips them.
+
+    Args:
+        storage_path (str): Root of the bronze/silver layout.
+        stream (str): The archive's stream name, from `archive_stream_name`.
+        event_types (List[str]): Event types the archive was split into.
+    """
+    for event_type in event_types:
+        leftovers = {
+            BRONZE_DIR: re.compile(rf"^\.?{re.escape(event_type)}_{re.escape(stream)}_\d+\.ndjson"),
+            SILVER_DIR: re.compile(rf"^\.{re.escape(event_type)}_{re.escape(stream)}\.parquet\.tmp$"),
+        }
+        for layer, pattern in leftovers.items():
+            directory = os.path.join(storage_path, layer, event_type)
+            if os.path.isdir(directory):
+                for name in os.listdir(directory):
+                    if pattern.match(name):
+                        os.remove(os.path.join(directory, name))
+
+
+class BronzeSink:
+    """
+    Writes an archive's events to bronze segments, one size-rolled stream per event type.
+    """
+
+    def __init__(self, storage_path, stream, compression=None):
+        self.bronze_dir = os.path.join(storage_path, BRONZE_DIR)
+        self.stream = stream
+        self.compression = compression
+        self.writers = {}
+        self.files = []
+
+    def write(self, event_type, events):
+        if event_type not in self.writers:
+            # No age limit: segment boundaries depend only on the data, so a retry reproduces them
+            self.writers[event_type] = BronzeSegmentWriter(event_type, self.bronze_dir, compression=self.compression,
+                                                           prefix=self.stream, max_age_seconds=float("inf"))
+        sealed = self.writers[event_type].append(events)
+        if sealed:
+            self.files.append(sealed)
+
+    def close(self):
+        for writer in self.writers.values():
+            sealed = writer.close()
+            if sealed:
+                self.files.append(sealed)
+        return self.files
+
+
+class SilverSink:
+    """
+    Writes an archive's events straight to one silver Parquet file per event type.
+
+    Events are trimmed with the compiled `filtered_events.yaml` extractors and
+    converted to Arrow per batch; row groups are written once `ROW_GROUP_SIZE`
+    rows are buffered, so at most one row group per type is held in memory.
+    Files are written under a temporary name and renamed when the archive is done.
+    """
+
+    def __init__(self, storage_path, stream, event_field_config=None):
+        config = event_field_config or load_yaml_file(os.path.join(BASE_CONFIG_PATH, "filtered_events.yaml"))
+        self.schemas = load_event_schemas(config)
+        self.extractors = {event_type: compile_row_extractor(c["fields"]) for event_type, c in config.items()}
+        self.silver_dir = os.path.join(storage_path, SILVER_DIR)
+        self.stream = stream
+        self.writers = {}
+        self.pending = {}
+        self.compacted = {}
+        self.files = []
+
+    def _paths(self, event_type):
+        directory = os.path.join(self.silver_dir, event_type)
+        name = f"{event_type}_{self.stream}.parquet"
+        return directory, os.path.join(directory, name), os.path.join(directory, f".{name}.tmp")
+
+    def write(self, event_type, events):
+        if event_type not in self.compacted:
+            directory, final_path, _ = self._paths(event_type)
+            self.compacted[event_type] = os.path.basename(final_path) in compacted_sources(directory)
+        if self.compacted[event_type]:
+            return  # Written and compacted by an earlier run that stopped before its checkpoint
+        extractor = self.extractors[event_type]
+        pending = self.pending.setdefault(event_type, [])
+        pending.append(tuples_to_table([extractor(event) for event in events], self.schemas[event_type]))
+        if sum(t.num_rows for t in pending) >= ROW_GROUP_SIZE:
+            self._flush(event_type)
+
+    def _flush(self, event_type):
+        pending = self.pending.pop(event_type, [])
+        if not pending:
+            return
+        if event_type not in self.writers:
+            directory, _, tmp_path = self._paths(event_type)
+            ensure_directory_exists(directory)
+            schema = self.schemas[event_type]
+            self.writers[event_type] = pq.ParquetWriter(tmp_path, schema, **parquet_writer_options(schema))
+        table = pa.concat_tables(pending).combine_chunks()
+        self.writers[event_type].write_table(table, row_group_size=ROW_GROUP_SIZE)
+
+    def close(self):
+        for event_type in list(self.pending):
+            self._flush(event_type)
+        for event_type, writer in self.writers.items():
+            writer.close()
+            _, final_path, tmp_path = self._paths(event_type)
+            os.replace(tmp_path, final_path)
+            self.files.append(final_path)
+        return self.files
+
+
+def backfill_archive(archive_path, storage_path, target="bronze", compression=None,
+                     event_types=INTERESTED_TYPES, batch_events=BATCH_EVENTS):
+    """
+    Splits one hourly GH Archive dump into bronze segments or silver files.
+
+    Memory stays bounded regardless of the archive's size: the file is
+    streamed line by line and at most `batch_events` events per type are
+    buffered before they are written. Output left by an earlier, interrupted
+    run of the same archive is discarded first.
+
+    Args:
+        archive_path (str): The `.json.gz` dump.
+        storage_path (str): Root of the bronze/silver layout.
+        target (str): "bronze" (segments for transform to convert) or "silver"
+            (trimmed Parquet, skipping the bronze round trip).
+        compression (str, optional): Bronze segment compression: None, "gzip" or "zstd".
+        event_types (List[str]): Event types to keep.
+        batch_events (int): Events per type buffered between writes.
+
+    Returns:
+        dict: The archive's name, line counts, kept events per type and written files.
+    """
+    if target not in TARGETS:
+        raise ValueError(f"Unsupported backfill target '{target}'")
+
+    stream = archive_stream_name(archive_path)
+    discard_partial_output(storage_path, stream, event_types)
+    sink = BronzeSink(storage_path, stream, compression) if target == "bronze" else SilverSink(storage_path, stream)
+
+    stats = {"archive": os.path.basename(archive_path), "lines": 0, "malformed": 0,
+             "events": {event_type: 0 for event_type in event_types}}
+    batches = {event_type: [] for event_type in event_types}
+    for event in iter_archive_events(archive_path, event_types, stats):
+        batch = batches[event["type"]]
+        batch.append(event)
+        if len(batch) >= batch_events:
+            sink.write(event["type"], batch)
+            stats["events"][event["type"]] += len(batch)
+            batches[event["type"]] = []
+
+    for event_type, batch in batches.items():
+        if batch:
+            sink.write(event_type, batch)
+            stats["events"][event_type] += len(batch)
+    stats["files"] = sink.close()
+    return stats
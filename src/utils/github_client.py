@@ -0,0 +1,297 @@
+import os
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlparse, parse_qs
+import requests
+from requests.adapters import HTTPAdapter
+from utils.defaults import GITHUB_EVENTS_URL
+
+# Constants
+DEFAULT_POLL_INTERVAL = 10           # Seconds between polls when GitHub gives no hint
+BACKOFF_BASE_SECONDS = 2             # First retry delay after a rate limit or network error
+BACKOFF_MAX_SECONDS = 300            # Upper bound for the exponential backoff
+POOL_SIZE = 4                        # Keep-alive connections kept per host
+PER_PAGE = 100                       # Largest page size the Events API accepts
+PAGE_WORKERS = 4                     # Pages fetched concurrently per wave
+
+
+@dataclass
+class PollResult:
+    """
+    Outcome of a single poll against the Events API.
+
+    Attributes:
+        status_code (int): HTTP status of the response (0 if the request failed).
+        events (list): Events returned by the API (empty on 304 or errors).
+        wait_seconds (float): How long the caller should sleep before polling again.
+        response (requests.Response, optional): The raw response, if any.
+    """
+    status_code: int
+    events: list = field(default_factory=list)
+    wait_seconds: float = DEFAULT_POLL_INTERVAL
+    response: requests.Response = None
+
+    @property
+    def not_modified(self):
+        return self.status_code == 304
+
+
+@dataclass
+class CycleResult:
+    """
+    Outcome of fetching every available page in one poll cycle.
+
+    Attributes:
+        status_code (int): Status of the first page.
+        events (list): New events across all pages, newest first, unique by id.
+        wait_seconds (float): How long the caller should sleep before the next cycle.
+        pages_fetched (int): Number of page requests made this cycle.
+        reached_seen (bool): True if a page contained an event at or below `last_seen_id`,
+            or came back unchanged (304).
+        gap_detected (bool): True if events may have been missed since the last cycle.
+    """
+    status_code: int
+    events: list = field(default_factory=list)
+    wait_seconds: float = DEFAULT_POLL_INTERVAL
+    pages_fetched: int = 0
+    reached_seen: bool = False
+    gap_detected: bool = False
+
+
+def event_id(event):
+    """
+    Returns an event's numeric id, or None if it is missing or not numeric.
+
+    GitHub event ids increase monotonically, so they order events by arrival.
+    """
+    try:
+        return int(event.get("id"))
+    except (TypeError, ValueError):
+        return None
+
+
+def last_page_number(res):
+    """
+    Reads the number of the last page from a response's `Link` header.
+
+    Args:
+        res (requests.Response): Response for the first page.
+
+    Returns:
+        int: The last page number, or 1 if the response is not paginated.
+    """
+    last = res.links.get("last", {}).get("url")
+    if not last:
+        return 1
+    page = parse_qs(urlparse(last).query).get("page", ["1"])[0]
+    return int(page)
+
+
+class GitHubEventsClient:
+    """
+    Polls the GitHub Events API over a pooled keep-alive session.
+
+    - Sends `If-None-Match` with the last `ETag`, so unchanged pages come back
+      as free 304 responses.
+    - Paces itself from `X-Poll-Interval` and the `X-RateLimit-*` headers.
+    - Backs off exponentially with full jitter on 403/429 and network errors.
+    """
+
+    def __init__(self, url: str = GITHUB_EVENTS_URL, min_interval: float = DEFAULT_POLL_INTERVAL,
+                 token: str = None, session: requests.Session = None,
+                 clock=time.time, rng: random.Random = None):
+        self.url = url
+        self.min_interval = min_interval
+        self.session = session or self._build_session(token or os.environ.get("GITHUB_TOKEN"))
+        self.clock = clock
+        self.rng = rng or random.Random()
+
+        self.etags = {}              # full request url -> last ETag seen
+        self.poll_interval = min_interval
+        self.failures = 0            # Consecutive rate-limit / network failures
+
+    @staticmethod
+    def _build_session(token):
+        """
+        Creates a requests session with connection pooling and default headers.
+
+        Args:
+            token (str, optional): GitHub token used for authenticated rate limits.
+
+        Returns:
+            requests.Session: Configured session.
+        """
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        session.headers.update({
+            "User-Agent": "GitMonitor",
+            "Accept": "application/vnd.github+json",
+        })
+        if token:
+            session.headers["Authorization"] = f"Bearer {token}"
+        return session
+
+    def poll(self, url: str = None, params: dict = None) -> PollResult:
+        """
+        Performs one conditional GET and works out how long to wait before the next.
+
+        Args:
+            url (str, optional): URL to fetch; defaults to the client's events URL.
+            params (dict, optional): Query parameters for the request.
+
+        Returns:
+            PollResult: Status, events and the recommended wait.
+        """
+        url = url or self.url
+        etag_key = requests.Request("GET", url, params=params).prepare().url
+        headers = {}
+        if etag_key in self.etags:
+            headers["If-None-Match"] = self.etags[etag_key]
+
+        try:
+            res = self.session.get(url, headers=headers, params=params, timeout=30)
+        except requests.RequestException as e:
+            print(f"[ERROR] Failed to fetch events: {e}")
+            return PollResult(status_code=0, wait_seconds=self._backoff())
+
+        if res.status_code == 200:
+            try:
+                events = res.json()
+            except ValueError as e:
+                # Truncated or malformed body: keep the old ETag so the page is fetched again
+                print(f"[ERROR] Malformed events response: {e}")
+                return PollResult(status_code=0, wait_seconds=self._backoff(), response=res)
+            self.failures = 0
+            if res.headers.get("ETag"):
+                self.etags[etag_key] = res.headers["ETag"]
+            return PollResult(res.status_code, events, self._next_wait(res), res)
+
+        if res.status_code == 304:
+            self.failures = 0
+            return PollResult(res.status_code, [], self._next_wait(res), res)
+
+        if res.status_code in (403, 429):
+            wait = self._rate_limit_wait(res)
+            print(f"[WARN] GH API limit hit (status {res.status_code}); retrying in {wait:.1f}s")
+            return PollResult(res.status_code, [], wait, res)
+
+        print(f"[WARN] Unexpected status {res.status_code} from GitHub events API")
+        return PollResult(res.status_code, [], self._backoff(), res)
+
+    def poll_all_pages(self, last_seen_id: int = None, per_page: int = PER_PAGE,
+                       max_workers: int = PAGE_WORKERS) -> CycleResult:
+        """
+        Fetches every available page of events for one poll cycle.
+
+        The first page is fetched conditionally; if it changed, the remaining
+        pages (from its `Link` header) are fetched concurrently in waves of
+        `max_workers`. Fetching stops after the wave that reaches an event at
+        or below `last_seen_id`, or a page that is unchanged (304) since it
+        was last fetched.
+
+        Args:
+            last_seen_id (int, optional): Highest event id stored by the previous cycle.
+            per_page (int): Page size requested from the API.
+            max_workers (int): Pages fetched concurrently per wave.
+
+        Returns:
+            CycleResult: New events plus pagination and gap information.
+        """
+        first = self.poll(params={"per_page": per_page})
+        cycle = CycleResult(first.status_code, wait_seconds=first.wait_seconds, pages_fetched=1)
+        if first.status_code != 200:
+            return cycle
+
+        pages = [first.events]
+        cycle.reached_seen = self._reaches(first.events, last_seen_id)
+        next_page, last_page = 2, last_page_number(first.response)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            while not cycle.reached_seen and next_page <= last_page:
+                wave = range(next_page, min(next_page + max_workers, last_page + 1))
+                results = list(pool.map(
+                    lambda page: self.poll(params={"per_page": per_page, "page": page}), wave
+                ))
+                next_page = wave.stop
+                cycle.pages_fetched += len(results)
+                cycle.wait_seconds = max([cycle.wait_seconds] + [r.wait_seconds for r in results])
+
+                for result in results:
+                    pages.append(result.events)
+                    # An unchanged page was read (and stored) by an earlier cycle, so paging can stop there
+                    cycle.reached_seen = (cycle.reached_seen or result.not_modified
+                                          or self._reaches(result.events, last_seen_id))
+                if any(r.status_code not in (200, 304) for r in results):
+                    break
+
+        # Pages shift while we read them, so the same event can show up twice
+        unique = {}
+        for events in pages:
+            for event in events:
+                eid = event_id(event)
+                if eid is None or (last_seen_id is not None and eid <= last_seen_id):
+                    continue
+                unique.setdefault(eid, event)
+        cycle.events = [unique[eid] for eid in sorted(unique, reverse=True)]
+
+        # Nothing at or below the stored high-water mark means older events scrolled away unseen
+        cycle.gap_detected = last_seen_id is not None and not cycle.reached_seen
+        return cycle
+
+    @staticmethod
+    def _reaches(events, last_seen_id):
+        """
+        Checks whether a page contains an event at or below `last_seen_id`.
+        """
+        if last_seen_id is None:
+            return False
+        return any(eid is not None and eid <= last_seen_id for eid in map(event_id, events))
+
+    def _next_wait(self, res):
+        """
+        Computes the wait after a successful response from its pacing headers.
+
+        Honors `X-Poll-Interval` and spreads the remaining rate-limit budget
+        evenly over the time left until the limit resets.
+        """
+        if res.headers.get("X-Poll-Interval"):
+            self.poll_interval = max(self.min_interval, float(res.headers["X-Poll-Interval"]))
+        wait = self.poll_interval
+
+        remaining = res.headers.get("X-RateLimit-Remaining")
+        reset = res.headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset is not None:
+            until_reset = max(0.0, float(reset) - self.clock())
+            remaining = int(remaining)
+            if remaining <= 0:
+                wait = max(wait, until_reset)
+            else:
+                wait = max(wait, until_reset / remaining)
+        return wait
+
+    def _rate_limit_wait(self, res):
+        """
+        Computes the wait after a 403/429, preferring explicit server hints.
+        """
+        backoff = self._backoff()
+        if res.headers.get("Retry-After"):
+            return max(float(res.headers["Retry-After"]), self.min_interval)
+        if res.headers.get("X-RateLimit-Remaining") == "0" and res.headers.get("X-RateLimit-Reset"):
+            return max(float(res.headers["X-RateLimit-Reset"]) - self.clock(), self.min_interval)
+        return backoff
+
+    def _backoff(self):
+        """
+        Returns an exponential backoff delay with full jitter and bumps the failure count.
+        """
+        self.failures += 1
+        ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * (2 ** (self.failures - 1)))
+        return self.min_interval + self.rng.uniform(0, ceiling)
+
+    def close(self):
+        """Closes the underlying HTTP session."""
+        self.session.close()
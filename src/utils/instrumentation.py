@@ -0,0 +1,282 @@
+import os
+import math
+import time
+import threading
+from contextlib import contextmanager
+from utils.defaults import BASE_STORAGE_PATH, METRICS_DIR
+
+# Constants
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)   # Seconds
+METRICS_PATH = os.path.join(BASE_STORAGE_PATH, METRICS_DIR)   # Textfile exporter output folder
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"   # Prometheus text exposition format
+EXPORT_INTERVAL_SECONDS = 15         # How often batch processes rewrite their textfile
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"') for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+class _Metric:
+    """
+    Base of the metric types: a name, help text and one value per label combination.
+    """
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+        self.values = {}
+        (registry or REGISTRY).register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {sorted(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self):
+        """
+        Returns `(suffix, label values, extra labels, value)` tuples for the exposition.
+        """
+        with self.lock:
+            return [("", key, (), value) for key, value in self.values.items()]
+
+
+class Counter(_Metric):
+    """
+    Monotonically increasing count, e.g. events fetched.
+    """
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+
+class Gauge(_Metric):
+    """
+    Value that goes up and down, e.g. buffer depth. With `fn`, the value is read when exported.
+    """
+    kind = "gauge"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, fn=None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.fn = fn
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+
+    def samples(self):
+        if self.fn is not None:
+            return [("", (), (), self.fn())]
+        return super().samples()
+
+
+class Histogram(_Metric):
+    """
+    Distribution of observed values (durations in seconds) over cumulative buckets.
+    """
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), registry=None, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self.values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels):
+        """
+        Observes how long the block took.
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        with self.lock:
+            counts, _ = self.values.get(self._key(labels), ([0] * len(self.buckets), 0.0))
+            return counts[-1]
+
+    def samples(self):
+        with self.lock:
+            out = []
+            for key, (counts, total) in self.values.items():
+                for bound, count in zip(self.buckets, counts):
+                    out.append(("_bucket", key, (("le", _format_value(float(bound))),), count))
+                out.append(("_sum", key, (), total))
+                out.append(("_count", key, (), counts[-1]))
+            return out
+
+
+class StatsCollector:
+    """
+    Exports a component's existing `stats()` dict as gauges, one per numeric key.
+    """
+    kind = "gauge"
+
+    def __init__(self, prefix, fn, documentation, registry=None):
+        self.name = prefix
+        self.fn = fn
+        self.documentation = documentation
+        (registry or REGISTRY).register(self)
+
+    def families(self):
+        stats = self.fn() or {}
+        return [(f"{self.name}_{key}", [("", (), (), value)]) for key, value in stats.items()
+                if isinstance(value, (int, float)) and not isinstance(value, bool)]
+
+
+class Registry:
+    """
+    The set of metrics a process exports.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+
+    def unregister(self, name):
+        with self.lock:
+            self.metrics.pop(name, None)
+
+    def render(self):
+        """
+        Renders every metric in the Prometheus text exposition format.
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            families = metric.families() if isinstance(metric, StatsCollector) else [(metric.name, metric.samples())]
+            for name, samples in families:
+                lines.append(f"# HELP {name} {metric.documentation}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+                labelnames = getattr(metric, "labelnames", ())
+                for suffix, key, extra, value in samples:
+                    lines.append(f"{name}{suffix}{_format_labels(labelnames, key, extra)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# Metrics of this process
+REGISTRY = Registry()
+
+
+def write_textfile(job, metrics_dir=None, registry=None):
+    """
+    Writes the registry to `<metrics_dir>/<job>.prom` for node_exporter's textfile collector.
+
+    The file is replaced atomically, so a scrape never reads a partial file.
+
+    Args:
+        job (str): Process name, used as the file name.
+        metrics_dir (str, optional): Output folder; defaults to data/metrics.
+        registry (Registry, optional): Metrics to write; defaults to REGISTRY.
+
+    Returns:
+        str: Path of the written file.
+    """
+    metrics_dir = metrics_dir or METRICS_PATH
+    os.makedirs(metrics_dir, exist_ok=True)
+    path = os.path.join(metrics_dir, f"{job}.prom")
+    tmp_path = os.path.join(metrics_dir, f".{job}.prom.tmp")
+    with open(tmp_path, "w") as f:
+        f.write((registry or REGISTRY).render())
+    os.replace(tmp_path, path)
+    return path
+
+
+class TextfileExporter:
+    """
+    Rewrites a batch process's textfile every `interval` seconds on a daemon thread, and once more on `close()`.
+    """
+
+    def __init__(self, job, interval=EXPORT_INTERVAL_SECONDS, metrics_dir=None, registry=None):
+        self.job = job
+        self.interval = interval
+        self.metrics_dir = metrics_dir
+        self.registry = registry
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stop_event.wait(self.interval):
+            self.export()
+
+    def export(self):
+        try:
+            write_textfile(self.job, self.metrics_dir, self.registry)
+        except OSError as e:
+            print(f"[WARN] Could not write metrics textfile for {self.job}: {e}")
+
+    def close(self):
+        self.stop_event.set()
+        self.export()
+
+
+def log_timing(level, message, seconds, **fields):
+    """
+    Prints a log line with a timing and `key=value` fields that log tools can parse.
+
+    Example: `[INFO] Flushed events | seconds=0.012 event_type=WatchEvent events=500`
+
+    Args:
+        level (str): INFO, WARN, ERROR, SUCCESS or PROGRESS.
+        message (str): Human-readable summary.
+        seconds (float): Duration of the step.
+        **fields: Extra context; values containing spaces are quoted.
+    """
+    pairs = [f"seconds={seconds:.3f}"] + [
+        f'{key}="{value}"' if " " in str(value) else f"{key}={value}" for key, value in fields.items()
+    ]
+    print(f"[{level}] {message} | {' '.join(pairs)}")
@@ -0,0 +1,108 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+
+# Constants
+CACHE_MAX_BYTES = 64 * 1024 * 1024   # Total size of cached KPI results before LRU eviction
+
+
+def normalize_params(params):
+    """
+    Turns request parameters into a hashable, order-independent cache key part.
+
+    Args:
+        params (dict): Query parameters of a KPI request.
+
+    Returns:
+        tuple: Sorted `(name, value)` pairs with values as strings.
+    """
+    return tuple(sorted((str(key), str(value)) for key, value in (params or {}).items()))
+
+
+class KpiCache:
+    """
+    LRU cache of evaluated KPI results, bounded by their size in memory.
+
+    Keys are `(kpi_id, normalized params, data version)`. The data version
+    changes whenever the materializer publishes new data, so entries stop
+    matching exactly when the data changes; the per-KPI TTL only bounds how
+    stale a result relative to the clock (e.g. "last N minutes") may get.
+    """
+
+    def __init__(self, max_bytes: int = CACHE_MAX_BYTES, clock=time.monotonic):
+        self.max_bytes = max_bytes
+        self.clock = clock
+        self.entries = OrderedDict()  # key -> (value, size_bytes, expires_at)
+        self.size_bytes = 0
+        self.lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """
+        Returns a cached value, or None if it is missing or expired.
+        """
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[2] <= self.clock():
+                self._drop(key)
+                self.expired += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, ttl_seconds):
+        """
+        Stores a value for `ttl_seconds`, evicting least recently used entries to stay within `max_bytes`.
+
+        Arrow tables are sized by their buffers, anything else by its JSON
+        encoding. Values larger than the whole cache are not stored.
+        """
+        size = value.nbytes if hasattr(value, "nbytes") else len(json.dumps(value, default=str))
+        if size > self.max_bytes:
+            return
+
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            self.entries[key] = (value, size, self.clock() + ttl_seconds)
+            self.size_bytes += size
+            while self.size_bytes > self.max_bytes:
+                self._drop(next(iter(self.entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        """
+        Returns hit/miss counters and the cache's current size.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "size_bytes": self.size_bytes,
+                "max_bytes": self.max_bytes,
+            }
+
+    def _drop(self, key):
+        _, size, _ = self.entries.pop(key)
+        self.size_bytes -= size
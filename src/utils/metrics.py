@@ -2,26 +2,48 @@
 
 import yaml
 import os
+import time
+import threading
 from pathlib import Path
-from pydantic import ValidationError
-from utils.db_utils import run_query
-from models.metrics_config import MetricConfig
+import duckdb
+from pydantic import ValidationError, ConfigDict, Field, create_model
+from typing import Annotated, Optional
+from dataclasses import dataclass
+from utils.db_utils import run_query_arrow, data_version
+from utils.kpi_cache import KpiCache, normalize_params
+from utils.file_ops import load_yaml_file
+from utils.rollups import ensure_rollups
+from utils.silver_schema import decoded_schema, load_event_schemas
+from models.metrics_config import MetricConfig, Metric
 from utils.defaults import *
 
 # Define the path to the metrics configuration YAML file
 CONFIG_PATH = Path(__file__).parent.parent / "config" / "metrics.yaml"
+# Event fields configuration; the tables KPIs query have these columns
+EVENTS_CONFIG_PATH = Path(__file__).parent.parent / "config" / "filtered_events.yaml"
 
-def load_kpi_config():
+# Constants
+CONFIG_CHECK_SECONDS = 1.0           # How often the config file's mtime is checked for edits
+PARAM_TYPES = {"int": int, "float": float, "str": str, "bool": bool}
+MISSING_MTIME = -1                   # Stands in for the modification time of a config file that does not exist
+
+# Evaluated KPI results, shared by all requests of the process
+kpi_cache = KpiCache()
+
+def load_kpi_config(config_path=CONFIG_PATH):
     """
     Loads and validates the KPI configuration from the metrics.yaml file.
 
+    Args:
+        config_path (str or Path): Config file to load.
+
     Returns:
         List[Metric]: A list of validated Metric objects.
 
     Raises:
         ValidationError: If the config does not conform to the MetricConfig schema.
     """
-    with open(CONFIG_PATH, "r") as f:
+    with open(config_path, "r") as f:
         raw_config = yaml.safe_load(f)
 
     try:
@@ -33,6 +55,226 @@ def load_kpi_config():
         raise e
 
 
+def compile_kpis(kpis, events_config_path=EVENTS_CONFIG_PATH):
+    """
+    Parses every KPI's SQL once and binds it against the event schema, rejecting the whole set if any is invalid.
+
+    Each query is prepared in an empty database with the tables it will run
+    against: `sql` and `rollup_sql` against the event tables and rollups of
+    table mode, `partition_sql` against the external-mode views, which add
+    `date` and `hour`. Unknown tables or columns are caught at load time
+    instead of failing every request.
+
+    Args:
+        kpis (List[Metric]): Validated KPI definitions.
+        events_config_path (str or Path): filtered_events.yaml declaring the event columns.
+
+    Returns:
+        Dict[str, Tuple[duckdb.Statement, Optional[duckdb.Statement], Optional[duckdb.Statement]]]:
+        Parsed raw, rollup and partition statements per KPI id.
+
+    Raises:
+        ValueError: On duplicate ids, SQL that does not parse or bind, or SQL
+            that is not exactly one SELECT statement.
+    """
+    schemas = load_event_schemas(load_yaml_file(events_config_path))
+    statements = {}
+    with schema_database(schemas) as tables, schema_database(schemas, external=True) as views:
+        for kpi in kpis:
+            if kpi.id in statements:
+                raise ValueError(f"Duplicate KPI id '{kpi.id}'")
+            statements[kpi.id] = (compile_sql(tables, kpi, kpi.sql),
+                                  compile_sql(tables, kpi, kpi.rollup_sql) if kpi.rollup_sql else None,
+                                  compile_sql(views, kpi, kpi.partition_sql) if kpi.partition_sql else None)
+    return statements
+
+
+def schema_database(schemas, external=False):
+    """
+    Opens an in-memory database with an empty table per event type, to bind KPI queries against.
+
+    Args:
+        schemas (Dict[str, pa.Schema]): Silver schema per event type.
+        external (bool): Add the `date`/`hour` columns of the external-mode
+            views instead of the rollup tables of table mode.
+
+    Returns:
+        duckdb.DuckDBPyConnection: The connection.
+    """
+    con = duckdb.connect()
+    if not external:
+        ensure_rollups(con)
+    partition_columns = ", NULL::DATE AS date, NULL::INTEGER AS hour" if external else ""
+    for event_type, schema in schemas.items():
+        con.register("_empty_events", decoded_schema(schema).empty_table())
+        con.execute(f"CREATE TABLE {event_type.lower()} AS SELECT *{partition_columns} FROM _empty_events")
+        con.unregister("_empty_events")
+    return con
+
+
+def compile_sql(con, kpi, sql):
+    """
+    Parses one KPI query, checks it against the KPI's declared params and binds it against the schema.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Connection from `schema_database`.
+        kpi (Metric): KPI the query belongs to.
+        sql (str): The query (`sql`, `rollup_sql` or `partition_sql`).
+
+    Returns:
+        duckdb.Statement: The parsed statement.
+    """
+    try:
+        parsed = con.extract_statements(sql)
+    except duckdb.Error as e:
+        raise ValueError(f"KPI '{kpi.id}' has invalid SQL: {e}") from e
+    if len(parsed) != 1 or parsed[0].type != duckdb.StatementType.SELECT:
+        raise ValueError(f"KPI '{kpi.id}' must be a single SELECT statement")
+    if parsed[0].named_parameters != set(kpi.params):
+        raise ValueError(f"KPI '{kpi.id}' declares params {sorted(kpi.params)} "
+                         f"but its SQL uses {sorted(parsed[0].named_parameters)}")
+    try:
+        con.execute(f"PREPARE kpi_check AS {parsed[0].query}")
+        con.execute("DEALLOCATE kpi_check")
+    except duckdb.Error as e:
+        raise ValueError(f"KPI '{kpi.id}' does not match the event tables: {e}") from e
+    return parsed[0]
+
+
+def build_params_model(kpi):
+    """
+    Builds the pydantic model validating a KPI's request parameters.
+
+    Each declared parameter becomes a typed field with its bounds and
+    default; parameters that are not declared are rejected.
+
+    Args:
+        kpi (Metric): KPI definition.
+
+    Returns:
+        Type[BaseModel]: Model whose `model_dump()` gives the values to bind.
+    """
+    fields = {}
+    for name, param in kpi.params.items():
+        annotation = Annotated[PARAM_TYPES[param.type], Field(ge=param.min, le=param.max,
+                                                             description=param.description)]
+        fields[name] = (annotation, ... if param.default is None else param.default)
+    return create_model(f"{kpi.id}_params", __config__=ConfigDict(extra="forbid"), **fields)
+
+
+@dataclass(frozen=True)
+class CompiledKpi:
+    """
+    A KPI definition with everything prepared for evaluating it.
+
+    Attributes:
+        kpi (Metric): The definition from metrics.yaml.
+        statement (duckdb.Statement): Its parsed SQL.
+        params_model (Type[BaseModel]): Validator for its request parameters.
+        rollup_statement (Optional[duckdb.Statement]): Its parsed `rollup_sql`, if any.
+        partition_statement (Optional[duckdb.Statement]): Its parsed `partition_sql`, if any.
+    """
+    kpi: Metric
+    statement: duckdb.Statement
+    params_model: type
+    rollup_statement: Optional[duckdb.Statement] = None
+    partition_statement: Optional[duckdb.Statement] = None
+
+
+def config_mtime(config_path):
+    """
+    Returns the config file's modification time in ns, or `MISSING_MTIME` if it does not exist.
+    """
+    try:
+        return os.stat(config_path).st_mtime_ns
+    except FileNotFoundError:
+        return MISSING_MTIME
+
+
+class KpiRegistry:
+    """
+    In-memory index of the KPI definitions in metrics.yaml.
+
+    The file is parsed, validated and its SQL compiled once, then reloaded
+    only when its modification time changes (checked at most every
+    `check_seconds`) or when `reload()` is called. A reload that fails,
+    including because the file is missing, keeps the previously loaded set
+    and records the error.
+    """
+
+    def __init__(self, config_path=CONFIG_PATH, check_seconds=CONFIG_CHECK_SECONDS):
+        self.config_path = config_path
+        self.check_seconds = check_seconds
+        self.entries = {}            # kpi_id -> CompiledKpi, replaced as a whole on reload
+        self.mtime_ns = None
+        self.checked_at = 0.0
+        self.loaded_at = None
+        self.last_error = None
+        self.lock = threading.Lock()
+
+    def reload(self):
+        """
+        Loads the config file now.
+
+        Returns:
+            bool: True if the new set was installed, False if it was rejected.
+
+        Raises:
+            Exception: If loading fails while no set has been loaded yet.
+        """
+        with self.lock:
+            mtime_ns = config_mtime(self.config_path)
+            try:
+                kpis = load_kpi_config(self.config_path)
+                statements = compile_kpis(kpis)
+                entries = {kpi.id: CompiledKpi(kpi, statements[kpi.id][0], build_params_model(kpi),
+                                               statements[kpi.id][1], statements[kpi.id][2])
+                           for kpi in kpis}
+            except Exception as e:
+                self.mtime_ns = mtime_ns  # Don't retry the same broken file every check
+                self.last_error = str(e)
+                if not self.entries:
+                    raise
+                print(f"[ERROR] Rejected metrics config change, keeping {len(self.entries)} loaded KPIs: {e}")
+                return False
+
+            self.entries = entries
+            self.mtime_ns = mtime_ns
+            self.loaded_at = time.time()
+            self.last_error = None
+            print(f"[INFO] Loaded {len(entries)} KPIs from {self.config_path}")
+            return True
+
+    def refresh(self):
+        """
+        Reloads the config if the file changed since it was last loaded.
+        """
+        now = time.monotonic()
+        if self.mtime_ns is not None and now - self.checked_at < self.check_seconds:
+            return
+        self.checked_at = now
+        if self.mtime_ns is None or config_mtime(self.config_path) != self.mtime_ns:
+            self.reload()
+
+    def get(self, kpi_id):
+        """
+        Returns the compiled KPI for an id, or None if it is not defined.
+        """
+        self.refresh()
+        return self.entries.get(kpi_id)
+
+    def status(self):
+        return {
+            "kpis": sorted(self.entries),
+            "loaded_at": self.loaded_at,
+            "last_error": self.last_error,
+        }
+
+
+# KPI definitions shared by all requests of the process
+kpi_registry = KpiRegistry()
+
+
 def get_kpi_by_id(kpi_id):
     """
     Fetches a KPI definition by its ID.
@@ -43,41 +285,127 @@ def get_kpi_by_id(kpi_id):
     Returns:
         Metric or None: The corresponding Metric object or None if not found.
     """
-    all_kpis = load_kpi_config()
-    return next((kpi for kpi in all_kpis if kpi.id == kpi_id), None)
+    entry = kpi_registry.get(kpi_id)
+    return entry.kpi if entry else None
 
 
-def evaluate_kpi(kpi_id, params: dict = None):
+class KpiNotFoundError(ValueError):
     """
-    Evaluates a KPI by substituting parameters into its SQL query and executing it.
+    Raised when a request names a KPI that metrics.yaml does not define.
+    """
+
+
+def resolve_kpi(kpi_id, params: dict = None):
+    """
+    Looks up a KPI and validates request parameters against its declaration.
+
+    Args:
+        kpi_id (str): The ID of the KPI.
+        params (dict, optional): Request parameters, e.g. raw query string values.
+
+    Returns:
+        Tuple[CompiledKpi, dict]: The compiled KPI and the typed values to bind.
+
+    Raises:
+        KpiNotFoundError: If the KPI is not found.
+        ValidationError: If a parameter is unknown, of the wrong type or out of bounds.
+    """
+    entry = kpi_registry.get(kpi_id)
+    if not entry:
+        raise KpiNotFoundError(f"KPI '{kpi_id}' not found.")
+    return entry, entry.params_model(**(params or {})).model_dump()
+
+
+def run_kpi(entry, run):
+    """
+    Runs the cheapest statement of a KPI that the database can answer.
+
+    The rollup statement needs the rollup tables (table mode), the partition
+    statement the `date`/`hour` columns of the external-mode views; the raw
+    SQL works everywhere.
+
+    Args:
+        entry (CompiledKpi): The KPI.
+        run (Callable[[duckdb.Statement], Any]): Executes a statement and returns its result.
+
+    Returns:
+        Any: Whatever `run` returned.
+    """
+    if entry.rollup_statement is not None:
+        try:
+            return run(entry.rollup_statement)
+        except duckdb.CatalogException:
+            pass  # No rollups in this database (e.g. built before they existed, or external mode)
+    if entry.partition_statement is not None:
+        try:
+            return run(entry.partition_statement)
+        except duckdb.BinderException:
+            pass  # Tables without partition columns (table mode)
+    return run(entry.statement)
+
+
+def evaluate_kpi_table(kpi_id, params: dict = None, guard=None, snapshot=None):
+    """
+    Evaluates a KPI into an Arrow table, using the result cache.
+
+    Parameters are checked against the types, bounds and defaults declared in
+    metrics.yaml and passed to DuckDB as bound values, never spliced into the
+    SQL text. KPIs with a `rollup_sql` are answered from the rollup tables,
+    falling back to `partition_sql` or `sql` when the database has none (see
+    `run_kpi`). Results are cached per
+    `(kpi_id, params, data version)` for the KPI's `cache_ttl_seconds`, so
+    repeated requests skip DuckDB until new data is published or the TTL
+    runs out.
 
     Args:
         kpi_id (str): The ID of the KPI to evaluate.
-        params (dict, optional): Dictionary of parameter values to inject into the SQL.
+        params (dict, optional): Request parameters, e.g. raw query string values.
+        guard (Callable, optional): Wrapped around the query's execution, see `run_query_arrow`.
+        snapshot (PinnedSnapshot, optional): Snapshot to evaluate on instead of the current one.
 
     Returns:
-        dict: A dictionary containing the KPI metadata and query results.
+        Tuple[Metric, pa.Table]: The KPI definition and its result.
 
     Raises:
         ValueError: If the KPI is not found or SQL execution fails.
+        ValidationError: If a parameter is unknown, of the wrong type or out of bounds.
+    """
+    entry, bound = resolve_kpi(kpi_id, params)
+    kpi = entry.kpi
+
+    cache_key = (kpi.id, normalize_params(bound), snapshot.version if snapshot else data_version())
+    if kpi.cache_ttl_seconds:
+        cached = kpi_cache.get(cache_key)
+        if cached is not None:
+            return kpi, cached
+
+    table = run_kpi(entry, lambda statement: run_query_arrow(statement, bound, guard, snapshot))
+    if kpi.cache_ttl_seconds:
+        kpi_cache.put(cache_key, table, kpi.cache_ttl_seconds)
+    return kpi, table
+
+
+def evaluate_kpi(kpi_id, params: dict = None):
     """
-    params = params or {}
-    kpi = get_kpi_by_id(kpi_id)
-    
-    if not kpi:
-        raise ValueError(f"KPI '{kpi_id}' not found.")
+    Evaluates a KPI by validating its parameters and running its SQL with them bound.
 
-    # Replace parameter placeholders in the SQL query
-    sql = kpi.sql
-    for key, val in params.items():
-        sql = sql.replace(f"${{{key}}}", str(val))
+    See `evaluate_kpi_table` for parameter handling, rollups and caching.
 
-    # Run the query against DuckDB
-    df = run_query(sql)
+    Args:
+        kpi_id (str): The ID of the KPI to evaluate.
+        params (dict, optional): Request parameters, e.g. raw query string values.
 
+    Returns:
+        dict: A dictionary containing the KPI metadata and query results.
+
+    Raises:
+        ValueError: If the KPI is not found or SQL execution fails.
+        ValidationError: If a parameter is unknown, of the wrong type or out of bounds.
+    """
+    kpi, table = evaluate_kpi_table(kpi_id, params)
     return {
         "id": kpi.id,
         "name": kpi.name,
         "visualisation": kpi.visualisation,
-        "data": df.to_dict(orient="records")
+        "data": table.to_pylist()
     }
@@ -0,0 +1,97 @@
+from utils.defaults import INTERESTED_TYPES
+
+# Constants
+EVENT_COUNTS_ROLLUP = "rollup_event_counts_minute"   # Events per table, repo and minute
+PR_INTERARRIVAL_ROLLUP = "rollup_pr_interarrival"     # First/last open-PR time and count per repo
+PR_TABLE = "pullrequestevent"
+NULL_REPO = ""                                        # Stands in for a NULL repo name in rollup keys
+
+
+def ensure_rollups(con):
+    """
+    Creates the rollup tables if missing, backfilling them from existing event tables.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open read-write connection.
+    """
+    existing = {row[0] for row in con.execute(
+        "SELECT table_name FROM information_schema.tables WHERE table_schema = 'main'"
+    ).fetchall()}
+    if EVENT_COUNTS_ROLLUP in existing and PR_INTERARRIVAL_ROLLUP in existing:
+        return
+
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {EVENT_COUNTS_ROLLUP} (
+            event_type VARCHAR,
+            "repo.name" VARCHAR,
+            minute TIMESTAMPTZ,
+            count BIGINT,
+            PRIMARY KEY (event_type, "repo.name", minute)
+        )
+    """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {PR_INTERARRIVAL_ROLLUP} (
+            "repo.name" VARCHAR PRIMARY KEY,
+            first_created_at TIMESTAMPTZ,
+            last_created_at TIMESTAMPTZ,
+            pr_count BIGINT
+        )
+    """)
+    for table_name in (event_type.lower() for event_type in INTERESTED_TYPES):
+        if table_name in existing:
+            rebuild_rollups(con, table_name)
+
+
+def apply_rollups(con, table_name, new_rows):
+    """
+    Folds newly inserted rows of an event table into the rollups.
+
+    Both rollups are exact under incremental updates: minute counts add up,
+    and the average gap between a repo's consecutive open PRs telescopes to
+    `(last - first) / (count - 1)`, so only the first and last timestamps
+    and the count have to be kept.
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open read-write connection (inside the load's transaction).
+        table_name (str): Event table the rows were inserted into.
+        new_rows (str): Table or view holding exactly the inserted rows.
+    """
+    columns = {column[0] for column in con.execute(f"SELECT * FROM {new_rows} LIMIT 0").description}
+    repo = f"""coalesce("repo.name", '{NULL_REPO}')""" if "repo.name" in columns else f"'{NULL_REPO}'"
+
+    con.execute(f"""
+        INSERT INTO {EVENT_COUNTS_ROLLUP}
+        SELECT '{table_name}', {repo}, date_trunc('minute', created_at), COUNT(*)
+        FROM {new_rows}
+        WHERE created_at IS NOT NULL
+        GROUP BY ALL
+        ON CONFLICT DO UPDATE SET count = count + excluded.count
+    """)
+
+    if table_name != PR_TABLE or "payload.pull_request.state" not in columns:
+        return
+    con.execute(f"""
+        INSERT INTO {PR_INTERARRIVAL_ROLLUP}
+        SELECT {repo}, MIN(created_at), MAX(created_at), COUNT(*)
+        FROM {new_rows}
+        WHERE "payload.pull_request.state" = 'open' AND created_at IS NOT NULL
+        GROUP BY ALL
+        ON CONFLICT DO UPDATE SET
+            first_created_at = least(first_created_at, excluded.first_created_at),
+            last_created_at = greatest(last_created_at, excluded.last_created_at),
+            pr_count = pr_count + excluded.pr_count
+    """)
+
+
+def rebuild_rollups(con, table_name):
+    """
+    Recomputes an event table's rollup rows from the whole table (after a full rebuild).
+
+    Args:
+        con (duckdb.DuckDBPyConnection): Open read-write connection.
+        table_name (str): Event table to recompute.
+    """
+    con.execute(f"DELETE FROM {EVENT_COUNTS_ROLLUP} WHERE event_type = ?", [table_name])
+    if table_name == PR_TABLE:
+        con.execute(f"DELETE FROM {PR_INTERARRIVAL_ROLLUP}")
+    apply_rollups(con, table_name, table_name)
@@ -0,0 +1,182 @@
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+from models.events_config import EventConfig, FieldType
+
+# Constants
+PARQUET_COMPRESSION = "zstd"         # Codec for silver Parquet files
+PARQUET_COMPRESSION_LEVEL = 3        # zstd level: close to snappy speed, noticeably smaller files
+ROW_GROUP_SIZE = 128 * 1024          # Rows per Parquet row group
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+DEFAULT_FIELD_TYPE = FieldType(type="string")   # Type of fields without a declaration
+ARROW_TYPES = {
+    "string": pa.string(),
+    "int64": pa.int64(),
+    "float64": pa.float64(),
+    "bool": pa.bool_(),
+}
+
+
+def arrow_type(field_type):
+    """
+    Returns the Arrow type of a declared field type.
+
+    Args:
+        field_type (FieldType): Declaration from filtered_events.yaml.
+
+    Returns:
+        pa.DataType: e.g. `timestamp[us, tz=UTC]` or `dictionary<values=string, indices=int32>`.
+    """
+    if field_type.type == "timestamp":
+        return pa.timestamp(field_type.unit, tz=field_type.tz)
+    if field_type.dictionary:
+        return pa.dictionary(pa.int32(), pa.string())
+    return ARROW_TYPES[field_type.type]
+
+
+def event_schema(config):
+    """
+    Builds the silver Arrow schema of one event type.
+
+    Args:
+        config (dict): The event type's entry in filtered_events.yaml (`fields` and optional `types`).
+
+    Returns:
+        pa.Schema: One field per extracted path, in configured order.
+
+    Raises:
+        pydantic.ValidationError: If the entry is malformed.
+    """
+    config = EventConfig(**config)
+    return pa.schema([
+        pa.field(path, arrow_type(config.types.get(path, DEFAULT_FIELD_TYPE)))
+        for path in config.fields
+    ])
+
+
+def load_event_schemas(event_field_config):
+    """
+    Builds the silver schema of every configured event type.
+
+    Args:
+        event_field_config (dict): Parsed filtered_events.yaml.
+
+    Returns:
+        Dict[str, pa.Schema]: Schema per event type.
+    """
+    return {event_type: event_schema(config) for event_type, config in event_field_config.items()}
+
+
+def decoded_schema(schema):
+    """
+    Returns the schema with dictionary columns replaced by their value type.
+
+    Sorting and filtering kernels do not all accept dictionary arrays, so
+    compaction works on the decoded form and re-encodes when writing.
+    """
+    return pa.schema([
+        pa.field(f.name, f.type.value_type) if pa.types.is_dictionary(f.type) else f
+        for f in schema
+    ])
+
+
+def to_timestamp(column, target_type):
+    """
+    Converts a column to a timestamp type, nulling unparsable values.
+
+    Naive timestamps are taken to be UTC.
+
+    Args:
+        column (pa.ChunkedArray): Timestamps, ISO 8601 strings or nulls.
+        target_type (pa.TimestampType): Declared type.
+
+    Returns:
+        pa.ChunkedArray: The converted column.
+    """
+    if pa.types.is_timestamp(column.type):
+        if column.type.tz is None and target_type.tz is not None:
+            column = pc.assume_timezone(column, "UTC")
+    elif pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+        try:
+            column = pc.cast(column, pa.timestamp("s", tz="UTC"))
+        except pa.ArrowInvalid:
+            column = pc.assume_timezone(pc.strptime(column, format=TIMESTAMP_FORMAT, unit="s", error_is_null=True), "UTC")
+    else:
+        column = pc.cast(column, pa.timestamp("s", tz="UTC"))
+    return pc.cast(column, target_type)
+
+
+def conform_table(table, schema):
+    """
+    Casts a table to a declared schema.
+
+    Columns are selected and ordered by the schema, missing ones are added as
+    nulls and extra ones dropped, so every file of an event type has exactly
+    the same schema regardless of what the data looked like.
+
+    Args:
+        table (pa.Table): Trimmed rows, with whatever types were inferred.
+        schema (pa.Schema): Target schema from `event_schema`.
+
+    Returns:
+        pa.Table: Table with exactly `schema`, without pandas metadata.
+
+    Raises:
+        pa.ArrowInvalid: If a value cannot be represented in its declared type.
+    """
+    columns = []
+    for field in schema:
+        if field.name not in table.column_names:
+            columns.append(pa.nulls(table.num_rows, field.type))
+            continue
+        column = table.column(field.name)
+        if pa.types.is_timestamp(field.type):
+            column = to_timestamp(column, field.type)
+        elif column.type != field.type:
+            column = pc.cast(column, field.type)
+        columns.append(column)
+    return pa.table(columns, schema=schema)
+
+
+def frame_to_table(df, schema):
+    """
+    Converts a pandas DataFrame from `transform_events` to a table with the declared schema.
+    """
+    return conform_table(pa.Table.from_pandas(df, preserve_index=False), schema)
+
+
+def parquet_writer_options(schema):
+    """
+    Returns the Parquet writer settings for silver files of a schema.
+
+    - zstd compression
+    - min/max statistics on every column, so DuckDB can skip row groups on
+      `created_at` and `repo.name` filters
+    - Parquet dictionary pages only for the dictionary-encoded columns;
+      high-cardinality strings (ids, titles) are stored plain
+
+    Args:
+        schema (pa.Schema): Schema of the file.
+
+    Returns:
+        dict: Keyword arguments for `pq.write_table` or `pq.ParquetWriter`.
+    """
+    dictionary_columns = [f.name for f in schema if pa.types.is_dictionary(f.type)]
+    return {
+        "compression": PARQUET_COMPRESSION,
+        "compression_level": PARQUET_COMPRESSION_LEVEL,
+        "use_dictionary": dictionary_columns or False,
+        "write_statistics": True,
+    }
+
+
+def write_silver_table(table, path, row_group_size=ROW_GROUP_SIZE):
+    """
+    Writes a silver Parquet file with the project's writer settings, in bounded row groups.
+
+    Args:
+        table (pa.Table): Rows conformed to the event type's schema.
+        path (str): Destination Parquet path.
+        row_group_size (int): Maximum rows per row group.
+    """
+    pq.write_table(table, path, row_group_size=row_group_size, **parquet_writer_options(table.schema))
@@ -8,17 +8,26 @@ mkdir -p data/bronze data/silver data/db
 
 echo "LIVE mode is set to :'$LIVE'"
 
-# Commenting this as I am facing difficulty trying to get lock on the dDB file.
-if [ "$LIVE" = "true" ]; then
+# MATERIALIZE_MODE=external serves KPIs from views over silver instead of copying it into DuckDB tables
+MATERIALIZE_MODE=${MATERIALIZE_MODE:-table}
+
+# PIPELINE=true runs poll -> bronze -> silver -> DuckDB in one process; LIVE=true runs each stage separately
+if [ "$PIPELINE" = "true" ]; then
+  echo "[INFO] Single-process streaming pipeline enabled"
+  poetry run python src/pipeline.py --live &
+  poetry run python src/compact_silver.py --live &
+elif [ "$LIVE" = "true" ]; then
   echo "[INFO] Live mode enabled: streaming ingestion & processing"
   poetry run python src/ingest.py --live &
-  poetry run python src/transform.py --live &
-  poetry run python src/materialize_duckdb.py --live &
+  poetry run python src/transform.py --watch &
+  poetry run python src/compact_silver.py --live &
+  poetry run python src/materialize_duckdb.py --live --mode "$MATERIALIZE_MODE" &
 else
   echo "[INFO] Running one-time materialization..."
   poetry run python src/ingest.py
   poetry run python src/transform.py
-  poetry run python src/materialize_duckdb.py
+  poetry run python src/compact_silver.py
+  poetry run python src/materialize_duckdb.py --mode "$MATERIALIZE_MODE"
 fi
 
 # Start FastAPI and Streamlit (in parallel)
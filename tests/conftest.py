@@ -0,0 +1,75 @@
+import json
+import threading
+from urllib.parse import urlparse, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+
+
+class GitHubStub:
+    """
+    Local stand-in for the GitHub Events API.
+
+    Serves `events` with an ETag (answering 304 to a matching If-None-Match),
+    unless a scripted `(status, headers, body)` response is queued first.
+    Honors `per_page`/`page` and advertises the last page in a `Link` header.
+    """
+
+    def __init__(self):
+        self.events = []
+        self.headers = {}
+        self.queued = []
+        self.requests = []
+
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append({"path": self.path, "headers": dict(self.headers)})
+                if stub.queued:
+                    status, headers, body = stub.queued.pop(0)
+                else:
+                    query = parse_qs(urlparse(self.path).query)
+                    per_page = int(query.get("per_page", [len(stub.events) or 1])[0])
+                    page = int(query.get("page", ["1"])[0])
+                    last_page = max(1, -(-len(stub.events) // per_page))
+                    body = stub.events[(page - 1) * per_page:page * per_page]
+
+                    etag = f'"{page}-{len(body)}-{body[0]["id"] if body else ""}"'
+                    headers = {"ETag": etag, **stub.headers}
+                    if last_page > 1:
+                        headers["Link"] = f'<{stub.url}?per_page={per_page}&page={last_page}>; rel="last"'
+                    status = 200
+                    if self.headers.get("If-None-Match") == etag:
+                        status, body = 304, None
+                self.send_response(status)
+                if isinstance(body, bytes):
+                    payload = body  # Raw (e.g. truncated) body
+                else:
+                    payload = json.dumps(body).encode() if body is not None else b""
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in headers.items():
+                    self.send_header(key, str(value))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/events"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def github_stub():
+    stub = GitHubStub()
+    stub.start()
+    yield stub
+    stub.stop()
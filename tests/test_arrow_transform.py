@@ -0,0 +1,70 @@
+import json
+import gzip
+import pyarrow.parquet as pq
+from transform import transform_events, event_schemas
+from utils.silver_schema import frame_to_table, write_silver_table
+from utils.arrow_utils import convert_file_arrow, read_bronze_table
+
+
+def pr_event(i, merged=False, created_at="2025-07-10T14:00:00Z"):
+    return {
+        "id": str(i), "type": "PullRequestEvent", "created_at": created_at,
+        "repo": {"name": f"octocat/repo{i % 3}"}, "actor": {"login": "octocat"},
+        "payload": {"action": "opened", "pull_request": {"number": i, "state": "open", "merged": merged,
+                                                         "head": {"sha": "abc"}}},
+    }
+
+
+def convert_both(tmp_path, events, bronze_name, write):
+    schema = event_schemas["PullRequestEvent"]
+    bronze = tmp_path / bronze_name
+    write(bronze, events)
+
+    pandas_path, arrow_path = tmp_path / "pandas.parquet", tmp_path / "arrow.parquet"
+    write_silver_table(frame_to_table(transform_events(events), schema), str(pandas_path))
+    convert_file_arrow(str(bronze), str(arrow_path), "PullRequestEvent", schema)
+    return pq.read_table(pandas_path), pq.read_table(arrow_path)
+
+
+def write_ndjson_gz(path, events):
+    with gzip.open(path, "wt") as f:
+        f.writelines(json.dumps(e) + "\n" for e in events)
+
+
+def write_legacy(path, events):
+    path.write_text(json.dumps(events, indent=2))
+
+
+def test_arrow_engine_matches_pandas_engine_on_segments(tmp_path):
+    events = [pr_event(i, merged=(i % 2 == 0)) for i in range(5)] + [pr_event(9, merged=None)]
+    pandas_table, arrow_table = convert_both(tmp_path, events, "PR_seg_0000000001.ndjson.gz", write_ndjson_gz)
+
+    assert arrow_table.schema.equals(event_schemas["PullRequestEvent"], check_metadata=False)
+    assert pandas_table.schema.equals(arrow_table.schema, check_metadata=False)
+    assert arrow_table.to_pylist() == pandas_table.to_pylist()
+
+
+def test_arrow_engine_matches_pandas_engine_on_legacy_dumps(tmp_path):
+    events = [pr_event(1), pr_event(2, created_at="not-a-date")]
+    pandas_table, arrow_table = convert_both(tmp_path, events, "PR_dump.json", write_legacy)
+
+    assert arrow_table.schema.equals(event_schemas["PullRequestEvent"], check_metadata=False)
+    assert pandas_table.schema.equals(arrow_table.schema, check_metadata=False)
+    assert arrow_table.to_pylist() == pandas_table.to_pylist()
+
+
+def test_bronze_reader_parses_only_configured_fields(tmp_path):
+    events = [pr_event(1), pr_event(2)]
+    # Unconfigured payload keys whose type varies between events
+    events[0]["payload"]["pull_request"]["head"] = "abc"
+    events[0]["payload"]["commits"] = [{"sha": "abc"}]
+    events[1]["payload"]["commits"] = {"sha": "def"}
+    bronze = tmp_path / "PR_seg_0000000001.ndjson.gz"
+    write_ndjson_gz(bronze, events)
+
+    table = read_bronze_table(str(bronze), event_schemas["PullRequestEvent"])
+    pull_request = table.schema.field("payload").type.field("pull_request").type
+
+    assert "commits" not in [f.name for f in table.schema.field("payload").type]
+    assert pull_request.get_field_index("head") < 0 and pull_request.get_field_index("merged") >= 0
+    assert table.num_rows == 2
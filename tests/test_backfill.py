@@ -0,0 +1,58 @@
+import os
+import json
+import pandas as pd
+from transform import convert_json_to_parquet, chunk_by_event_type
+
+
+def write_bronze(storage, event_type, name, events):
+    folder = os.path.join(storage, "bronze", event_type)
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, name)
+    with open(path, "w") as f:
+        f.writelines(json.dumps(e) + "\n" for e in events)
+    return path
+
+
+def watch_event(i):
+    return {"id": str(i), "type": "WatchEvent", "created_at": "2025-07-10T14:00:00Z",
+            "repo": {"name": "octocat/hello"}, "actor": {"login": "octocat"}}
+
+
+def test_parallel_backfill_converts_everything_once(tmp_path):
+    storage = str(tmp_path)
+    for n in range(6):
+        write_bronze(storage, "WatchEvent", f"WatchEvent_seg_{n:010d}.ndjson", [watch_event(n)])
+
+    summary = convert_json_to_parquet(workers=2, storage_path=storage)
+    again = convert_json_to_parquet(workers=2, storage_path=storage)
+
+    silver = sorted(os.listdir(tmp_path / "silver" / "WatchEvent"))
+    assert summary["files"] == 6 and summary["rows"] == 6
+    assert again["files"] == 0
+    assert len(silver) == 6
+    assert pd.read_parquet(tmp_path / "silver" / "WatchEvent" / silver[0])["id"].tolist() == ["0"]
+
+
+def test_failed_files_are_retried_then_quarantined(tmp_path):
+    storage = str(tmp_path)
+    bad = write_bronze(storage, "WatchEvent", "WatchEvent_seg_0000000001.ndjson", [])
+    with open(bad, "w") as f:
+        f.write("{not json\n")
+
+    for _ in range(3):
+        summary = convert_json_to_parquet(storage_path=storage)
+        assert summary["failed"] == 1
+
+    failures = json.loads((tmp_path / "state" / "transform_failures.json").read_text())
+    assert failures[bad]["attempts"] == 3
+    assert not os.path.exists(bad)
+    assert os.path.exists(tmp_path / "quarantine" / "WatchEvent" / "WatchEvent_seg_0000000001.ndjson")
+
+
+def test_chunks_never_mix_event_types():
+    pending = [("WatchEvent", f"w{i}", "") for i in range(5)] + [("IssuesEvent", "i0", "")]
+
+    chunks = chunk_by_event_type(pending, chunk_size=2)
+
+    assert len(chunks) == 4
+    assert all(len({item[0] for item in chunk}) == 1 for chunk in chunks)
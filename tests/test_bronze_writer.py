@@ -0,0 +1,57 @@
+import os
+import json
+from utils.bronze_writer import (
+    BronzeSegmentWriter, read_bronze_file, silver_file_name, is_bronze_file
+)
+
+
+def make_events(count, start=0):
+    return [{"id": str(i), "type": "WatchEvent"} for i in range(start, start + count)]
+
+
+def test_segments_roll_by_size_with_increasing_sequence(tmp_path):
+    writer = BronzeSegmentWriter("WatchEvent", str(tmp_path), max_bytes=200)
+
+    sealed = [writer.append(make_events(5, start=i * 5)) for i in range(3)]
+    sealed.append(writer.close())
+
+    names = sorted(os.listdir(tmp_path / "WatchEvent"))
+    assert names == [os.path.basename(p) for p in sealed if p]
+    assert names[0] == "WatchEvent_seg_0000000001.ndjson"
+    events = [e for name in names for e in read_bronze_file(str(tmp_path / "WatchEvent" / name))]
+    assert [e["id"] for e in events] == [str(i) for i in range(15)]
+
+
+def test_open_segment_is_hidden_until_sealed(tmp_path):
+    writer = BronzeSegmentWriter("WatchEvent", str(tmp_path), compression="gzip")
+    writer.append(make_events(3))
+
+    assert not [n for n in os.listdir(tmp_path / "WatchEvent") if is_bronze_file(n)]
+
+    sealed = writer.close()
+    assert sealed.endswith(".ndjson.gz")
+    assert len(read_bronze_file(sealed)) == 3
+
+
+def test_sequence_continues_and_stale_segments_are_recovered(tmp_path):
+    writer = BronzeSegmentWriter("WatchEvent", str(tmp_path))
+    writer.append(make_events(2))
+    writer.close()
+
+    # Simulate a crash mid-write: an unsealed segment with a torn last line
+    stale = tmp_path / "WatchEvent" / ".WatchEvent_seg_0000000002.ndjson.tmp"
+    stale.write_bytes(b'{"id":"7","type":"WatchEvent"}\n{"id":"8","ty')
+
+    writer = BronzeSegmentWriter("WatchEvent", str(tmp_path))
+    assert writer.sequence == 3
+    recovered = read_bronze_file(str(tmp_path / "WatchEvent" / "WatchEvent_seg_0000000002.ndjson"))
+    assert [e["id"] for e in recovered] == ["7"]
+
+
+def test_legacy_json_dumps_are_still_readable(tmp_path):
+    legacy = tmp_path / "WatchEvent_dump_2025-07-10_140000.json"
+    legacy.write_text(json.dumps(make_events(2), indent=2))
+
+    assert [e["id"] for e in read_bronze_file(str(legacy))] == ["0", "1"]
+    assert silver_file_name(legacy.name) == "WatchEvent_dump_2025-07-10_140000.parquet"
+    assert silver_file_name("WatchEvent_seg_0000000001.ndjson.gz") == "WatchEvent_seg_0000000001.parquet"
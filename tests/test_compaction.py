@@ -0,0 +1,173 @@
+import os
+import json
+import duckdb
+import pandas as pd
+import pyarrow.parquet as pq
+from compact_silver import compact_silver
+from materialize_duckdb import create_duckdb_database
+from transform import find_pending_files
+from utils.compaction import COMPACTION_MANIFEST
+
+
+def write_silver(event_dir, name, rows):
+    df = pd.DataFrame(rows)
+    df["created_at"] = pd.to_datetime(df["created_at"])
+    df.to_parquet(os.path.join(event_dir, name), index=False)
+
+
+def test_compaction_partitions_sorts_and_records_sources(tmp_path):
+    silver = tmp_path / "silver"
+    event_dir = silver / "WatchEvent"
+    event_dir.mkdir(parents=True)
+    write_silver(event_dir, "WatchEvent_seg_0000000001.parquet", [
+        {"id": "1", "repo.name": "b/b", "created_at": "2025-07-10T14:10:00Z"},
+        {"id": "2", "repo.name": "a/a", "created_at": "2025-07-10T15:00:00Z"},
+    ])
+    write_silver(event_dir, "WatchEvent_seg_0000000002.parquet", [
+        {"id": "3", "repo.name": "a/a", "created_at": "2025-07-10T14:20:00Z"},
+    ])
+
+    compact_silver(str(silver))
+
+    hour_14 = event_dir / "date=2025-07-10" / "hour=14"
+    files = os.listdir(hour_14)
+    assert len(files) == 1 and os.listdir(event_dir / "date=2025-07-10" / "hour=15")
+    assert pq.read_table(hour_14 / files[0]).column("repo.name").to_pylist() == ["a/a", "b/b"]
+
+    manifest = json.loads((event_dir / COMPACTION_MANIFEST).read_text())
+    assert set(manifest["sources"]) == {"WatchEvent_seg_0000000001.parquet", "WatchEvent_seg_0000000002.parquet"}
+    assert not list(event_dir.glob("WatchEvent_seg_*.parquet"))
+
+
+def test_compacted_files_are_skipped_by_transform_and_loaded_once(tmp_path):
+    storage = tmp_path
+    event_dir = storage / "silver" / "WatchEvent"
+    event_dir.mkdir(parents=True)
+    bronze_dir = storage / "bronze" / "WatchEvent"
+    bronze_dir.mkdir(parents=True)
+    (bronze_dir / "WatchEvent_seg_0000000001.ndjson").write_text("{}\n")
+    write_silver(event_dir, "WatchEvent_seg_0000000001.parquet", [
+        {"id": "1", "type": "WatchEvent", "created_at": "2025-07-10T14:10:00Z", "repo.name": "a/a",
+         "actor.login": "octocat"},
+    ])
+
+    db_path = str(storage / "events.duckdb")
+    create_duckdb_database(db_path=db_path, silver_dir_path=str(storage / "silver"))
+    compact_silver(str(storage / "silver"))
+    create_duckdb_database(db_path=db_path, silver_dir_path=str(storage / "silver"))
+
+    assert find_pending_files(str(storage)) == []
+    with duckdb.connect(db_path) as con:
+        assert con.execute("SELECT COUNT(*) FROM watchevent").fetchone()[0] == 1
+
+
+def compacted_rows(event_dir):
+    files = [os.path.join(root, name) for root, _, names in os.walk(event_dir) for name in names
+             if name.endswith(".parquet") and "/." not in root]
+    return sorted(pq.read_table(files).column("id").to_pylist()), files
+
+
+def test_only_partitions_touched_by_new_files_are_rewritten(tmp_path):
+    silver = tmp_path / "silver"
+    event_dir = silver / "WatchEvent"
+    event_dir.mkdir(parents=True)
+    write_silver(event_dir, "WatchEvent_seg_0000000001.parquet", [
+        {"id": "1", "repo.name": "a/a", "created_at": "2025-07-10T14:10:00Z"},
+        {"id": "2", "repo.name": "a/a", "created_at": "2025-07-10T15:00:00Z"},
+    ])
+    compact_silver(str(silver))
+    hour_14 = sorted(os.listdir(event_dir / "date=2025-07-10" / "hour=14"))
+
+    # A late arrival for hour 15, plus a row compaction already holds (e.g. a re-converted segment)
+    write_silver(event_dir, "WatchEvent_seg_0000000002.parquet", [
+        {"id": "3", "repo.name": "b/b", "created_at": "2025-07-10T15:30:00Z"},
+        {"id": "2", "repo.name": "a/a", "created_at": "2025-07-10T15:00:00Z"},
+    ])
+    compact_silver(str(silver))
+
+    assert sorted(os.listdir(event_dir / "date=2025-07-10" / "hour=14")) == hour_14
+    assert len(os.listdir(event_dir / "date=2025-07-10" / "hour=15")) == 1
+    assert compacted_rows(event_dir)[0] == ["1", "2", "3"]
+
+
+def test_interrupted_compaction_is_completed_without_duplicates(tmp_path, monkeypatch):
+    import utils.compaction as compaction
+    silver = tmp_path / "silver"
+    event_dir = silver / "WatchEvent"
+    event_dir.mkdir(parents=True)
+    for n in range(3):
+        write_silver(event_dir, f"WatchEvent_seg_{n:010d}.parquet", [
+            {"id": str(n), "repo.name": "a/a", "created_at": f"2025-07-10T1{n}:00:00Z"},
+        ])
+
+    # Crash after the outputs were moved into place, before the inputs were deleted
+    def crash(path):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(compaction.os, "remove", crash)
+    try:
+        compaction.compact_event_type(str(event_dir), "WatchEvent", batch_bytes=1)
+    except KeyboardInterrupt:
+        pass
+    monkeypatch.undo()
+
+    assert compacted_rows(event_dir)[0] == ["0", "1", "2"]  # Hidden inputs are not read
+    assert json.loads((event_dir / COMPACTION_MANIFEST).read_text())["runs"]
+
+    compact_silver(str(silver))
+
+    ids, files = compacted_rows(event_dir)
+    assert ids == ["0", "1", "2"] and all("_compacted_" in f for f in files)
+    assert not [n for n in os.listdir(event_dir) if n.startswith(".")]
+    assert not json.loads((event_dir / COMPACTION_MANIFEST).read_text())["runs"]
+
+
+def test_manifest_is_parsed_once_until_compaction_replaces_it(tmp_path, monkeypatch):
+    import utils.compaction as compaction
+    silver = tmp_path / "silver"
+    event_dir = silver / "WatchEvent"
+    event_dir.mkdir(parents=True)
+    write_silver(event_dir, "WatchEvent_seg_0000000001.parquet", [
+        {"id": "1", "repo.name": "a/a", "created_at": "2025-07-10T14:10:00Z"},
+    ])
+    compact_silver(str(silver))
+    loads = []
+    load = compaction.load_json_file
+    monkeypatch.setattr(compaction, "load_json_file", lambda path: loads.append(path) or load(path))
+
+    for _ in range(100):
+        assert compaction.compacted_sources(str(event_dir)) == {"WatchEvent_seg_0000000001.parquet"}
+    assert len(loads) == 1
+
+    write_silver(event_dir, "WatchEvent_seg_0000000002.parquet", [
+        {"id": "2", "repo.name": "a/a", "created_at": "2025-07-10T14:20:00Z"},
+    ])
+    compact_silver(str(silver))
+    assert "WatchEvent_seg_0000000002.parquet" in compaction.compacted_sources(str(event_dir))
+
+
+def test_sources_are_pruned_once_their_bronze_file_is_gone(tmp_path):
+    storage = tmp_path
+    event_dir = storage / "silver" / "WatchEvent"
+    event_dir.mkdir(parents=True)
+    bronze_dir = storage / "bronze" / "WatchEvent"
+    bronze_dir.mkdir(parents=True)
+    for n in (1, 2):
+        (bronze_dir / f"WatchEvent_seg_{n:010d}.ndjson").write_text("{}\n")
+        write_silver(event_dir, f"WatchEvent_seg_{n:010d}.parquet", [
+            {"id": str(n), "repo.name": "a/a", "created_at": "2025-07-10T14:10:00Z"},
+        ])
+    # Written straight to silver by a GH Archive backfill; it never has a bronze file
+    write_silver(event_dir, "WatchEvent_gharchive-2015-01-01-15.parquet", [
+        {"id": "3", "repo.name": "a/a", "created_at": "2015-01-01T15:10:00Z"},
+    ])
+    compact_silver(str(storage / "silver"))
+
+    os.remove(bronze_dir / "WatchEvent_seg_0000000001.ndjson")
+    compact_silver(str(storage / "silver"))
+
+    manifest = json.loads((event_dir / COMPACTION_MANIFEST).read_text())
+    assert set(manifest["sources"]) == {"WatchEvent_seg_0000000002.parquet",
+                                        "WatchEvent_gharchive-2015-01-01-15.parquet"}
+    # The stream starts over at one once its files are gone; the new segment is not skipped
+    (bronze_dir / "WatchEvent_seg_0000000001.ndjson").write_text("{}\n")
+    assert [os.path.basename(p) for _, p, _ in find_pending_files(str(storage))] == ["WatchEvent_seg_0000000001.ndjson"]
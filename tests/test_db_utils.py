@@ -0,0 +1,83 @@
+import os
+import duckdb
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from materialize_duckdb import create_duckdb_database
+from utils.db_utils import SNAPSHOTS_KEPT, ConnectionPool, current_snapshot, publish_snapshot, snapshot_dir
+from test_materialize import write_silver
+
+
+def count(pool):
+    with pool.cursor() as cur:
+        return cur.execute("SELECT COUNT(*) FROM watchevent").fetchone()[0]
+
+
+def test_readers_use_snapshots_and_follow_the_materializer(tmp_path):
+    silver_dir = str(tmp_path / "silver")
+    db_path = str(tmp_path / "events.duckdb")
+    write_silver(silver_dir, "WatchEvent", "dump_1", ["1", "2"])
+    create_duckdb_database(db_path=db_path, silver_dir_path=silver_dir)
+
+    first = current_snapshot(db_path)
+    assert first != db_path and os.path.exists(first)
+
+    pool = ConnectionPool(db_path, size=4, check_seconds=0)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        assert set(executor.map(lambda _: count(pool), range(32))) == {2}
+
+    # The writer is not blocked by open readers; readers move to the new snapshot
+    with pool.cursor():
+        write_silver(silver_dir, "WatchEvent", "dump_2", ["3"])
+        create_duckdb_database(db_path=db_path, silver_dir_path=silver_dir)
+        assert count(pool) == 3
+
+    assert pool.generation.path == current_snapshot(db_path) != first
+    create_duckdb_database(db_path=db_path, silver_dir_path=silver_dir)  # Nothing new: no snapshot
+    assert len([n for n in os.listdir(snapshot_dir(db_path)) if n.endswith(".duckdb")]) == 2
+    pool.close()
+
+
+def test_snapshot_schedule_backs_off_with_publish_cost(monkeypatch):
+    import utils.db_utils as db_utils
+    now = [100.0]
+    monkeypatch.setattr(db_utils.time, "monotonic", lambda: now[0])
+
+    def slow_copy(con, db_path):
+        now[0] += 2.0  # The copy takes 2 s
+        return "snapshot"
+    monkeypatch.setattr(db_utils, "publish_snapshot", slow_copy)
+    schedule = db_utils.SnapshotSchedule(min_interval=5, cost_factor=10)
+
+    assert not schedule.due()
+    schedule.mark_dirty()
+    assert schedule.due()
+    schedule.publish(None, "db")
+    schedule.mark_dirty()
+    now[0] += 10
+    assert not schedule.due()  # 10 s < 10 x 2 s
+    now[0] += 10
+    assert schedule.due()
+
+
+def test_publishing_prunes_old_snapshots_and_interrupted_copies(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "events.duckdb")
+    con = duckdb.connect(db_path)
+    con.execute("CREATE TABLE watchevent AS SELECT range AS id FROM range(10)")
+    directory = snapshot_dir(db_path)
+    os.makedirs(directory)
+    for leftover in (".events_1.duckdb.tmp", ".events_1.duckdb.tmp.wal"):
+        open(os.path.join(directory, leftover), "w").close()
+
+    for _ in range(SNAPSHOTS_KEPT + 2):
+        latest = publish_snapshot(con, db_path)
+    names = os.listdir(directory)
+    assert len([n for n in names if n.endswith(".duckdb")]) == SNAPSHOTS_KEPT and not [n for n in names if ".tmp" in n]
+
+    # A copy that fails leaves nothing behind and the current snapshot in place
+    con.execute("CREATE TABLE bad AS SELECT 1 AS n")
+    monkeypatch.setattr(os, "replace", lambda *args: (_ for _ in ()).throw(OSError("disk full")))
+    with pytest.raises(OSError):
+        publish_snapshot(con, db_path)
+    monkeypatch.undo()
+    con.close()
+    assert len(os.listdir(directory)) == SNAPSHOTS_KEPT + 1 and current_snapshot(db_path) == latest
@@ -0,0 +1,62 @@
+import os
+from utils.dedup import SeenIdIndex
+
+
+def test_filter_new_drops_duplicates_and_counts_hits():
+    index = SeenIdIndex(capacity=10)
+
+    first = index.filter_new([{"id": "1"}, {"id": "2"}])
+    second = index.filter_new([{"id": "2"}, {"id": "3"}])
+
+    assert [e["id"] for e in first] == ["1", "2"]
+    assert [e["id"] for e in second] == ["3"]
+    stats = index.stats()
+    assert stats["hits"] == 1 and stats["misses"] == 3
+    assert stats["hit_rate"] == 0.25
+    assert stats["memory_bytes"] > 0
+
+
+def test_index_is_bounded_and_evicts_least_recent():
+    index = SeenIdIndex(capacity=2)
+    for event_id in ["1", "2", "1", "3"]:
+        index.check_and_add(event_id)
+
+    assert len(index) == 2
+    assert "1" in index and "3" in index and "2" not in index
+
+
+def test_index_persists_across_restarts(tmp_path):
+    state_path = os.path.join(tmp_path, "state", "seen_ids.json")
+    index = SeenIdIndex(capacity=5, state_path=state_path)
+    index.filter_new([{"id": "10"}, {"id": "11"}])
+    index.save()
+
+    restored = SeenIdIndex(capacity=5, state_path=state_path)
+
+    assert restored.filter_new([{"id": "11"}, {"id": "12"}]) == [{"id": "12"}]
+    assert restored.high_water() == 12
+
+
+def test_periodic_save_leaves_out_unwritten_ids(tmp_path):
+    state_path = os.path.join(tmp_path, "state", "seen_ids.json")
+    index = SeenIdIndex(capacity=2, state_path=state_path, save_interval=0)
+    index.filter_new([{"id": "10"}, {"id": "12"}, {"id": "11"}], pending=True)
+    index.confirm(["10", "12"])
+
+    assert index.save_if_due()
+    assert index.high_water() == 12  # Evicting 10 does not lower the mark
+    assert index.durable_high_water() == 10  # 11 is not written yet
+
+    restored = SeenIdIndex(capacity=5, state_path=state_path)
+    assert restored.high_water() == 10
+    assert restored.filter_new([{"id": "11"}, {"id": "12"}]) == [{"id": "11"}]
+    assert not SeenIdIndex(state_path=state_path, save_interval=60).save_if_due()
+
+
+def test_index_saved_by_older_versions_still_loads(tmp_path):
+    state_path = tmp_path / "seen_ids.json"
+    state_path.write_text('["10", "12", "11"]')
+
+    restored = SeenIdIndex(state_path=str(state_path))
+
+    assert restored.high_water() == 12 and "11" in restored
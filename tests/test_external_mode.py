@@ -0,0 +1,176 @@
+import os
+import re
+import random
+import shutil
+import duckdb
+import pandas as pd
+import utils.compaction as compaction
+from test_rollups import write_silver
+from compact_silver import compact_silver
+from materialize_duckdb import create_duckdb_database, create_external_database, external_view_sql, silver_fingerprint
+from utils.db_utils import ConnectionPool
+from utils.metrics import kpi_registry, run_kpi
+
+
+def evaluate(db_path, kpi_id, params):
+    entry = kpi_registry.get(kpi_id)
+    bound = entry.params_model(**params).model_dump()
+    pool = ConnectionPool(db_path)
+    with pool.cursor() as cur:
+        df = run_kpi(entry, lambda statement: cur.execute(statement, bound).fetchdf())
+    pool.close()
+    return df.sort_values(list(df.columns)).reset_index(drop=True)
+
+
+def test_external_views_answer_kpis_like_tables_without_copying(tmp_path):
+    rng = random.Random(11)
+    silver = str(tmp_path / "silver")
+    for i, event_type in enumerate(["PullRequestEvent", "WatchEvent", "IssuesEvent"]):
+        write_silver(silver, event_type, "seg_0000000001", i * 1000, 200, rng)
+    compact_silver(silver)
+    write_silver(silver, "WatchEvent", "seg_0000000002", 5000, 50, rng)  # Still loose
+
+    table_db = str(tmp_path / "tables" / "events.duckdb")
+    os.makedirs(os.path.dirname(table_db))
+    create_duckdb_database(db_path=table_db, silver_dir_path=silver)
+    external_db = str(tmp_path / "external" / "events.duckdb")
+    views = create_external_database(db_path=external_db, silver_dir_path=silver)
+
+    assert sorted(views) == ["issuesevent", "pullrequestevent", "watchevent"]
+    assert not os.path.exists(external_db)  # Only the snapshot of the views is written
+    for kpi_id, params in [("event_count_offset", {"offset": 300}), ("avg_pr_time", {})]:
+        pd.testing.assert_frame_equal(evaluate(external_db, kpi_id, params), evaluate(table_db, kpi_id, params))
+
+    # New files are visible without another materialization round
+    write_silver(silver, "WatchEvent", "seg_0000000003", 6000, 25, rng)
+    counts = dict(evaluate(external_db, "event_count_offset", {"offset": 300}).values.tolist())
+    assert counts["watchevent"] == 275
+
+
+def test_external_views_prune_files_on_partition_columns(tmp_path):
+    rng = random.Random(3)
+    silver = str(tmp_path / "silver")
+    write_silver(silver, "WatchEvent", "seg_0000000001", 0, 300, rng)
+    compact_silver(silver)
+    files = sorted(os.path.join(root, name) for root, _, names in os.walk(os.path.join(silver, "WatchEvent"))
+                   for name in names if name.endswith(".parquet"))
+    # A compaction run in progress: its staged copies must not be read
+    staged = os.path.join(silver, "WatchEvent", ".compaction_1", "date=2000-01-01", "hour=00")
+    os.makedirs(staged)
+    shutil.copy(files[0], staged)
+    db_path = str(tmp_path / "db" / "events.duckdb")
+    create_external_database(db_path=db_path, silver_dir_path=silver)
+
+    pool = ConnectionPool(db_path)
+    with pool.cursor() as cur:
+        date, hour, total = cur.execute(
+            "SELECT date, hour, COUNT(*) OVER () FROM watchevent ORDER BY created_at DESC LIMIT 1").fetchone()
+        plan = cur.execute(f"EXPLAIN ANALYZE SELECT max(id) FROM watchevent WHERE date = '{date}' AND hour = {hour}"
+                           ).fetchall()[0][1]
+    pool.close()
+
+    assert total == 300 and len(files) > 1
+    assert f"Scanning Files: 1/{len(files)}" in plan
+
+
+def test_partition_sql_reads_only_the_hours_in_the_window(tmp_path):
+    rng = random.Random(4)
+    silver = str(tmp_path / "silver")
+    for i, event_type in enumerate(["PullRequestEvent", "WatchEvent", "IssuesEvent"]):
+        write_silver(silver, event_type, "seg_0000000001", i * 1000, 300, rng)
+    compact_silver(silver)
+    db_path = str(tmp_path / "db" / "events.duckdb")
+    create_external_database(db_path=db_path, silver_dir_path=silver)
+    entry = kpi_registry.get("event_count_offset")
+
+    pool = ConnectionPool(db_path)
+    with pool.cursor() as cur:
+        plan = cur.execute("EXPLAIN ANALYZE " + entry.kpi.partition_sql, {"offset": 30}).fetchall()[0][1]
+        partitioned = cur.execute(entry.partition_statement, {"offset": 30}).fetchall()
+        plain = cur.execute(entry.statement, {"offset": 30}).fetchall()
+    pool.close()
+
+    # Data spans five hours; a 30 minute window touches at most two of them per type
+    scanned = [tuple(map(int, m)) for m in re.findall(r"Scanning Files: (\d+)/(\d+)", plan)]
+    compacted = [(read, total) for read, total in scanned if total]  # Loose scans have no file left
+    assert len(compacted) == 3 and all(read <= 2 < total for read, total in compacted)
+    assert partitioned == plain
+
+
+def test_external_views_deduplicate_ids_like_tables(tmp_path):
+    rng = random.Random(6)
+    silver = str(tmp_path / "silver")
+    write_silver(silver, "WatchEvent", "seg_0000000001", 0, 100, rng)
+    compact_silver(silver)
+    compacted = pd.concat(pd.read_parquet(os.path.join(root, name)) for root, _, names
+                          in os.walk(os.path.join(silver, "WatchEvent")) for name in names if name.endswith(".parquet"))
+    # A replayed batch: the same events again, once more in two loose segments
+    replay = compacted.sort_values("id").head(30)
+    for name in ("seg_0000000002", "seg_0000000003"):
+        replay.to_parquet(os.path.join(silver, "WatchEvent", f"WatchEvent_{name}.parquet"), index=False)
+    db_path = str(tmp_path / "db" / "events.duckdb")
+    create_external_database(db_path=db_path, silver_dir_path=silver)
+
+    pool = ConnectionPool(db_path)
+    with pool.cursor() as cur:
+        assert cur.execute("SELECT COUNT(*), COUNT(DISTINCT id) FROM watchevent").fetchone() == (100, 100)
+    pool.close()
+
+
+def test_new_silver_files_move_the_published_version(tmp_path):
+    rng = random.Random(8)
+    silver = str(tmp_path / "silver")
+    write_silver(silver, "WatchEvent", "seg_0000000001", 0, 10, rng)
+    db_path = str(tmp_path / "db" / "events.duckdb")
+    fingerprint = silver_fingerprint(silver)
+    create_external_database(db_path=db_path, silver_dir_path=silver)
+    pool = ConnectionPool(db_path, check_seconds=0)
+    version = pool.version()
+
+    assert silver_fingerprint(silver) == fingerprint
+    write_silver(silver, "WatchEvent", "seg_0000000002", 10, 10, rng)
+    assert silver_fingerprint(silver) != fingerprint
+    create_external_database(db_path=db_path, silver_dir_path=silver)  # What the live loop does on a change
+    assert pool.version() != version
+    pool.close()
+
+
+def test_views_never_count_rows_twice_while_compaction_commits(tmp_path, monkeypatch):
+    rng = random.Random(5)
+    silver = str(tmp_path / "silver")
+    event_dir = os.path.join(silver, "WatchEvent")
+    for n in range(3):
+        write_silver(silver, "WatchEvent", f"seg_{n:010d}", n * 100, 50, rng)
+        if n == 0:
+            compaction.compact_event_type(event_dir, "WatchEvent")  # Earlier partitions the run merges into
+    con = duckdb.connect()
+    con.execute(external_view_sql("watchevent", event_dir, "WatchEvent"))
+    seen = []
+
+    # Count what the view sees after every file operation, crashing halfway through moving outputs in
+    replace, remove, moved = os.replace, os.remove, []
+    def observe(op):
+        def run(path, *args):
+            target = args[0] if args else path
+            is_output = op is replace and "/date=" in target and target.endswith(".parquet")
+            if is_output and len(moved) == 1:
+                raise KeyboardInterrupt
+            op(path, *args)
+            if is_output:
+                moved.append(target)
+            try:
+                seen.append(con.execute("SELECT COUNT(*) FROM watchevent").fetchone()[0])
+            except duckdb.IOException:
+                seen.append(0)                          # Every partition file hidden, no output moved in yet
+        return run
+    monkeypatch.setattr(compaction.os, "replace", observe(replace))
+    monkeypatch.setattr(compaction.os, "remove", observe(remove))
+    try:
+        compaction.compact_event_type(event_dir, "WatchEvent")
+    except KeyboardInterrupt:
+        pass
+    monkeypatch.undo()
+    compaction.recover_interrupted_runs(event_dir)     # Rolls the half-moved run back
+
+    assert moved and max(seen) == 150
+    assert con.execute("SELECT COUNT(*) FROM watchevent").fetchone()[0] == 150
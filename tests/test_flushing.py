@@ -0,0 +1,94 @@
+import os
+import signal
+import threading
+import ingest
+from utils.flushing import FlushPolicy, BackgroundWriter
+from utils.dedup import SeenIdIndex
+from utils.github_client import GitHubEventsClient
+from utils.bronze_writer import read_bronze_file
+
+
+def test_flush_policy_triggers_on_any_limit():
+    policy = FlushPolicy(max_events=10, max_bytes=100, max_age_seconds=5)
+
+    assert not policy.should_flush(0, 0, 100)
+    assert not policy.should_flush(3, 50, 1)
+    assert policy.should_flush(10, 50, 1)
+    assert policy.should_flush(3, 100, 1)
+    assert policy.should_flush(1, 10, 5)
+
+
+def test_background_writer_applies_backpressure_and_drains():
+    release = threading.Event()
+    written = []
+
+    def slow_write(batch):
+        release.wait()
+        written.append(batch)
+
+    writer = BackgroundWriter(slow_write, max_pending=1, tick_seconds=0.01).start()
+    writer.submit(1)
+    writer.submit(2)
+
+    # The writer holds batch 1 and the queue holds batch 2, so a third submit must block
+    blocked = threading.Thread(target=writer.submit, args=(3,))
+    blocked.start()
+    blocked.join(timeout=0.2)
+    assert blocked.is_alive()
+
+    release.set()
+    blocked.join()
+    writer.close()
+
+    assert written == [1, 2, 3]
+    assert writer.stats()["written"] == 3
+    assert writer.stats()["blocked_seconds"] > 0
+
+
+def test_fetch_flushes_low_volume_types_on_exit(github_stub, tmp_path, monkeypatch):
+    github_stub.events = [{"id": "5", "type": "IssuesEvent"}, {"id": "4", "type": "PushEvent"}]
+    monkeypatch.setattr(ingest, "BASE_STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(ingest, "bronze_writers", {})
+    previous_handler = signal.getsignal(signal.SIGTERM)
+
+    try:
+        client = GitHubEventsClient(url=github_stub.url, min_interval=0.1)
+        seen = SeenIdIndex(state_path=os.path.join(tmp_path, "state", "seen_ids.json"))
+        ingest.fetch_github_events(duration=0.3, client=client, seen_index=seen)
+    finally:
+        signal.signal(signal.SIGTERM, previous_handler)
+
+    issues_dir = tmp_path / "bronze" / "IssuesEvent"
+    segments = [n for n in os.listdir(issues_dir) if not n.startswith(".")]
+    assert len(segments) == 1
+    assert [e["id"] for e in read_bronze_file(str(issues_dir / segments[0]))] == ["5"]
+    assert not ingest.issues_event_buffer
+    assert os.path.exists(tmp_path / "state" / "seen_ids.json")
+
+
+def test_restart_refetches_events_still_buffered_at_a_crash(github_stub, tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "BASE_STORAGE_PATH", str(tmp_path))
+    monkeypatch.setattr(ingest, "bronze_writers", {})
+    state_path = os.path.join(tmp_path, "state", "seen_ids.json")
+    seen = SeenIdIndex(state_path=state_path, save_interval=0)
+    monkeypatch.setattr(ingest, "active_seen_index", seen)
+    monkeypatch.setattr(ingest, "buffer_bytes", dict.fromkeys(ingest.INTERESTED_TYPES, 0))
+    monkeypatch.setattr(ingest, "buffer_started", dict.fromkeys(ingest.INTERESTED_TYPES))
+    events = [{"id": "20", "type": "PullRequestEvent"}, {"id": "15", "type": "PushEvent"},
+              {"id": "10", "type": "WatchEvent"}]
+
+    # The newer PullRequestEvent is written, the older WatchEvent is still buffered when the process dies
+    for event in seen.filter_new(events, pending=True):
+        if not ingest.route_event(event):
+            seen.confirm([event["id"]])
+    ingest.flush_to_bronze(ingest.pr_event_buffer, "PullRequestEvent")
+    seen.save_if_due()
+    ingest.watch_event_buffer.clear()
+
+    restarted = SeenIdIndex(state_path=state_path)
+    github_stub.events = events
+    client = GitHubEventsClient(url=github_stub.url, min_interval=0)
+    fetched = client.poll_all_pages(last_seen_id=restarted.high_water()).events
+    client.close()
+
+    assert [e["id"] for e in restarted.filter_new(fetched)] == ["10"]
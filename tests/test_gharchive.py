@@ -0,0 +1,112 @@
+import os
+import gzip
+import json
+import pandas as pd
+import pyarrow.parquet as pq
+from ingest import backfill_archives, ARCHIVE_CHECKPOINT
+from transform import convert_json_to_parquet, event_schemas
+from utils.bronze_writer import read_bronze_file
+from utils.gharchive import list_archives, archive_stream_name, backfill_archive, iter_archive_events
+
+
+def archive_event(i, event_type, hour=15):
+    event = {"id": str(i), "type": event_type, "created_at": f"2015-01-01T{hour:02d}:00:{i % 60:02d}Z",
+             "repo": {"name": f"org/repo{i % 3}"}, "actor": {"login": f"user{i}"}, "payload": {}}
+    if event_type == "PullRequestEvent":
+        event["payload"] = {"action": "closed", "number": i,
+                            "pull_request": {"merged": True, "created_at": "2015-01-01T10:00:00Z"}}
+    return event
+
+
+def write_archive(archive_dir, name, events, malformed=0):
+    """
+    Writes a GH Archive style dump: gzipped NDJSON, split over two gzip members like concatenated downloads.
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    lines = [json.dumps(e, separators=(",", ":")) + "\n" for e in events] + ['{"type":"WatchEvent",\n'] * malformed
+    half = len(lines) // 2
+    path = os.path.join(archive_dir, name)
+    with open(path, "wb") as f:
+        f.write(gzip.compress("".join(lines[:half]).encode()))
+        f.write(gzip.compress("".join(lines[half:]).encode()))
+    return path
+
+
+def hour_events(hour, count=40):
+    types = ["PushEvent", "WatchEvent", "PullRequestEvent", "IssuesEvent", "CreateEvent"]
+    return [archive_event(hour * 1000 + i, types[i % len(types)], hour) for i in range(count)]
+
+
+def bronze_events(storage, event_type):
+    folder = os.path.join(storage, "bronze", event_type)
+    return [e for name in sorted(os.listdir(folder)) for e in read_bronze_file(os.path.join(folder, name))]
+
+
+def test_archives_are_filtered_to_interested_types(tmp_path):
+    archive = write_archive(str(tmp_path / "gha"), "2015-01-01-15.json.gz", hour_events(15), malformed=2)
+    stats = {}
+
+    events = list(iter_archive_events(archive, ["WatchEvent", "IssuesEvent"], stats))
+
+    assert stats == {"lines": 42, "malformed": 2}
+    assert {e["type"] for e in events} == {"WatchEvent", "IssuesEvent"} and len(events) == 16
+
+
+def test_parallel_backfill_checkpoints_each_archive(tmp_path):
+    storage, archive_dir = str(tmp_path / "data"), str(tmp_path / "gha")
+    for hour in (1, 15, 2):
+        write_archive(archive_dir, f"2015-01-01-{hour}.json.gz", hour_events(hour))
+
+    summary = backfill_archives(archive_dir, workers=2, storage_path=storage)
+    again = backfill_archives(archive_dir, workers=2, storage_path=storage)
+
+    assert [os.path.basename(p) for p in list_archives(archive_dir)] == [
+        "2015-01-01-1.json.gz", "2015-01-01-2.json.gz", "2015-01-01-15.json.gz"]
+    assert summary["archives"] == 3 and summary["events"] == 72
+    assert again["archives"] == 0 and again["skipped"] == 3
+    with open(os.path.join(storage, "state", ARCHIVE_CHECKPOINT)) as f:
+        assert json.load(f)["2015-01-01-15.json.gz"]["events"]["WatchEvent"] == 8
+    assert len(bronze_events(storage, "WatchEvent")) == 24
+    assert all(e["type"] == "PullRequestEvent" for e in bronze_events(storage, "PullRequestEvent"))
+
+    # The segments go through transform like any other bronze file
+    converted = convert_json_to_parquet(storage_path=storage)
+    assert converted["failed"] == 0 and converted["rows"] == 72
+
+
+def test_interrupted_archive_is_redone_without_duplicates(tmp_path):
+    storage, archive_dir = str(tmp_path / "data"), str(tmp_path / "gha")
+    write_archive(archive_dir, "2015-01-01-1.json.gz", hour_events(1))
+    backfill_archives(archive_dir, storage_path=storage)
+    write_archive(archive_dir, "2015-01-01-15.json.gz", hour_events(15))
+
+    # Hour 15 crashed after sealing one segment and while writing the next
+    watch_dir = os.path.join(storage, "bronze", "WatchEvent")
+    stream = archive_stream_name("2015-01-01-15.json.gz")
+    with open(os.path.join(watch_dir, f"WatchEvent_{stream}_0000000001.ndjson"), "w") as f:
+        f.write(json.dumps(archive_event(15000, "WatchEvent")) + "\n")
+    with open(os.path.join(watch_dir, f".WatchEvent_{stream}_0000000002.ndjson.tmp"), "w") as f:
+        f.write(json.dumps(archive_event(15001, "WatchEvent")) + "\n")
+
+    summary = backfill_archives(archive_dir, storage_path=storage)
+
+    ids = [e["id"] for e in bronze_events(storage, "WatchEvent")]
+    assert summary["archives"] == 1 and summary["skipped"] == 1
+    assert len(ids) == len(set(ids)) == 16  # Hour 1's segments were left alone
+
+
+def test_backfill_straight_to_silver_writes_declared_schema(tmp_path):
+    storage = str(tmp_path / "data")
+    archive = write_archive(str(tmp_path / "gha"), "2015-01-01-15.json.gz", hour_events(15, count=100))
+
+    stats = backfill_archive(archive, storage, target="silver", batch_events=3)
+
+    name = f"PullRequestEvent_{archive_stream_name(archive)}.parquet"
+    path = os.path.join(storage, "silver", "PullRequestEvent", name)
+    df = pd.read_parquet(path)
+    assert stats["files"] and path in stats["files"]
+    assert stats["events"]["PullRequestEvent"] == len(df) == 20
+    assert df["payload.pull_request.merged"].all()
+    assert not os.path.exists(os.path.join(storage, "bronze"))
+    assert not [n for n in os.listdir(os.path.dirname(path)) if n.endswith(".tmp")]
+    assert pq.read_schema(path).remove_metadata().equals(event_schemas["PullRequestEvent"])
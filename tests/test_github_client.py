@@ -0,0 +1,117 @@
+import random
+from utils.github_client import GitHubEventsClient
+
+
+def make_client(url, now=1000.0):
+    return GitHubEventsClient(url=url, min_interval=1, clock=lambda: now, rng=random.Random(0))
+
+
+def test_conditional_poll_returns_304_when_unchanged(github_stub):
+    github_stub.events = [{"id": "2", "type": "WatchEvent"}, {"id": "1", "type": "IssuesEvent"}]
+    client = make_client(github_stub.url)
+
+    first = client.poll()
+    second = client.poll()
+
+    assert first.status_code == 200 and len(first.events) == 2
+    assert second.not_modified and second.events == []
+    assert "If-None-Match" not in github_stub.requests[0]["headers"]
+    assert github_stub.requests[1]["headers"]["If-None-Match"] == client.etags[github_stub.url]
+
+
+def test_truncated_body_is_retried_not_cached(github_stub):
+    github_stub.events = [{"id": "2", "type": "WatchEvent"}]
+    github_stub.queued.append((200, {"ETag": '"stale"'}, b'[{"id": "2", "ty'))
+    client = make_client(github_stub.url)
+
+    failed = client.poll()
+    retried = client.poll()
+
+    assert failed.status_code == 0 and failed.events == []
+    assert "If-None-Match" not in github_stub.requests[1]["headers"]
+    assert retried.status_code == 200 and len(retried.events) == 1
+
+
+def test_poll_interval_and_rate_limit_headers_pace_the_client(github_stub):
+    github_stub.events = [{"id": "1", "type": "WatchEvent"}]
+    github_stub.headers = {"X-Poll-Interval": "60", "X-RateLimit-Remaining": "10", "X-RateLimit-Reset": "2000"}
+    client = make_client(github_stub.url)
+
+    # 1000s until reset spread over 10 remaining calls beats the 60s poll interval
+    assert client.poll().wait_seconds == 100
+
+    github_stub.headers["X-RateLimit-Remaining"] = "1000"
+    github_stub.events.append({"id": "0", "type": "WatchEvent"})
+    assert client.poll().wait_seconds == 60
+
+
+def test_rate_limited_response_waits_for_reset(github_stub):
+    github_stub.queued.append((403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1300"}, {"message": "limit"}))
+    client = make_client(github_stub.url)
+
+    result = client.poll()
+
+    assert result.status_code == 403
+    assert result.wait_seconds == 300
+
+
+def test_backoff_grows_with_consecutive_failures(github_stub):
+    github_stub.queued.extend([(429, {}, {}), (429, {}, {}), (429, {}, {}), (429, {}, {})])
+    client = make_client(github_stub.url)
+
+    waits = [client.poll().wait_seconds for _ in range(4)]
+
+    assert client.failures == 4
+    assert all(w >= 1 for w in waits)
+    assert max(waits) <= 1 + 2 * 2 ** 3
+
+
+def make_events(newest, count):
+    return [{"id": str(i), "type": "WatchEvent"} for i in range(newest, newest - count, -1)]
+
+
+def test_poll_all_pages_fetches_every_page(github_stub):
+    github_stub.events = make_events(250, 250)
+    client = make_client(github_stub.url)
+
+    cycle = client.poll_all_pages(per_page=100, max_workers=2)
+
+    assert cycle.pages_fetched == 3
+    assert len(cycle.events) == 250
+    assert cycle.events[0]["id"] == "250"
+    assert not cycle.gap_detected
+
+
+def test_poll_all_pages_stops_at_last_seen_id(github_stub):
+    github_stub.events = make_events(400, 300)
+    client = make_client(github_stub.url)
+
+    cycle = client.poll_all_pages(last_seen_id=380, per_page=10, max_workers=2)
+
+    assert cycle.reached_seen and not cycle.gap_detected
+    assert cycle.pages_fetched == 3
+    assert [e["id"] for e in cycle.events] == [str(i) for i in range(400, 380, -1)]
+
+
+def test_poll_all_pages_reports_gap(github_stub):
+    github_stub.events = make_events(400, 30)
+    client = make_client(github_stub.url)
+
+    cycle = client.poll_all_pages(last_seen_id=100, per_page=10)
+
+    assert cycle.pages_fetched == 3
+    assert cycle.gap_detected
+    assert len(cycle.events) == 30
+
+
+def test_unchanged_later_page_stops_paging_without_a_gap(github_stub):
+    github_stub.events = make_events(400, 30)
+    client = make_client(github_stub.url)
+    client.poll_all_pages(per_page=10, max_workers=1)
+
+    # One new event: page 1 changes, page 2 still answers 304 for its old ETag
+    github_stub.events = make_events(401, 1) + make_events(400, 30)[:9] + make_events(390, 20)
+    cycle = client.poll_all_pages(last_seen_id=100, per_page=10, max_workers=1)
+
+    assert cycle.pages_fetched == 2
+    assert cycle.reached_seen and not cycle.gap_detected
@@ -0,0 +1,44 @@
+from fastapi.testclient import TestClient
+from utils.instrumentation import Counter, Gauge, Histogram, Registry, StatsCollector, write_textfile
+from api.main import app
+
+
+def test_registry_renders_prometheus_text(tmp_path):
+    registry = Registry()
+    fetched = Counter("events_fetched_total", "Events fetched", registry=registry)
+    flushed = Counter("events_flushed_total", "Events flushed", ["event_type"], registry=registry)
+    depth = Gauge("buffer_depth", "Buffered events", ["event_type"], registry=registry)
+    latency = Histogram("poll_seconds", "Poll latency", registry=registry, buckets=(0.1, 1))
+    StatsCollector("cache", lambda: {"hits": 3, "hit_rate": 0.75, "name": "lru"}, "Cache stats", registry=registry)
+
+    fetched.inc(5)
+    flushed.inc(2, event_type="WatchEvent")
+    depth.set(7, event_type='Odd"Type')
+    for seconds in (0.05, 0.5, 3):
+        latency.observe(seconds)
+
+    lines = registry.render().splitlines()
+    assert "# TYPE events_fetched_total counter" in lines
+    assert "events_fetched_total 5" in lines
+    assert 'events_flushed_total{event_type="WatchEvent"} 2' in lines
+    assert 'buffer_depth{event_type="Odd\\"Type"} 7' in lines
+    assert 'poll_seconds_bucket{le="0.1"} 1' in lines
+    assert 'poll_seconds_bucket{le="1"} 2' in lines
+    assert 'poll_seconds_bucket{le="+Inf"} 3' in lines
+    assert "poll_seconds_count 3" in lines
+    assert "cache_hits 3" in lines and "cache_hit_rate 0.75" in lines
+    assert not any(line.startswith("cache_name") for line in lines)
+
+    path = write_textfile("ingest", str(tmp_path), registry)
+    assert open(path).read() == registry.render()
+    assert [p.name for p in tmp_path.iterdir()] == ["ingest.prom"]
+
+
+def test_api_exposes_metrics():
+    client = TestClient(app)
+    client.get("/kpi/no_such_kpi")
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'api_kpi_requests_total{kpi="unknown",status="404"}' in response.text
+    assert "api_query_executor_pending" in response.text
+    assert "api_kpi_cache_hits" in response.text
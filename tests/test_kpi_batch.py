@@ -0,0 +1,79 @@
+import asyncio
+import random
+from contextlib import contextmanager
+from fastapi.testclient import TestClient
+import utils.db_utils as db_utils
+from materialize_duckdb import create_duckdb_database
+from test_kpi_formats import serve_events
+from test_rollups import write_silver
+from api.main import app
+
+
+def test_batch_matches_single_requests_and_reports_per_kpi_errors(tmp_path, monkeypatch):
+    pool = serve_events(tmp_path, monkeypatch)
+    client = TestClient(app)
+    response = client.post("/kpi:batch", json={"kpis": [
+        {"id": "event_count_offset", "params": {"offset": 300}},
+        {"id": "avg_pr_time"},
+        {"id": "missing"},
+        {"id": "event_count_offset", "params": {"offset": 0}},
+    ]})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["version"] == pool.version()
+
+    counts, avg, missing, invalid = body["results"]
+    assert counts["data"] == client.get("/kpi/event_count_offset?offset=300").json()["data"]
+    assert avg["data"] == client.get("/kpi/avg_pr_time").json()["data"]
+    assert (counts["status"], avg["status"], missing["status"], invalid["status"]) == (200, 200, 404, 422)
+
+    assert client.post("/kpi:batch", json={"kpis": []}).status_code == 422
+    pool.close()
+
+
+def test_batch_pins_its_snapshot_off_the_event_loop(tmp_path, monkeypatch):
+    pool = serve_events(tmp_path, monkeypatch)
+    pinned, on_loop = pool.pinned, []
+
+    @contextmanager
+    def pin_or_time_out(fail):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        if fail:
+            raise db_utils.CursorTimeoutError("No cursor free")
+        with pinned() as snapshot:
+            yield snapshot
+
+    client = TestClient(app)
+    body = {"kpis": [{"id": "avg_pr_time"}]}
+    monkeypatch.setattr(pool, "pinned", lambda: pin_or_time_out(False))
+    assert client.post("/kpi:batch", json=body).status_code == 200
+    monkeypatch.setattr(pool, "pinned", lambda: pin_or_time_out(True))
+    response = client.post("/kpi:batch", json=body)
+
+    assert response.status_code == 503 and response.headers["Retry-After"]
+    assert on_loop == [False, False]
+    pool.close()
+
+
+def test_pinned_snapshot_keeps_reading_the_same_data(tmp_path):
+    rng = random.Random(5)
+    silver_dir = str(tmp_path / "silver")
+    db_path = str(tmp_path / "events.duckdb")
+    write_silver(silver_dir, "WatchEvent", "dump_0", 0, 100, rng)
+    create_duckdb_database(db_path=db_path, silver_dir_path=silver_dir)
+
+    pool = db_utils.ConnectionPool(db_path, check_seconds=0)
+    with pool.pinned() as snapshot:
+        write_silver(silver_dir, "WatchEvent", "dump_1", 100, 100, rng)
+        create_duckdb_database(db_path=db_path, silver_dir_path=silver_dir)
+
+        with snapshot.cursor() as cur:
+            assert cur.execute("SELECT COUNT(*) FROM watchevent").fetchone()[0] == 100
+        with pool.cursor() as cur:
+            assert cur.execute("SELECT COUNT(*) FROM watchevent").fetchone()[0] == 200
+        assert pool.version() != snapshot.version
+    pool.close()
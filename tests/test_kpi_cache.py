@@ -0,0 +1,38 @@
+import pyarrow as pa
+import utils.metrics as metrics
+from utils.kpi_cache import KpiCache, normalize_params
+
+
+def test_cache_expires_and_evicts_least_recently_used_by_size():
+    now = [0.0]
+    cache = KpiCache(max_bytes=50, clock=lambda: now[0])
+    cache.put("a", {"v": "x" * 10}, ttl_seconds=10)
+    cache.put("b", {"v": "y" * 10}, ttl_seconds=10)
+    assert cache.get("a") == {"v": "x" * 10}   # "b" is now least recently used
+
+    cache.put("c", {"v": "z" * 10}, ttl_seconds=10)
+    assert cache.get("b") is None and cache.get("c") is not None
+
+    now[0] = 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["evictions"]) == (2, 2, 1, 1)
+    assert normalize_params({"b": 2, "a": "1"}) == normalize_params({"a": 1, "b": "2"})
+
+
+def test_evaluate_kpi_serves_cache_until_data_version_changes(monkeypatch):
+    calls = []
+    version = ["snapshot_1"]
+    monkeypatch.setattr(metrics, "kpi_cache", KpiCache())
+    monkeypatch.setattr(metrics, "data_version", lambda: version[0])
+    monkeypatch.setattr(metrics, "run_query_arrow", lambda sql, params=None, guard=None, snapshot=None: calls.append(params) or pa.table({"count": [1]}))
+
+    first = metrics.evaluate_kpi("event_count_offset", {"offset": 15})
+    assert metrics.evaluate_kpi("event_count_offset", {"offset": "15"}) == first
+    assert len(calls) == 1
+
+    metrics.evaluate_kpi("event_count_offset", {"offset": 30})
+    version[0] = "snapshot_2"
+    metrics.evaluate_kpi("event_count_offset", {"offset": 15})
+    assert len(calls) == 3
+    assert metrics.kpi_cache.stats()["hits"] == 1
@@ -0,0 +1,154 @@
+import asyncio
+import gc
+import threading
+import time
+import duckdb
+import pyarrow as pa
+import pytest
+from fastapi.testclient import TestClient
+import utils.db_utils as db_utils
+import utils.metrics as metrics
+from utils.metrics import KpiRegistry
+from utils.kpi_cache import KpiCache
+from api.execution import OverloadedError, QueryExecutor, QueryTimeoutError, QueueTimeoutError
+from api.responses import BatchStream
+from api.main import app
+
+SLOW_SQL = "SELECT COUNT(*) AS n FROM range(1000000000000)"
+
+
+def test_admission_queue_and_coalescing():
+    release = threading.Event()
+    calls = []
+
+    def blocked(guard):
+        calls.append(1)
+        release.wait(5)
+        return "done"
+
+    executor = QueryExecutor(workers=1, queue_limit=1, queue_wait=0.05)
+    first = executor.submit(blocked, 5, key="kpi")
+    assert executor.submit(blocked, 5, key="kpi") is first          # Coalesced, not queued again
+    queued = executor.submit(blocked, 5)
+    with pytest.raises(OverloadedError):
+        executor.submit(blocked, 5)
+
+    time.sleep(0.1)
+    release.set()
+    assert first.result() == "done"
+    with pytest.raises(QueueTimeoutError):
+        queued.result()
+    assert len(calls) == 1
+    stats = executor.stats()
+    assert (stats["coalesced"], stats["rejected"], stats["queue_timeouts"]) == (1, 1, 1)
+    executor.shutdown()
+
+
+def test_queued_query_gives_up_while_every_worker_stays_busy():
+    release = threading.Event()
+    calls = []
+    executor = QueryExecutor(workers=1, queue_wait=0.1)
+    busy = executor.submit(lambda guard: release.wait(5), 5)
+
+    started = time.monotonic()
+    with pytest.raises(QueueTimeoutError):
+        asyncio.run(executor.run(lambda guard: calls.append(1), 5))
+    assert time.monotonic() - started < 1  # Not when the busy worker frees up
+
+    release.set()
+    busy.result()
+    executor.pool.submit(lambda: None).result()  # Let the worker drain its queue
+    assert calls == [] and executor.stats()["pending"] == 0 and executor.stats()["queue_timeouts"] == 1
+    executor.shutdown()
+
+
+def test_deadline_interrupts_the_query_and_frees_the_cursor():
+    con = duckdb.connect()
+    cur = con.cursor()
+
+    def slow(guard):
+        with guard(cur):
+            return cur.execute(SLOW_SQL).fetchall()
+
+    executor = QueryExecutor(workers=1)
+    started = time.monotonic()
+    with pytest.raises(QueryTimeoutError):
+        executor.submit(slow, 0.2).result()
+    assert time.monotonic() - started < 5
+    assert cur.execute("SELECT 1").fetchall() == [(1,)]
+    executor.shutdown()
+
+
+def test_kpi_endpoint_status_codes(tmp_path, monkeypatch):
+    db_path = str(tmp_path / "events.duckdb")
+    duckdb.connect(db_path).close()
+    config = tmp_path / "metrics.yaml"
+    config.write_text(
+        "kpis:\n"
+        f"  - {{id: slow, name: Slow, sql: '{SLOW_SQL}', timeout_seconds: 0.2, cache_ttl_seconds: 0}}\n"
+        "  - {id: broken, name: Broken, sql: 'SELECT COUNT(*) AS n FROM watchevent'}\n"  # No table in this database
+        "  - {id: one, name: One, sql: 'SELECT 1 AS n'}\n"
+    )
+    pool = db_utils.ConnectionPool(db_path)
+    monkeypatch.setattr(db_utils, "_pool", pool)
+    monkeypatch.setattr(metrics, "kpi_registry", KpiRegistry(config))
+    monkeypatch.setattr(metrics, "kpi_cache", KpiCache())
+
+    client = TestClient(app)
+    assert client.get("/kpi/one").json()["data"] == [{"n": 1}]
+    assert client.get("/kpi/missing").status_code == 404
+    assert client.get("/kpi/one?n=2").status_code == 422
+    assert client.get("/kpi/broken").status_code == 500
+    assert client.get("/kpi/slow").status_code == 504
+    assert client.get("/kpi/slow?format=arrow").status_code == 504
+    assert client.get("/kpi/one").status_code == 200      # The interrupted cursors are usable again
+    pool.close()
+
+
+def test_cursor_wait_is_bounded(tmp_path):
+    db_path = str(tmp_path / "events.duckdb")
+    duckdb.connect(db_path).close()
+    pool = db_utils.ConnectionPool(db_path, size=1)
+    with pool.cursor():
+        with pytest.raises(db_utils.CursorTimeoutError):
+            with pool.cursor(timeout=0.05):
+                pass
+    with pool.cursor(timeout=0.05) as cur:
+        assert cur.execute("SELECT 1").fetchall() == [(1,)]
+    pool.close()
+
+
+def open_stream(executor, timeout_seconds, released):
+    table = pa.table({"n": list(range(6))})
+    opened = executor.open(lambda guard: (table.to_reader(max_chunksize=2), lambda: released.append(1)),
+                           timeout_seconds)
+    reader, lease = asyncio.run(opened)
+    return BatchStream(reader, "ndjson", lease)
+
+
+def test_stream_keeps_its_slot_until_closed_even_if_never_sent():
+    executor = QueryExecutor(workers=1, queue_limit=0)
+    released = []
+    stream = open_stream(executor, 5, released)
+    assert executor.stats()["streams"] == 1
+    with pytest.raises(OverloadedError):
+        executor.submit(lambda guard: None, 5)      # The stream still counts against admission
+
+    del stream
+    gc.collect()
+    assert released == [1] and executor.stats()["pending"] == 0
+    executor.shutdown()
+
+
+def test_deadline_covers_the_whole_stream():
+    executor = QueryExecutor(workers=1)
+    released = []
+    chunks = iter(open_stream(executor, 0.2, released))
+    assert next(chunks) == b'{"n": 0}\n{"n": 1}\n'
+
+    time.sleep(0.3)                                  # A slow client
+    with pytest.raises(QueryTimeoutError):
+        next(chunks)
+    assert released == [1]
+    assert executor.stats()["timeouts"] == 1 and executor.stats()["pending"] == 0
+    executor.shutdown()
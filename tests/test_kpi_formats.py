@@ -0,0 +1,103 @@
+import io
+import json
+import base64
+import random
+import duckdb
+import pyarrow as pa
+import pyarrow.parquet as pq
+from fastapi.testclient import TestClient
+import utils.db_utils as db_utils
+import utils.metrics as metrics
+from utils.kpi_cache import KpiCache
+from materialize_duckdb import create_duckdb_database
+from test_rollups import write_silver
+from api.main import app
+
+
+def serve_events(tmp_path, monkeypatch):
+    rng = random.Random(3)
+    silver_dir = str(tmp_path / "silver")
+    db_path = str(tmp_path / "events.duckdb")
+    for event_type in ("WatchEvent", "PullRequestEvent", "IssuesEvent"):
+        write_silver(silver_dir, event_type, "dump_0", 0, 300, rng)
+    create_duckdb_database(db_path=db_path, silver_dir_path=silver_dir)
+
+    pool = db_utils.ConnectionPool(db_path)
+    monkeypatch.setattr(db_utils, "_pool", pool)
+    monkeypatch.setattr(metrics, "kpi_cache", KpiCache())
+    return pool
+
+
+def publish_newer(pool):
+    with duckdb.connect(pool.db_path) as con:
+        db_utils.publish_snapshot(con, pool.db_path)
+    pool.check_seconds = 0
+
+
+def test_formats_carry_the_same_rows(tmp_path, monkeypatch):
+    pool = serve_events(tmp_path, monkeypatch)
+    client = TestClient(app)
+    records = client.get("/kpi/avg_pr_time").json()["data"]
+    assert len(records) == 4
+
+    split = client.get("/kpi/avg_pr_time?format=split").json()
+    assert [dict(zip(split["columns"], row)) for row in split["data"]] == records
+
+    response = client.get("/kpi/avg_pr_time", headers={"Accept": "application/vnd.apache.arrow.stream"})
+    assert response.headers["content-type"] == "application/vnd.apache.arrow.stream"
+    assert pa.ipc.open_stream(response.content).read_all().to_pylist() == records
+
+    parquet = pq.read_table(io.BytesIO(client.get("/kpi/avg_pr_time?format=parquet").content))
+    assert parquet.to_pylist() == records
+
+    lines = client.get("/kpi/event_count_offset?format=ndjson&offset=300").text.splitlines()
+    assert len(lines) == 3
+    assert client.get("/kpi/avg_pr_time?format=xml").status_code == 406
+    pool.close()
+
+
+def test_cursor_pagination_walks_the_result_once(tmp_path, monkeypatch):
+    pool = serve_events(tmp_path, monkeypatch)
+    client = TestClient(app)
+    everything = client.get("/kpi/avg_pr_time").json()["data"]
+
+    pages, cursor = [], None
+    while True:
+        url = "/kpi/avg_pr_time?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        body = client.get(url).json()
+        pages.append(body["data"])
+        cursor = body.get("next_cursor")
+        if not cursor:
+            break
+    assert [len(page) for page in pages] == [3, 1]
+    assert sum(pages, []) == everything
+
+    # Binary formats carry the cursor in a header
+    response = client.get("/kpi/avg_pr_time?limit=2&format=arrow")
+    assert pa.ipc.open_stream(response.content).read_all().num_rows == 2
+    assert response.headers["x-next-cursor"]
+
+    # A cursor from an older data version is refused
+    publish_newer(pool)
+    assert client.get(f"/kpi/avg_pr_time?limit=2&cursor={response.headers['x-next-cursor']}").status_code == 409
+    assert client.get("/kpi/avg_pr_time?limit=0").status_code == 422
+    assert client.get("/kpi/avg_pr_time?limit=2&cursor=garbage").status_code == 422
+    pool.close()
+
+
+def test_page_cursor_names_the_snapshot_the_page_was_read_from(tmp_path, monkeypatch):
+    pool = serve_events(tmp_path, monkeypatch)
+    served_from = pool.version()
+    query = metrics.run_query_arrow
+
+    def publish_midway(*args, **kwargs):
+        table = query(*args, **kwargs)
+        publish_newer(pool)
+        return table
+    monkeypatch.setattr(metrics, "run_query_arrow", publish_midway)
+
+    body = TestClient(app).get("/kpi/avg_pr_time?limit=3").json()
+
+    assert pool.version() != served_from
+    assert json.loads(base64.urlsafe_b64decode(body["next_cursor"]))["version"] == served_from
+    pool.close()
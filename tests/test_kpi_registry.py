@@ -0,0 +1,138 @@
+import os
+import duckdb
+import pyarrow as pa
+import pytest
+from pydantic import ValidationError
+from fastapi.testclient import TestClient
+import utils.db_utils as db_utils
+import utils.metrics as metrics
+import api.main as main
+from utils.metrics import KpiRegistry
+from utils.kpi_cache import KpiCache
+from api.main import app
+
+
+def write_config(path, sql, mtime):
+    path.write_text(f"kpis:\n  - id: total\n    name: Total\n    sql: \"{sql}\"\n")
+    os.utime(path, ns=(mtime, mtime))
+
+
+def test_registry_reloads_on_change_and_keeps_last_good_set(tmp_path):
+    config = tmp_path / "metrics.yaml"
+    write_config(config, "SELECT 1 AS total", 1_000_000_000)
+    registry = KpiRegistry(config, check_seconds=0)
+    assert registry.get("total").kpi.sql == "SELECT 1 AS total"
+
+    # A broken edit is rejected and the loaded set keeps serving
+    write_config(config, "SELEC 2 AS total", 2_000_000_000)
+    assert registry.get("total").kpi.sql == "SELECT 1 AS total"
+    assert "invalid SQL" in registry.status()["last_error"]
+
+    write_config(config, "DELETE FROM watchevent", 3_000_000_000)
+    assert registry.get("total").kpi.sql == "SELECT 1 AS total"
+    assert "single SELECT" in registry.status()["last_error"]
+
+    write_config(config, "SELECT 2 AS total", 4_000_000_000)
+    assert registry.get("total").kpi.sql == "SELECT 2 AS total"
+    assert registry.status()["last_error"] is None
+    assert registry.get("missing") is None
+
+
+def test_params_are_typed_bounded_and_bound(tmp_path, monkeypatch):
+    bound = []
+    monkeypatch.setattr(metrics, "run_query_arrow", lambda sql, params=None, guard=None, snapshot=None: bound.append(params) or pa.table({"n": [1]}))
+    monkeypatch.setattr(metrics, "data_version", lambda: "v1")
+    monkeypatch.setattr(metrics, "kpi_cache", KpiCache())
+
+    assert metrics.evaluate_kpi("event_count_offset", {"offset": "15"})["data"] == [{"n": 1}]
+    metrics.evaluate_kpi("event_count_offset")
+    assert bound == [{"offset": 15}, {"offset": 60}]
+
+    with pytest.raises(ValidationError):
+        metrics.evaluate_kpi("event_count_offset", {"offset": "0; DROP TABLE watchevent"})
+
+    client = TestClient(app)
+    assert client.get("/kpi/event_count_offset?offset=99999").status_code == 422
+    assert client.get("/kpi/event_count_offset?window=5").status_code == 422
+    assert client.get("/kpi/avg_pr_time?offset=5").status_code == 422
+
+
+def test_sql_params_must_match_declaration(tmp_path):
+    config = tmp_path / "metrics.yaml"
+    config.write_text("kpis:\n  - id: recent\n    name: Recent\n    sql: SELECT $limit AS n\n")
+    with pytest.raises(ValueError, match="declares params"):
+        KpiRegistry(config).reload()
+
+
+def test_sql_is_bound_against_the_event_tables_at_load_time(tmp_path):
+    config = tmp_path / "metrics.yaml"
+    write_config(config, "SELECT COUNT(*) AS total FROM watchevent", 1_000_000_000)
+    registry = KpiRegistry(config, check_seconds=0)
+    assert registry.get("total") is not None
+
+    for mtime, sql in enumerate(["SELECT COUNT(*) AS total FROM watchevents",
+                                 "SELECT COUNT(stars) AS total FROM watchevent"], start=2):
+        write_config(config, sql, mtime * 1_000_000_000)
+        assert registry.get("total").kpi.sql == "SELECT COUNT(*) AS total FROM watchevent"
+        assert "does not match the event tables" in registry.status()["last_error"]
+
+    # Partition columns only exist on the external-mode views
+    config.write_text("kpis:\n  - id: total\n    name: Total\n    sql: SELECT 1 AS total\n"
+                      "    partition_sql: SELECT COUNT(*) AS total FROM watchevent WHERE date = current_date\n")
+    assert KpiRegistry(config).reload()
+    config.write_text("kpis:\n  - id: total\n    name: Total\n    sql: SELECT COUNT(*) AS total FROM watchevent WHERE date = current_date\n")
+    with pytest.raises(ValueError, match="does not match"):
+        KpiRegistry(config).reload()
+
+
+def test_statements_are_prepared_once_per_cursor(tmp_path):
+    db_path = str(tmp_path / "events.duckdb")
+    with duckdb.connect(db_path) as con:
+        con.execute("CREATE TABLE numbers AS SELECT range AS n FROM range(10)")
+    statement = duckdb.extract_statements("SELECT COUNT(*) AS count FROM numbers WHERE n < $limit")[0]
+    pool = db_utils.ConnectionPool(db_path, size=1)
+
+    counts = []
+    for limit in (3, 7):
+        with pool.cursor() as cur:
+            counts.append(db_utils.execute(cur, statement, {"limit": limit}).fetchone()[0])
+    with pool.cursor() as cur:
+        prepared = cur.execute("SELECT COUNT(*) FROM duckdb_prepared_statements()").fetchone()[0]
+    pool.close()
+
+    assert counts == [3, 7] and prepared == 1
+
+
+def test_missing_config_keeps_the_last_good_set(tmp_path):
+    config = tmp_path / "metrics.yaml"
+    write_config(config, "SELECT 1 AS total", 1_000_000_000)
+    registry = KpiRegistry(config, check_seconds=0)
+    assert registry.get("total") is not None
+
+    config.unlink()  # e.g. mid-deploy
+    assert registry.get("total").kpi.sql == "SELECT 1 AS total"
+    assert "No such file" in registry.status()["last_error"]
+    assert registry.reload() is False
+
+    write_config(config, "SELECT 2 AS total", 2_000_000_000)
+    assert registry.get("total").kpi.sql == "SELECT 2 AS total"
+
+
+def test_reload_endpoint_needs_the_admin_token_and_reports_errors(tmp_path, monkeypatch):
+    config = tmp_path / "metrics.yaml"
+    write_config(config, "SELECT 1 AS total", 1_000_000_000)
+    registry = KpiRegistry(config)
+    registry.reload()
+    monkeypatch.setattr(main, "kpi_registry", registry)
+    client = TestClient(app)
+
+    monkeypatch.setattr(main, "ADMIN_TOKEN", None)
+    assert client.post("/admin/reload-kpis").status_code == 404
+    monkeypatch.setattr(main, "ADMIN_TOKEN", "s3cret")
+    assert client.post("/admin/reload-kpis").status_code == 401
+    assert client.post("/admin/reload-kpis", headers={"X-Admin-Token": "guess"}).status_code == 401
+
+    write_config(config, "SELEC 2 AS total", 2_000_000_000)
+    body = client.post("/admin/reload-kpis", headers={"X-Admin-Token": "s3cret"}).json()
+    assert body["reloaded"] is False and body["kpis"] == ["total"]
+    assert "invalid SQL" in body["last_error"]
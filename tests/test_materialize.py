@@ -0,0 +1,51 @@
+import os
+import duckdb
+import pandas as pd
+from materialize_duckdb import create_duckdb_database, MANIFEST_TABLE
+
+
+def write_silver(silver_dir, event_type, name, ids):
+    event_dir = os.path.join(silver_dir, event_type)
+    os.makedirs(event_dir, exist_ok=True)
+    df = pd.DataFrame({
+        "id": ids,
+        "type": [event_type] * len(ids),
+        "created_at": pd.to_datetime(["2025-07-10T14:00:00Z"] * len(ids)),
+    })
+    df.to_parquet(os.path.join(event_dir, f"{event_type}_{name}.parquet"), index=False)
+
+
+def test_incremental_materialization_loads_only_new_files(tmp_path):
+    silver_dir = str(tmp_path / "silver")
+    db_path = str(tmp_path / "events.duckdb")
+
+    write_silver(silver_dir, "WatchEvent", "dump_1", ["1", "2"])
+    create_duckdb_database(db_path=db_path, silver_dir_path=silver_dir)
+
+    # Second file overlaps on id "2", which must not be double counted
+    write_silver(silver_dir, "WatchEvent", "dump_2", ["2", "3"])
+    create_duckdb_database(db_path=db_path, silver_dir_path=silver_dir)
+
+    with duckdb.connect(db_path) as con:
+        ids = [r[0] for r in con.execute("SELECT id FROM watchevent ORDER BY id").fetchall()]
+        manifest = con.execute(f"SELECT COUNT(*) FROM {MANIFEST_TABLE}").fetchone()[0]
+    assert ids == ["1", "2", "3"]
+    assert manifest == 2
+
+
+def test_full_refresh_rebuilds_table(tmp_path):
+    silver_dir = str(tmp_path / "silver")
+    db_path = str(tmp_path / "events.duckdb")
+
+    write_silver(silver_dir, "IssuesEvent", "dump_1", ["1", "1", "2"])
+    create_duckdb_database(db_path=db_path, silver_dir_path=silver_dir)
+
+    os.remove(os.path.join(silver_dir, "IssuesEvent", "IssuesEvent_dump_1.parquet"))
+    write_silver(silver_dir, "IssuesEvent", "dump_2", ["5"])
+    create_duckdb_database(full_refresh=True, db_path=db_path, silver_dir_path=silver_dir)
+
+    with duckdb.connect(db_path) as con:
+        ids = [r[0] for r in con.execute("SELECT id FROM issuesevent").fetchall()]
+        files = con.execute(f"SELECT file_path FROM {MANIFEST_TABLE}").fetchall()
+    assert ids == ["5"]
+    assert len(files) == 1
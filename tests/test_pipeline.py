@@ -0,0 +1,32 @@
+import os
+import random
+import duckdb
+from pipeline import StreamingPipeline
+from utils.dedup import SeenIdIndex
+from utils.github_client import GitHubEventsClient
+
+
+def event(i, event_type="WatchEvent"):
+    return {"id": str(i), "type": event_type, "created_at": "2025-07-10T14:00:00Z",
+            "repo": {"name": "octocat/hello"}, "actor": {"login": "octocat"},
+            "payload": {"action": "opened", "issue": {"title": "bug"}}}
+
+
+def test_pipeline_streams_events_into_duckdb_and_writes_bronze_and_silver(tmp_path, github_stub):
+    github_stub.events = [event(3), event(2, "IssuesEvent"), event(1), {"id": "0", "type": "PushEvent"}]
+    client = GitHubEventsClient(url=github_stub.url, min_interval=0.05, rng=random.Random(0))
+    db_path = str(tmp_path / "events.duckdb")
+
+    pipeline = StreamingPipeline(client=client, seen_index=SeenIdIndex(), db_path=db_path,
+                                 storage_path=str(tmp_path))
+    pipeline.run(duration=0.5)
+
+    with duckdb.connect(db_path, read_only=True) as con:
+        assert sorted(r[0] for r in con.execute("SELECT id FROM watchevent").fetchall()) == ["1", "3"]
+        assert con.execute('SELECT "payload.issue.title" FROM issuesevent').fetchall() == [("bug",)]
+
+    assert pipeline.stats["rows_loaded"] == 3
+    assert pipeline.in_process.summary()["count"] == 3
+    assert pipeline.end_to_end.summary()["p50"] > 0
+    assert os.listdir(tmp_path / "bronze" / "WatchEvent") == ["WatchEvent_seg_0000000001.ndjson"]
+    assert os.path.exists(tmp_path / "silver" / "WatchEvent" / "WatchEvent_seg_0000000001.parquet")
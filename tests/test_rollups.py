@@ -0,0 +1,91 @@
+import os
+import json
+import random
+from datetime import datetime, timedelta, timezone
+import duckdb
+import pandas as pd
+import pytest
+from materialize_duckdb import create_duckdb_database
+from utils.metrics import kpi_registry
+
+# Constants
+ROW_GROUP_SIZE = 122880               # DuckDB's default; zone maps skip whole row groups
+
+
+def write_silver(silver_dir, event_type, name, first_id, count, rng):
+    event_dir = os.path.join(silver_dir, event_type)
+    os.makedirs(event_dir, exist_ok=True)
+    now = datetime.now(timezone.utc)
+    ids = [str(first_id + i) for i in range(count)]
+    df = pd.DataFrame({
+        "id": ids,
+        "type": [event_type] * count,
+        "created_at": [now - timedelta(seconds=rng.randint(0, 4 * 3600)) for _ in ids],
+        "repo.name": [rng.choice(["a/x", "b/y", "c/z", None]) for _ in ids],
+        "actor.login": ["octocat"] * count,
+    })
+    if event_type == "PullRequestEvent":
+        df["payload.pull_request.state"] = [rng.choice(["open", "closed"]) for _ in ids]
+    df.to_parquet(os.path.join(event_dir, f"{event_type}_{name}.parquet"), index=False)
+
+
+def run_both(con, kpi_id, params):
+    entry = kpi_registry.get(kpi_id)
+    bound = entry.params_model(**params).model_dump()
+    raw = con.execute(entry.statement, bound).fetchdf()
+    rollup = con.execute(entry.rollup_statement, bound).fetchdf()
+    key = list(raw.columns)[0]
+    return raw.sort_values(key, na_position="first").reset_index(drop=True), \
+        rollup.sort_values(key, na_position="first").reset_index(drop=True)
+
+
+@pytest.mark.parametrize("full_refresh", [False, True])
+def test_rollup_kpis_match_raw_sql(tmp_path, full_refresh):
+    rng = random.Random(7)
+    silver_dir = str(tmp_path / "silver")
+    db_path = str(tmp_path / "events.duckdb")
+
+    # Several incremental loads, with overlapping ids that must not be counted twice
+    for batch in range(3):
+        for event_type in ("WatchEvent", "PullRequestEvent", "IssuesEvent"):
+            write_silver(silver_dir, event_type, f"dump_{batch}", batch * 150, 200, rng)
+        create_duckdb_database(db_path=db_path, silver_dir_path=silver_dir)
+    if full_refresh:
+        create_duckdb_database(full_refresh=True, db_path=db_path, silver_dir_path=silver_dir)
+
+    with duckdb.connect(db_path, read_only=True) as con:
+        for offset in (1, 7, 45, 180, 10080):
+            raw, rollup = run_both(con, "event_count_offset", {"offset": offset})
+            pd.testing.assert_frame_equal(raw, rollup)
+
+        raw, rollup = run_both(con, "avg_pr_time", {})
+        assert raw["repo.name"].tolist() == rollup["repo.name"].tolist()
+        assert rollup["avg_minutes"].tolist() == pytest.approx(raw["avg_minutes"].tolist())
+
+
+def test_rollup_sql_scans_only_the_partial_minutes(tmp_path):
+    rng = random.Random(9)
+    silver_dir = str(tmp_path / "silver")
+    db_path = str(tmp_path / "events.duckdb")
+    write_silver(silver_dir, "WatchEvent", "dump_0", 0, 500000, rng)  # Several row groups, stored in time order
+    for event_type in ("PullRequestEvent", "IssuesEvent"):
+        write_silver(silver_dir, event_type, "dump_0", 0, 10, rng)
+    create_duckdb_database(db_path=db_path, silver_dir_path=silver_dir)
+    entry = kpi_registry.get("event_count_offset")
+
+    def watchevent_rows_scanned(con, statement, offset):
+        con.execute(statement, {"offset": offset}).fetchall()
+        def scans(node):
+            if node.get("operator_type") == "TABLE_SCAN" and node["extra_info"].get("Table", "").endswith(".watchevent"):
+                yield node["operator_rows_scanned"]
+            for child in node.get("children", []):
+                yield from scans(child)
+        return sum(scans(json.loads(con.get_profiling_information(format="json"))))
+
+    with duckdb.connect(db_path, read_only=True) as con:
+        con.execute("SET enable_profiling = 'no_output'")
+        raw = watchevent_rows_scanned(con, entry.statement, 180)
+        rollup = watchevent_rows_scanned(con, entry.rollup_statement, 180)
+
+    # At most the row group holding each partial minute, instead of three hours of rows
+    assert rollup <= 2 * ROW_GROUP_SIZE < raw
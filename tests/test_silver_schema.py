@@ -0,0 +1,80 @@
+import os
+import duckdb
+import pytest
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pydantic import ValidationError
+from test_arrow_transform import pr_event, write_ndjson_gz
+from transform import convert_file, event_schemas
+from compact_silver import compact_silver
+from utils.silver_schema import event_schema
+
+
+def test_event_schema_expands_declarations():
+    schema = event_schema({
+        "fields": ["id", "created_at", "repo.name", "n"],
+        "types": {"created_at": {"type": "timestamp", "unit": "ms", "tz": None},
+                  "repo.name": {"type": "string", "dictionary": True}, "n": "int64"},
+    })
+
+    assert schema.field("id").type == pa.string()
+    assert schema.field("created_at").type == pa.timestamp("ms")
+    assert schema.field("repo.name").type == pa.dictionary(pa.int32(), pa.string())
+    assert schema.field("n").type == pa.int64()
+
+    with pytest.raises(ValidationError):
+        event_schema({"fields": ["n"], "types": {"n": {"type": "int64", "dictionary": True}}})
+    with pytest.raises(ValidationError):
+        event_schema({"fields": ["id"], "types": {"missing": "string"}})
+
+
+@pytest.mark.parametrize("engine", ["pandas", "arrow"])
+def test_silver_files_use_declared_types_and_writer_settings(tmp_path, engine):
+    # All merged values null: pandas alone would infer an object column
+    events = [pr_event(i, merged=None) for i in range(4)]
+    events[0]["payload"]["pull_request"]["number"] = None
+    bronze = tmp_path / "PullRequestEvent_seg_0000000001.ndjson.gz"
+    write_ndjson_gz(bronze, events)
+    parquet_path = str(tmp_path / "silver.parquet")
+
+    assert convert_file("PullRequestEvent", str(bronze), parquet_path, engine) == 4
+
+    table = pq.read_table(parquet_path)
+    assert table.schema.equals(event_schemas["PullRequestEvent"], check_metadata=False)
+    assert table.column("payload.pull_request.number").to_pylist() == [None, 1, 2, 3]
+
+    row_group = pq.ParquetFile(parquet_path).metadata.row_group(0)
+    columns = {row_group.column(i).path_in_schema: row_group.column(i) for i in range(row_group.num_columns)}
+    assert all(column.compression == "ZSTD" for column in columns.values())
+    assert columns["created_at"].statistics.has_min_max
+    assert "RLE_DICTIONARY" in columns["repo.name"].encodings
+    assert "RLE_DICTIONARY" not in columns["id"].encodings
+
+    types = {name: kind for name, kind, *_ in duckdb.sql(f"DESCRIBE SELECT * FROM read_parquet('{parquet_path}')").fetchall()}
+    assert types["created_at"] == "TIMESTAMP WITH TIME ZONE"
+    assert types["payload.pull_request.number"] == "BIGINT"
+    assert types["payload.pull_request.merged"] == "BOOLEAN"
+
+
+def test_compaction_casts_drifted_files_to_declared_schema(tmp_path):
+    event_dir = tmp_path / "silver" / "PullRequestEvent"
+    event_dir.mkdir(parents=True)
+    # A file written before the schema was declared: large strings, float numbers, ns timestamps
+    pq.write_table(pa.table({
+        "id": pa.array(["1"], pa.large_string()),
+        "type": pa.array(["PullRequestEvent"], pa.large_string()),
+        "created_at": pa.array([1752156000 * 10**9], pa.timestamp("ns", tz="UTC")),
+        "repo.name": pa.array(["a/a"], pa.large_string()),
+        "payload.pull_request.number": pa.array([7.0]),
+    }), event_dir / "PullRequestEvent_seg_0000000001.parquet")
+    bronze = tmp_path / "PullRequestEvent_seg_0000000002.ndjson.gz"
+    write_ndjson_gz(bronze, [pr_event(2)])
+    convert_file("PullRequestEvent", str(bronze), str(event_dir / "PullRequestEvent_seg_0000000002.parquet"), "arrow")
+
+    compact_silver(str(tmp_path / "silver"))
+
+    [compacted] = (event_dir / "date=2025-07-10" / "hour=14").iterdir()
+    table = pq.read_table(compacted)
+    assert table.schema.equals(event_schemas["PullRequestEvent"], check_metadata=False)
+    assert table.column("payload.pull_request.number").to_pylist() == [7, 2]
+    assert not [name for name in os.listdir(event_dir) if name.endswith(".parquet")]
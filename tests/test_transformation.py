@@ -25,4 +25,39 @@ def test_transform_and_write_parquet(tmp_path):
 
     assert os.path.exists(out_path)
     df2 = pd.read_parquet(out_path)
-    assert "repo.name" in df2.columns
\ No newline at end of file
+    assert "repo.name" in df2.columns
+
+def test_compiled_extractors_match_trim_event_dynamic():
+    fields = ["id", "repo.name", "payload.pull_request.number", "payload.pull_request.merged", "payload.issue.state"]
+    events = [
+        {"id": "1", "repo": {"name": "a/b"}, "payload": {"pull_request": {"number": 7, "merged": False}}},
+        {"id": "2", "repo": None, "payload": {"pull_request": "not-a-dict"}},
+        {"id": "3", "payload": {"issue": {"state": "open"}}},
+        {},
+    ]
+
+    trimmer = compile_event_trimmer(fields)
+    extractor = compile_row_extractor(fields)
+
+    for event in events:
+        expected = trim_event_dynamic(event, fields)
+        assert trimmer(event) == expected
+        assert extractor(event) == tuple(expected.values())
+
+
+def test_transform_events_matches_dict_based_frame():
+    from transform import transform_events, event_field_config
+
+    fields = event_field_config["IssuesEvent"]["fields"]
+    events = [
+        {"id": str(i), "type": "IssuesEvent", "created_at": "2025-07-10T14:00:00Z",
+         "repo": {"name": "octocat/hello"}, "actor": {"login": "octocat"},
+         "payload": {"action": "opened", "issue": {"title": "t", "state": "open"}}}
+        for i in range(3)
+    ] + [{"id": "9", "type": "ForkEvent"}]
+
+    df = transform_events(events)
+    expected = pd.DataFrame([trim_event_dynamic(e, fields) for e in events[:3]])
+    expected["created_at"] = pd.to_datetime(expected["created_at"], errors="coerce")
+
+    pd.testing.assert_frame_equal(df, expected)
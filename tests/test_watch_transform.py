@@ -0,0 +1,122 @@
+import os
+import json
+import threading
+import time
+import pandas as pd
+import pytest
+from transform import watch_bronze
+from utils.bronze_watcher import BronzeWatcher, Observer, TransformCheckpoint
+from utils.bronze_writer import BronzeSegmentWriter
+
+
+def watch_event(i):
+    return {"id": str(i), "type": "WatchEvent", "created_at": "2025-07-10T14:00:00Z",
+            "repo": {"name": "octocat/hello"}, "actor": {"login": "octocat"}}
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+
+@pytest.mark.parametrize("use_notifications", [
+    False,
+    pytest.param(True, marks=pytest.mark.skipif(Observer is None, reason="watchdog not installed")),
+])
+def test_watch_transforms_sealed_segments_only(tmp_path, use_notifications):
+    storage = str(tmp_path)
+    writer = BronzeSegmentWriter("WatchEvent", os.path.join(storage, "bronze"))
+    silver = tmp_path / "silver" / "WatchEvent"
+    stop = threading.Event()
+    thread = threading.Thread(target=watch_bronze, kwargs={
+        "storage_path": storage, "stop_event": stop,
+        "use_notifications": use_notifications, "poll_interval": 0.05,
+    })
+    thread.start()
+    try:
+        writer.append([watch_event(1)])
+        time.sleep(0.3)
+        assert not silver.exists() or not list(silver.glob("*.parquet"))  # Open segment is still hidden
+
+        writer.roll()
+        assert wait_for(lambda: (silver / "WatchEvent_seg_0000000001.parquet").exists())
+    finally:
+        stop.set()
+        thread.join()
+
+    df = pd.read_parquet(silver / "WatchEvent_seg_0000000001.parquet")
+    assert df["id"].tolist() == ["1"]
+
+
+def test_restart_resumes_from_checkpoint(tmp_path):
+    bronze = tmp_path / "bronze" / "WatchEvent"
+    bronze.mkdir(parents=True)
+    checkpoint = str(tmp_path / "state" / "transform_checkpoint.json")
+    handled = []
+
+    for n in (1, 2):
+        (bronze / f"WatchEvent_seg_{n:010d}.ndjson").write_text(json.dumps(watch_event(n)) + "\n")
+    first = BronzeWatcher(str(tmp_path / "bronze"), checkpoint, lambda t, p: handled.append(p), settle_seconds=0)
+    assert first.catch_up() == 2
+
+    (bronze / "WatchEvent_seg_0000000003.ndjson").write_text(json.dumps(watch_event(3)) + "\n")
+    # A legacy dump that may still be being written is held back
+    restarted = BronzeWatcher(str(tmp_path / "bronze"), checkpoint, lambda t, p: handled.append(p))
+    assert restarted.catch_up() == 1
+    (bronze / "WatchEvent_dump_20250710_140000.json").write_text(json.dumps([watch_event(4)]))
+    assert restarted.catch_up() == 0
+
+    assert [os.path.basename(p) for p in handled] == [
+        "WatchEvent_seg_0000000001.ndjson", "WatchEvent_seg_0000000002.ndjson", "WatchEvent_seg_0000000003.ndjson",
+    ]
+
+
+def test_segment_sealed_after_a_newer_stream_is_not_skipped(tmp_path):
+    bronze = tmp_path / "bronze" / "WatchEvent"
+    bronze.mkdir(parents=True)
+    checkpoint = str(tmp_path / "state" / "transform_checkpoint.json")
+    handled = []
+    watcher = BronzeWatcher(str(tmp_path / "bronze"), checkpoint, lambda t, p: handled.append(os.path.basename(p)))
+
+    # A backfill segment is sealed first; the ingest segment sealed later keeps an older mtime
+    (bronze / "WatchEvent_gharchive-2015-01-01-15_0000000001.ndjson").write_text(json.dumps(watch_event(1)) + "\n")
+    assert watcher.catch_up() == 1
+    late = bronze / "WatchEvent_seg_0000000001.ndjson"
+    late.write_text(json.dumps(watch_event(2)) + "\n")
+    os.utime(late, ns=(1, 1))
+    assert watcher.catch_up() == 1
+    assert watcher.process(str(late)) is False
+
+    restarted = BronzeWatcher(str(tmp_path / "bronze"), checkpoint, lambda t, p: handled.append(os.path.basename(p)))
+    (bronze / "WatchEvent_seg_0000000002.ndjson").write_text(json.dumps(watch_event(3)) + "\n")
+    assert restarted.catch_up() == 1
+    assert handled[-1] == "WatchEvent_seg_0000000002.ndjson"
+    assert restarted.checkpoint.marks["WatchEvent"]["seg"] == {"through": 2, "above": set()}
+
+
+def test_checkpoint_keeps_only_streams_still_on_disk(tmp_path):
+    bronze = tmp_path / "bronze" / "WatchEvent"
+    bronze.mkdir(parents=True)
+    checkpoint = tmp_path / "state" / "transform_checkpoint.json"
+    checkpoint.parent.mkdir()
+    # Format of the previous release: streams plus a list of legacy dumps
+    checkpoint.write_text(json.dumps({"WatchEvent": {
+        "streams": {"seg": {"through": 3, "above": [5]}, "gharchive-2015-01-01-15": {"through": 1, "above": []}},
+        "files": ["WatchEvent_dump_20250710_140000.json"],
+    }}))
+    for n in (3, 4):
+        (bronze / f"WatchEvent_seg_{n:010d}.ndjson").write_text(json.dumps(watch_event(n)) + "\n")
+    handled = []
+    watcher = BronzeWatcher(str(tmp_path / "bronze"), str(checkpoint), lambda t, p: handled.append(p))
+
+    assert watcher.catch_up() == 1 and watcher.catch_up() == 0
+    assert json.loads(checkpoint.read_text()) == {"WatchEvent": {"seg": {"through": 5, "above": []}}}
+
+    # Between full scans, marks are written at most every CHECKPOINT_SAVE_SECONDS
+    (bronze / "WatchEvent_seg_0000000006.ndjson").write_text(json.dumps(watch_event(6)) + "\n")
+    assert watcher.process(str(bronze / "WatchEvent_seg_0000000006.ndjson"))
+    assert TransformCheckpoint(str(checkpoint)).marks["WatchEvent"]["seg"]["through"] == 5